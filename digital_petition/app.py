@@ -2,129 +2,160 @@
 
 import streamlit as st
 import json
-import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 import time
 
-# Mengimpor fungsi yang diperlukan, termasuk perbaikan bug 'verify_signature' not defined
-from crypto_utils import generate_keys_in_memory, sign_data, verify_signature
+# Mengimpor fungsi yang diperlukan
+from crypto_utils import (
+    DEFAULT_SIGNATURE_SCHEME,
+    SIGNING_MESSAGE_VERSION,
+    petition_digest,
+    scheme_for_private_key,
+    scheme_for_public_key,
+    sign_data,
+    signing_message,
+)
 from blockchain_utils import (
-    load_blockchain,
-    add_block,
     validate_chain,
-    validate_signatures
+    audit_signatures,
+    describe_signature_summary,
+    get_inclusion_proof
 )
+from batch_verify import DEFAULT_CHUNK_SIZE, default_workers
+from petition_index import get_petition_index
+from verification_memo import verify_block_signature
+from search_index import get_search_index
+from stats_index import get_signature_stats
+from chain_table import get_chain_table
+from user_index import get_user_blocks
+from user_store import get_user_store
+from key_pool import get_key_pool
+from ledger_client import LedgerRequestFailed, LedgerUnavailable, request_metrics, submit_transaction
+from metrics import METRICS_ENV, METRICS_FILE, get_metrics
+from snapshot import install_snapshot_store
+from merkle import BATCH_TRANSACTION_TYPE, iter_raw_transactions
+from explorer_index import (count_explorer_blocks, find_block, get_block_type_index, load_explorer_page,
+                            page_of_block)
 
 # --------------- Konstanta ---------------
 PETITION_FILE = 'petition_data.json'
-USERS_DB_FILE = 'users.json'
-
 
-# --------------- Load Users ---------------
-def load_users_db():
-    if not os.path.exists(USERS_DB_FILE):
-        with open(USERS_DB_FILE, 'w') as f:
-            json.dump({}, f) # Buat file dengan objek JSON kosong
-        return {}
-        
-    with open(USERS_DB_FILE, 'r') as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {} # Jaga-jaga jika file korup
-    
-def save_users_db(db):
-    with open(USERS_DB_FILE, 'w') as f:
-        json.dump(db, f, indent=4)
 
 # --------------- Helper Functions untuk Analitik ---------------
 def get_petition_stats():
-    """Mendapatkan statistik lengkap petisi"""
-    chain = load_blockchain()
+    """Mendapatkan ringkasan petisi dan agregat tanda tangan yang sudah dihitung"""
+    # Jumlah tanda tangan per petisi/hari/jam diambil dari agregat inkremental,
+    # bukan dengan membuat satu record per tanda tangan
     petitions = {}
-    signers_data = []
-    
-    # Ambil data petisi
-    for block in chain:
-        if block['transaction_type'] == 'CREATE_PETITION':
-            petition_id = block['transaction_data']['petition_id']
-            petitions[petition_id] = {
-                'text': block['transaction_data']['petition_text'],
-                'creator': block['transaction_data'].get('creator', 'N/A'),
-                'created_at': block['timestamp'],
-                'signers': 0,
-                'signatures': []
-            }
+    for entry in get_petition_index().list_petitions():
+        petitions[entry.petition_id] = {
+            'text': entry.text,
+            'creator': entry.creator,
+            'created_at': entry.created_at
+        }
     
-    # Hitung penandatangan
-    for block in chain:
-        if block['transaction_type'] == 'SIGN_PETITION':
-            petition_id = block['transaction_data'].get('petition_id')
-            if petition_id in petitions:
-                petitions[petition_id]['signers'] += 1
-                petitions[petition_id]['signatures'].append({
-                    'signer': block['transaction_data']['signer_username'],
-                    'timestamp': block['timestamp']
-                })
-                signers_data.append({
-                    'petition_id': petition_id,
-                    'signer': block['transaction_data']['signer_username'],
-                    'timestamp': block['timestamp'],
-                    'date': datetime.fromtimestamp(block['timestamp']).date()
-                })
+    return petitions, get_signature_stats()
+
+def get_signature_details():
+    """Mendapatkan DataFrame setiap tanda tangan (hanya untuk tampilan detail)"""
+    table = get_chain_table()
+    created_ids = table.loc[table['transaction_type'] == 'CREATE_PETITION', 'petition_id'].unique()
+    signatures = table[(table['transaction_type'] == 'SIGN_PETITION') & table['petition_id'].isin(created_ids)]
     
-    return petitions, signers_data
+    return pd.DataFrame({
+        'petition_id': signatures['petition_id'].astype(object),
+        'signer': signatures['signer'].astype(object),
+        'datetime': pd.to_datetime(signatures['timestamp'], unit='s')
+    })
 
 def search_petitions(query):
-    """Mencari petisi berdasarkan ID atau teks"""
-    chain = load_blockchain()
+    """Mencari petisi berdasarkan ID atau teks, diurutkan dari yang paling relevan"""
+    petition_index = get_petition_index()
     results = []
     
-    for block in chain:
-        if block['transaction_type'] == 'CREATE_PETITION':
-            petition_id = block['transaction_data']['petition_id']
-            petition_text = block['transaction_data']['petition_text']
-            
-            if (query.lower() in petition_id.lower() or 
-                query.lower() in petition_text.lower()):
-                results.append({
-                    'id': petition_id,
-                    'text': petition_text,
-                    'creator': block['transaction_data'].get('creator', 'N/A'),
-                    'timestamp': block['timestamp']
-                })
+    for petition_id, _ in get_search_index().search(query):
+        entry = petition_index.get(petition_id)
+        results.append({
+            'id': petition_id,
+            'text': entry.text,
+            'creator': entry.creator,
+            'timestamp': entry.created_at
+        })
     
     return results
 
 def get_user_activity(username):
     """Mendapatkan aktivitas user (petisi yang dibuat dan ditandatangani)"""
-    chain = load_blockchain()
-    created_petitions = []
-    signed_petitions = []
-    
-    for block in chain:
-        if block['transaction_type'] == 'CREATE_PETITION':
-            if block['transaction_data'].get('creator') == username:
-                created_petitions.append({
-                    'id': block['transaction_data']['petition_id'],
-                    'text': block['transaction_data']['petition_text'],
-                    'timestamp': block['timestamp']
-                })
-        
-        elif block['transaction_type'] == 'SIGN_PETITION':
-            if block['transaction_data'].get('signer_username') == username:
-                signed_petitions.append({
-                    'petition_id': block['transaction_data']['petition_id'],
-                    'timestamp': block['timestamp']
-                })
+    # Indeks user menunjuk langsung ke blok milik user; blok lain tidak dibaca
+    petition_index = get_petition_index()
+    created_blocks, signed_blocks = get_user_blocks(username)
+    
+    created_petitions = [{
+        'id': block['transaction_data']['petition_id'],
+        'text': petition_index.get_text(block['transaction_data']['petition_id']) or '',
+        'timestamp': block['timestamp']
+    } for block in created_blocks]
+    
+    signed_petitions = [{
+        'petition_id': block['transaction_data']['petition_id'],
+        'timestamp': block['timestamp'],
+        'index': block['index'],
+        'batch_position': block.get('batch_position')
+    } for block in signed_blocks]
     
     return created_petitions, signed_petitions
 
+def render_block(block, expanded=False):
+    """Menampilkan detail satu blok di dalam expander"""
+    if block['transaction_type'] == BATCH_TRANSACTION_TYPE:
+        creator_info = f"{block['transaction_data']['transaction_count']} transaksi"
+    else:
+        creator_info = block['transaction_data'].get('creator') or block['transaction_data'].get('signer_username', 'N/A')
+    expander_title = f"📦 **Block #{block['index']}** | Tipe: **{block['transaction_type']}** | Oleh: **{creator_info}**"
+    
+    with st.expander(expander_title, expanded=expanded):
+        st.markdown(f"**Timestamp:** `{datetime.fromtimestamp(block['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}`")
+        st.markdown(f"**Hash Block Ini:**")
+        st.code(block['hash'], language='text')
+        st.markdown(f"**Hash Block Sebelumnya:**")
+        st.code(block['previous_hash'], language='text')
+
+        st.markdown("---")
+        st.markdown("**Data Transaksi:**")
+        
+        tx_data = block.get('transaction_data')
+        if block['transaction_type'] == BATCH_TRANSACTION_TYPE:
+            st.markdown("**Merkle Root:**")
+            st.code(tx_data['merkle_root'], language='text')
+            batch_rows = []
+            for _, tx_type, batch_tx_data in iter_raw_transactions(block):
+                row = {"Tipe": tx_type, **batch_tx_data}
+                if isinstance(row.get('signature'), str):
+                    row['signature'] = f"{row['signature'][:20]}..."
+                batch_rows.append(row)
+            st.dataframe(pd.DataFrame(batch_rows), use_container_width=True)
+        elif tx_data:
+            display_data = tx_data.copy()
+            # Memotong signature yang panjang agar tampilan lebih rapi
+            if 'signature' in display_data and isinstance(display_data['signature'], str):
+                sig = display_data['signature']
+                display_data['signature'] = f"{sig[:20]}..."
+            st.json(display_data)
+        else:
+            st.write("Tidak ada data transaksi (Genesis Block).")
+
 # --------------- UI Streamlit ---------------
 st.set_page_config(page_title="Petisi Digital", layout="wide")
+# State view dipulihkan dari snapshot pada refresh pertama
+install_snapshot_store()
+# Pool key skema default (akun baru) mulai diisi di background sejak aplikasi dibuka.
+# Pool RSA untuk akun lama baru dibuat saat pertama kali dibutuhkan, karena membuat
+# key RSA-2048 di thread memegang GIL dan memperlambat render halaman pertama.
+get_key_pool(DEFAULT_SIGNATURE_SCHEME)
 st.title("Petisi Digital dengan Tanda Tangan Terverifikasi")
 
 # --- Bagian Login ---
@@ -139,20 +170,26 @@ if 'username' not in st.session_state:
             if not username_input.strip():
                 st.warning("Username tidak boleh kosong.", icon="❗")
             else:
-                users_db = load_users_db()
-                if username_input not in users_db:
-                 # Username belum ada → buat akun baru dengan pasangan key baru
+                user_store = get_user_store()
+                # Pasangan key diambil dari pool yang sudah disiapkan di background
+                public_key_pem = user_store.get(username_input)
+                if public_key_pem is None:
+                 # Username belum ada → buat akun baru dengan pasangan key skema default (Ed25519)
                     st.info(f"Username '{username_input}' belum terdaftar. Membuat akun baru...", icon="✨")
-                    private_key, public_key = generate_keys_in_memory()
-                    users_db[username_input] = public_key.export_key().decode()
-                    save_users_db(users_db)
+                    key_pool = get_key_pool(DEFAULT_SIGNATURE_SCHEME)
+                    private_key, public_key = key_pool.take()
+                    if not user_store.register(username_input, key_pool.scheme.export_public_key(public_key)):
+                        # Username baru saja didaftarkan proses lain → pakai public key yang tersimpan
+                        public_key_pem = user_store.get(username_input)
+                        public_key = public_key_pem.encode()
+                        private_key, _ = get_key_pool(scheme_for_public_key(public_key_pem).name).take()
                 else:
                     # Username sudah ada → ambil public key dari database
-                    public_key_pem = users_db[username_input]
                     public_key = public_key_pem.encode()
 
-                    # Buat private key baru hanya untuk sesi ini (⚠ tidak cocok untuk verifikasi signature lama)
-                    private_key, _ = generate_keys_in_memory()
+                    # Buat private key baru hanya untuk sesi ini, dengan skema yang sama seperti key terdaftar
+                    # (⚠ tidak cocok untuk verifikasi signature lama)
+                    private_key, _ = get_key_pool(scheme_for_public_key(public_key_pem).name).take()
                 
                 st.session_state.username = username_input
                 st.session_state.private_key = private_key
@@ -280,6 +317,12 @@ if st.session_state.get('redirect_to_petition', False):
     st.session_state['redirect_to_petition'] = False
     st.session_state.selected_menu = "Lihat & Tandatangani Petisi"
 
+# Halaman diagnostik tidak ada di menu; hanya dibuka lewat URL ?diagnostics=1
+DIAGNOSTICS_MENU = "🩺 Diagnostik"
+if st.query_params.get('diagnostics') == '1':
+    del st.query_params['diagnostics']
+    st.session_state.selected_menu = DIAGNOSTICS_MENU
+
 # Render navigation menu
 for section in menu_structure:
     st.sidebar.markdown(f'<div class="nav-section">{section["section"]}</div>', unsafe_allow_html=True)
@@ -347,15 +390,14 @@ if menu == "🔍 Pencarian Petisi":
 elif menu == "Lihat & Tandatangani Petisi":
     st.subheader("📜 Daftar Petisi Publik")
     
-    chain = load_blockchain()
-    users_db = load_users_db()
+    petition_index = get_petition_index()
     
     petitions = {
-        block['transaction_data']['petition_id']: {
-            "text": block['transaction_data']['petition_text'],
-            "creator": block['transaction_data'].get('creator', 'N/A')
+        entry.petition_id: {
+            "text": entry.text,
+            "creator": entry.creator
         }
-        for block in chain if block['transaction_type'] == 'CREATE_PETITION'
+        for entry in petition_index.list_petitions()
     }
 
     if not petitions:
@@ -408,14 +450,15 @@ elif menu == "Lihat & Tandatangani Petisi":
         st.markdown("---")
         
         # Reload data untuk yang terbaru
-        chain = load_blockchain()
-        users_db = load_users_db()
+        petition_index = get_petition_index()
+        user_store = get_user_store()
         
         # Bagian Penandatangan
         with st.container(border=True):
             st.markdown("#### ✍️ Daftar Penandatangan")
             
-            signers = [b for b in chain if b['transaction_type'] == 'SIGN_PETITION' and b['transaction_data'].get('petition_id') == petition_id]
+            petition_entry = petition_index.get(petition_id)
+            signers = petition_entry.load_sign_blocks()
 
             if not signers:
                 st.info("Belum ada yang menandatangani petisi ini.", icon="🚶")
@@ -424,12 +467,11 @@ elif menu == "Lihat & Tandatangani Petisi":
                 for block in signers:
                     tx_data = block['transaction_data']
                     signer_username = tx_data['signer_username']
-                    signature = tx_data['signature']
                     
-                    public_key_str = users_db.get(signer_username)
+                    public_key_str = user_store.get(signer_username)
                     if public_key_str:
-                        message_to_verify = petition_text + signer_username
-                        is_valid = verify_signature(message_to_verify, signature, public_key_str)
+                        # Hasil verifikasi blok lama diambil dari memo, hanya blok baru yang diverifikasi
+                        is_valid = verify_block_signature(block, petition_entry, public_key_str)
                         status_icon = "✅ Valid" if is_valid else "❌ Tidak Valid"
                     else:
                         status_icon = "❌ Public Key Tidak Ditemukan"
@@ -449,9 +491,8 @@ elif menu == "Lihat & Tandatangani Petisi":
         
         # Bagian Aksi untuk User
         current_user = st.session_state.username
-        signer_usernames = [s['transaction_data']['signer_username'] for s in signers]
 
-        if current_user in signer_usernames:
+        if petition_index.has_signed(petition_id, current_user):
             st.success("👍 Anda sudah menandatangani petisi ini.", icon="✔️")
         else:
             st.write(f"Anda, **{current_user}**, belum menandatangani petisi ini.")
@@ -464,17 +505,20 @@ elif menu == "Lihat & Tandatangani Petisi":
             
             if st.button(f"Tandatangani Petisi Ini Sekarang!", type="primary", use_container_width=True, key=button_key):
                 private_key = st.session_state.private_key
-                message_to_sign = petition_text + current_user
+                # Pesan v2 memakai digest petisi dari indeks, teks petisi tidak di-hash ulang
+                message_to_sign = signing_message(petition_id, current_user, petition_entry.digest)
                 signature = sign_data(message_to_sign, private_key)
 
                 block_data = {
                     "signer_username": current_user,
                     "petition_id": petition_id,
-                    "signature": signature
+                    "signature": signature,
+                    "signature_scheme": scheme_for_private_key(private_key).name,
+                    "message_version": SIGNING_MESSAGE_VERSION
                 }
 
                 with st.spinner("Menambahkan tanda tangan Anda ke blockchain..."):
-                    success = add_block("SIGN_PETITION", block_data)
+                    success, error_message = submit_transaction("SIGN_PETITION", block_data)
                 
                 if success:
                     st.session_state['just_signed_petition'] = petition_id
@@ -486,7 +530,7 @@ elif menu == "Lihat & Tandatangani Petisi":
                     time.sleep(2)  # Berikan waktu lebih untuk melihat pesan
                     st.rerun()
                 else:
-                    st.error("Gagal menambahkan tanda tangan ke blockchain.")
+                    st.error(f"Gagal menambahkan tanda tangan ke blockchain. {error_message}")
 
 elif menu == "Buat Petisi Baru":
     st.subheader("📝 Buat Petisi Baru")
@@ -500,12 +544,16 @@ elif menu == "Buat Petisi Baru":
                 st.warning("ID dan isi petisi tidak boleh kosong.", icon="⚠️")
             else:
                 with st.spinner("Menambahkan petisi ke blockchain..."):
-                    add_block("CREATE_PETITION", {
+                    success, error_message = submit_transaction("CREATE_PETITION", {
                         "petition_id": petition_id,
                         "petition_text": petition_text,
+                        "petition_digest": petition_digest(petition_text),
                         "creator": st.session_state.username
                     })
-                st.success(f"Petisi '{petition_id}' berhasil ditambahkan ke blockchain!", icon="✅")
+                if success:
+                    st.success(f"Petisi '{petition_id}' berhasil ditambahkan ke blockchain!", icon="✅")
+                else:
+                    st.error(f"Gagal menambahkan petisi ke blockchain. {error_message}", icon="❌")
 
 elif menu == "👤 Profil Saya":
     st.subheader(f"👤 Profil: {st.session_state.username}")
@@ -544,60 +592,103 @@ elif menu == "👤 Profil Saya":
         else:
             st.write(f"Anda telah menandatangani **{len(signed_petitions)}** petisi:")
             
-            # Ambil detail petisi yang ditandatangani
-            chain = load_blockchain()
-            petition_details = {}
-            for block in chain:
-                if block['transaction_type'] == 'CREATE_PETITION':
-                    petition_details[block['transaction_data']['petition_id']] = block['transaction_data']['petition_text']
+            # Ambil detail petisi yang ditandatangani dari indeks petisi
+            petition_index = get_petition_index()
             
             for signed in signed_petitions:
-                petition_text = petition_details.get(signed['petition_id'], 'Teks tidak ditemukan')
+                petition_text = petition_index.get_text(signed['petition_id']) or 'Teks tidak ditemukan'
                 with st.expander(f"✍️ [{signed['petition_id']}] {petition_text[:50]}..."):
                     st.markdown(f"**ID Petisi:** `{signed['petition_id']}`")
                     st.markdown(f"**Ditandatangani pada:** {datetime.fromtimestamp(signed['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}")
                     st.markdown("**Teks Petisi:**")
                     st.text(petition_text)
+                    
+                    # Tanda tangan di dalam blok BATCH bisa dibuktikan tanpa seluruh ledger
+                    if signed['batch_position'] is not None:
+                        proof = get_inclusion_proof(signed['index'], signed['batch_position'])
+                        st.markdown(f"**Tercatat di:** Blok #{signed['index']}, transaksi ke-{signed['batch_position']}")
+                        st.download_button("⬇️ Unduh Bukti Inklusi Merkle", data=json.dumps(proof, indent=2),
+                                           file_name=f"bukti_{signed['petition_id']}_{signed['index']}.json",
+                                           mime="application/json",
+                                           key=f"proof_{signed['index']}_{signed['batch_position']}")
 
 elif menu == "Lihat Blockchain":
     st.subheader("⛓️ Tampilan Detail Blockchain")
     st.info("Setiap 'block' merepresentasikan sebuah transaksi yang tercatat secara permanen. Blok terbaru ditampilkan di paling atas.", icon="ℹ️")
-    chain = load_blockchain()
-
-    # Menampilkan dari blok terbaru
-    for block in reversed(chain):
-        creator_info = block['transaction_data'].get('creator') or block['transaction_data'].get('signer_username', 'N/A')
-        expander_title = f"📦 **Block #{block['index']}** | Tipe: **{block['transaction_type']}** | Oleh: **{creator_info}**"
+    
+    def reset_explorer_page():
+        st.session_state.explorer_page = 1
+    
+    with st.container(border=True):
+        col_type, col_user, col_size = st.columns(3)
+        with col_type:
+            type_options = ["Semua"] + get_block_type_index().types()
+            type_filter = st.selectbox("Tipe transaksi", type_options, on_change=reset_explorer_page)
+        with col_user:
+            user_filter = st.text_input("Username", placeholder="Semua user", on_change=reset_explorer_page,
+                                        help="Tampilkan hanya blok yang dibuat atau ditandatangani user ini.")
+        with col_size:
+            page_size = st.selectbox("Blok per halaman", [10, 20, 50, 100], index=1, on_change=reset_explorer_page)
         
-        with st.expander(expander_title):
-            st.markdown(f"**Timestamp:** `{datetime.fromtimestamp(block['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}`")
-            st.markdown(f"**Hash Block Ini:**")
-            st.code(block['hash'], language='text')
-            st.markdown(f"**Hash Block Sebelumnya:**")
-            st.code(block['previous_hash'], language='text')
-
+        jump_query = st.text_input("Lompat ke blok", placeholder="Index blok atau awalan hash (min. 6 karakter)")
+    
+    transaction_type = None if type_filter == "Semua" else type_filter
+    username = user_filter.strip() or None
+    
+    if jump_query:
+        found_block = find_block(jump_query)
+        if found_block is None:
+            st.warning(f"Blok '{jump_query}' tidak ditemukan.", icon="🔍")
+        else:
+            st.markdown("#### 🎯 Hasil Lompat")
+            render_block(found_block, expanded=True)
+            if not transaction_type and not username and st.session_state.get('explorer_jump') != jump_query:
+                # Halaman di bawah ikut berpindah ke halaman yang memuat blok tersebut
+                st.session_state.explorer_jump = jump_query
+                st.session_state.explorer_page = page_of_block(found_block['index'], page_size)
             st.markdown("---")
-            st.markdown("**Data Transaksi:**")
-            
-            tx_data = block.get('transaction_data')
-            if tx_data:
-                display_data = tx_data.copy()
-                # Memotong signature yang panjang agar tampilan lebih rapi
-                if 'signature' in display_data and isinstance(display_data['signature'], str):
-                    sig = display_data['signature']
-                    display_data['signature'] = f"{sig[:20]}..."
-                st.json(display_data)
-            else:
-                st.write("Tidak ada data transaksi (Genesis Block).")
+    
+    # Hanya blok di halaman ini yang dibaca dari disk, dimulai dari blok terbaru
+    total_blocks = count_explorer_blocks(transaction_type, username)
+    total_pages = max(1, -(-total_blocks // page_size))
+    if st.session_state.get('explorer_page', 1) > total_pages:
+        st.session_state.explorer_page = total_pages
+    page = st.number_input(f"Halaman (dari {total_pages})", min_value=1, max_value=total_pages, key="explorer_page")
+    
+    page_blocks, total_blocks = load_explorer_page(int(page), page_size, transaction_type, username)
+    st.caption(f"Menampilkan {len(page_blocks)} dari {total_blocks} blok")
+    
+    for block in page_blocks:
+        render_block(block)
 
 elif menu == "Validasi Chain":
     st.subheader("✅ Validasi Integritas Blockchain")
     st.write("Proses ini memeriksa apakah struktur hash antar blok masih utuh dan semua tanda tangan digital valid.")
     
+    with st.expander("⚙️ Pengaturan Verifikasi Paralel"):
+        col_workers, col_chunk = st.columns(2)
+        with col_workers:
+            verify_workers = st.number_input("Jumlah worker", min_value=1, max_value=64, value=default_workers(),
+                                             help="Jumlah proses yang memverifikasi tanda tangan secara paralel.")
+        with col_chunk:
+            verify_chunk_size = st.number_input("Ukuran chunk", min_value=1, max_value=10000, value=DEFAULT_CHUNK_SIZE,
+                                                help="Jumlah tanda tangan yang dikirim ke worker dalam satu tugas.")
+        reverify_all = st.checkbox("Audit penuh",
+                                   help="Abaikan checkpoint dan hasil verifikasi tersimpan, lalu periksa ulang seluruh hash blok dan setiap tanda tangan.")
+    
     if st.button("Mulai Validasi", use_container_width=True, type="primary"):
         with st.spinner("Memeriksa integritas dan validitas tanda tangan..."):
-            valid_chain, msg_chain = validate_chain()
-            valid_sig, msg_sig = validate_signatures()
+            valid_chain, msg_chain = validate_chain(full=reverify_all)
+            
+            sig_results, sig_summary = [], None
+            try:
+                sig_results, sig_summary = audit_signatures(workers=int(verify_workers), chunk_size=int(verify_chunk_size),
+                                                           use_memo=not reverify_all)
+                valid_sig, msg_sig = describe_signature_summary(sig_summary)
+            except FileNotFoundError as e:
+                valid_sig, msg_sig = False, str(e)
+            except Exception as e:
+                valid_sig, msg_sig = False, f"Error validasi tanda tangan: {str(e)}"
 
             # Menggunakan st.columns untuk layout berdampingan
             col1, col2 = st.columns(2)
@@ -615,19 +706,40 @@ elif menu == "Validasi Chain":
                     st.success(f"**Status:** {msg_sig}", icon="✅")
                 else:
                     st.error(f"**Status:** {msg_sig}", icon="❌")
+                
+                if sig_summary:
+                    st.caption(f"{sig_summary['workers']} worker, {sig_summary['elapsed_seconds']} detik "
+                               f"({sig_summary['signatures_per_second'] or 0} tanda tangan/detik)")
+            
+            failed_results = [r for r in sig_results if r['status'] != 'valid']
+            if failed_results:
+                st.markdown("#### ❌ Tanda Tangan Bermasalah")
+                df_failed = pd.DataFrame(failed_results)[['index', 'batch_position', 'signer_username', 'petition_id', 'status']]
+                df_failed.columns = ['Blok', 'Posisi Batch', 'Penandatangan', 'ID Petisi', 'Status']
+                st.dataframe(df_failed, use_container_width=True)
 
 elif menu == "📊 Statistik Petisi":
     st.subheader("Statistik dan Analitik Petisi")
     
-    petitions, signers_data = get_petition_stats()
+    petitions, signature_stats = get_petition_stats()
     
     if not petitions:
         st.info("Belum ada petisi untuk ditampilkan statistiknya.", icon="📊")
     else:
         # Statistik Overview
+        df_totals = signature_stats.petition_totals()
+        # Daftar petisi dan agregat tanda tangan dibaca pada refresh yang berbeda,
+        # jadi keduanya dipasangkan lewat petition_id, bukan urutan baris
+        df_petitions = pd.DataFrame({
+            'petition_id': list(petitions),
+            'text': [data['text'] for data in petitions.values()],
+            'creator': [data['creator'] for data in petitions.values()],
+            'created_at': [data['created_at'] for data in petitions.values()],
+        }).merge(df_totals, on='petition_id', how='left')
+        df_petitions['signatures'] = df_petitions['signatures'].fillna(0).astype(int)
         total_petitions = len(petitions)
-        total_signatures = sum(p['signers'] for p in petitions.values())
-        most_popular = max(petitions.items(), key=lambda x: x[1]['signers']) if petitions else None
+        total_signatures = signature_stats.total_signatures
+        most_popular = df_totals.loc[df_totals['signatures'].idxmax()]
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -635,8 +747,7 @@ elif menu == "📊 Statistik Petisi":
         with col2:
             st.metric("Total Tanda Tangan", total_signatures)
         with col3:
-            if most_popular:
-                st.metric("Petisi Terpopuler", f"{most_popular[0]} ({most_popular[1]['signers']} ttd)")
+            st.metric("Petisi Terpopuler", f"{most_popular['petition_id']} ({most_popular['signatures']} ttd)")
         
         st.markdown("---")
         
@@ -645,69 +756,50 @@ elif menu == "📊 Statistik Petisi":
         
         with tab1:
             st.markdown("#### Jumlah Penandatangani per Petisi")
-            if any(p['signers'] for p in petitions.values()):
-                df_data = []
-                for pid, data in petitions.items():
-                    short_title = data['text'][:30] + '...' if len(data['text']) > 30 else data['text']
-                    df_data.append({
-                        "Petisi": f"[{pid}] {short_title}", 
-                        "Jumlah Penandatangani": data['signers']
-                    })
-                
-                df = pd.DataFrame(df_data)
+            if total_signatures:
+                titles = [text[:30] + '...' if len(text) > 30 else text for text in df_petitions['text']]
+                df = pd.DataFrame({
+                    "Petisi": [f"[{pid}] {title}" for pid, title in zip(df_petitions['petition_id'], titles)],
+                    "Jumlah Penandatangani": df_petitions['signatures'].to_numpy()
+                })
                 st.bar_chart(df.set_index("Petisi"))
                 
                 # Tabel detail
                 st.markdown("#### Detail Statistik")
-                detail_data = []
-                for pid, data in petitions.items():
-                    detail_data.append({
-                        "ID Petisi": pid,
-                        "Judul": data['text'][:50] + '...' if len(data['text']) > 50 else data['text'],
-                        "Dibuat oleh": data['creator'],
-                        "Tanggal Dibuat": datetime.fromtimestamp(data['created_at']).strftime('%Y-%m-%d'),
-                        "Jumlah Penandatangani": data['signers']
-                    })
+                detail_data = pd.DataFrame({
+                    "ID Petisi": df_petitions['petition_id'],
+                    "Judul": [text[:50] + '...' if len(text) > 50 else text for text in df_petitions['text']],
+                    "Dibuat oleh": df_petitions['creator'],
+                    "Tanggal Dibuat": [datetime.fromtimestamp(created_at).strftime('%Y-%m-%d')
+                                       for created_at in df_petitions['created_at']],
+                    "Jumlah Penandatangani": df_petitions['signatures'].to_numpy()
+                })
                 
-                st.dataframe(pd.DataFrame(detail_data), use_container_width=True)
+                st.dataframe(detail_data, use_container_width=True)
             else:
                 st.info("Belum ada penandatangan pada petisi manapun.", icon="🚶‍♀️")
         
         with tab2:
             st.markdown("#### Distribusi Penandatangani (Pie Chart)")
-            if any(p['signers'] for p in petitions.values()):
-                pie_data = []
-                for pid, data in petitions.items():
-                    if data['signers'] > 0:  # Hanya tampilkan yang memiliki penandatangan
-                        pie_data.append({
-                            "Petisi": pid,
-                            "Label": pid,  # Hanya ID petisi tanpa deskripsi
-                            "Penandatangani": data['signers']
-                        })
+            if total_signatures:
+                # Hanya tampilkan yang memiliki penandatangan, label hanya ID petisi
+                pie_data = df_totals[df_totals['signatures'] > 0].rename(
+                    columns={'petition_id': 'Label', 'signatures': 'Penandatangani'})
                 
-                if pie_data:
-                    fig = px.pie(
-                        pie_data, 
-                        values='Penandatangani', 
-                        names='Label',
-                        title="Distribusi Penandatangani per Petisi"
-                    )
-                    fig.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("Tidak ada data untuk pie chart karena belum ada penandatangan.", icon="🥧")
+                fig = px.pie(
+                    pie_data, 
+                    values='Penandatangani', 
+                    names='Label',
+                    title="Distribusi Penandatangani per Petisi"
+                )
+                fig.update_traces(textposition='inside', textinfo='percent+label')
+                st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("Belum ada penandatangan untuk ditampilkan dalam pie chart.", icon="🥧")
         
         with tab3:
             st.markdown("#### 📈 Tren Penandatangganan dari Waktu ke Waktu")
-            if signers_data:
-                # Konversi ke DataFrame untuk analisis time series
-                df_time = pd.DataFrame(signers_data)
-                df_time['datetime'] = pd.to_datetime(df_time['timestamp'], unit='s')
-                df_time['date'] = df_time['datetime'].dt.date
-                df_time['time'] = df_time['datetime'].dt.strftime('%H:%M:%S')
-                
+            if total_signatures:
                 # Pilihan agregasi
                 aggregation_option = st.radio(
                     "Pilih tingkat detail:",
@@ -717,8 +809,8 @@ elif menu == "📊 Statistik Petisi":
                 
                 if aggregation_option == "Detail per Tanda Tangan":
                     # Tampilkan setiap tanda tangan individual
-                    df_time_sorted = df_time.sort_values('datetime')
-                    df_time_sorted['cumulative'] = range(1, len(df_time_sorted) + 1)
+                    df_time_sorted = get_signature_details().sort_values('datetime', kind='stable')
+                    df_time_sorted['cumulative'] = np.arange(1, len(df_time_sorted) + 1)
                     
                     fig = go.Figure()
                     
@@ -749,15 +841,13 @@ elif menu == "📊 Statistik Petisi":
                     st.dataframe(detail_table.sort_values('Waktu', ascending=False), use_container_width=True)
                 
                 elif aggregation_option == "Per Jam":
-                    # Aggregate by hour
-                    df_time['hour'] = df_time['datetime'].dt.floor('H')
-                    hourly_signatures = df_time.groupby('hour').size().reset_index(name='signatures')
-                    hourly_signatures['cumulative'] = hourly_signatures['signatures'].cumsum()
+                    # Agregat per jam sudah dihitung saat blok ditambahkan
+                    hourly_signatures = signature_stats.hourly()
                     
                     fig = go.Figure()
                     
                     fig.add_trace(go.Scatter(
-                        x=hourly_signatures['hour'],
+                        x=hourly_signatures['time'],
                         y=hourly_signatures['signatures'],
                         mode='lines+markers',
                         name='Tanda Tangan per Jam',
@@ -765,7 +855,7 @@ elif menu == "📊 Statistik Petisi":
                     ))
                     
                     fig.add_trace(go.Scatter(
-                        x=hourly_signatures['hour'],
+                        x=hourly_signatures['time'],
                         y=hourly_signatures['cumulative'],
                         mode='lines+markers',
                         name='Kumulatif Tanda Tangan',
@@ -789,19 +879,21 @@ elif menu == "📊 Statistik Petisi":
                     
                     # Tabel aktivitas per jam
                     st.markdown("#### ⏰ Aktivitas per Jam")
-                    hourly_signatures['hour'] = hourly_signatures['hour'].dt.strftime('%Y-%m-%d %H:%M')
-                    hourly_signatures.columns = ['Jam', 'Tanda Tangan Baru', 'Total Kumulatif']
-                    st.dataframe(hourly_signatures.sort_values('Jam', ascending=False), use_container_width=True)
+                    hourly_display = hourly_signatures.copy()
+                    hourly_display['time'] = hourly_display['time'].dt.strftime('%Y-%m-%d %H:%M')
+                    hourly_display.columns = ['Jam', 'Tanda Tangan Baru', 'Total Kumulatif']
+                    st.dataframe(hourly_display.sort_values('Jam', ascending=False), use_container_width=True)
                 
                 else:  # Per Hari
-                    # Aggregate by date (existing code)
-                    daily_signatures = df_time.groupby('date').size().reset_index(name='signatures')
-                    daily_signatures['cumulative'] = daily_signatures['signatures'].cumsum()
+                    # Agregat per hari (semua petisi atau satu petisi) sudah dihitung saat blok ditambahkan
+                    petition_filter = st.selectbox("Petisi:", ["Semua Petisi"] + list(petitions))
+                    daily_signatures = signature_stats.daily(
+                        None if petition_filter == "Semua Petisi" else petition_filter)
                     
                     fig = go.Figure()
                     
                     fig.add_trace(go.Scatter(
-                        x=daily_signatures['date'],
+                        x=daily_signatures['time'],
                         y=daily_signatures['signatures'],
                         mode='lines+markers',
                         name='Tanda Tangan Harian',
@@ -809,7 +901,7 @@ elif menu == "📊 Statistik Petisi":
                     ))
                     
                     fig.add_trace(go.Scatter(
-                        x=daily_signatures['date'],
+                        x=daily_signatures['time'],
                         y=daily_signatures['cumulative'],
                         mode='lines+markers',
                         name='Kumulatif Tanda Tangan',
@@ -834,8 +926,73 @@ elif menu == "📊 Statistik Petisi":
                     # Tabel aktivitas harian
                     st.markdown("#### 📅 Aktivitas Harian")
                     daily_signatures_display = daily_signatures.copy()
-                    daily_signatures_display['date'] = daily_signatures_display['date'].astype(str)
+                    daily_signatures_display['time'] = daily_signatures_display['time'].dt.strftime('%Y-%m-%d')
                     daily_signatures_display.columns = ['Tanggal', 'Tanda Tangan Baru', 'Total Kumulatif']
                     st.dataframe(daily_signatures_display.sort_values('Tanggal', ascending=False), use_container_width=True)
             else:
-                st.info("Belum ada data tanda tangan untuk analisis tren waktu.", icon="📈")
\ No newline at end of file
+                st.info("Belum ada data tanda tangan untuk analisis tren waktu.", icon="📈")
+
+elif menu == DIAGNOSTICS_MENU:
+    st.subheader("🩺 Diagnostik Kinerja")
+    metrics = get_metrics()
+
+    metrics_enabled = st.toggle("Aktifkan metrik", value=metrics.enabled,
+                                help=f"Berlaku untuk proses aplikasi ini. Bisa juga diaktifkan sejak start dengan {METRICS_ENV}=1.")
+    if metrics_enabled and not metrics.enabled:
+        metrics.enable()
+    elif not metrics_enabled and metrics.enabled:
+        metrics.disable()
+    if not metrics.enabled:
+        st.info("Metrik tidak aktif: timer dan counter tidak dicatat. Gauge cache tetap ditampilkan.", icon="⏸️")
+
+    data = metrics.snapshot()
+    st.caption(f"Metrik proses aplikasi ini, dikumpulkan selama {data['uptime_seconds']:.0f} detik.")
+
+    st.markdown("#### ⏱️ Timer")
+    if data['timers']:
+        df_timers = pd.DataFrame([
+            {
+                "Nama": name,
+                "Jumlah": timer['count'],
+                "Total (ms)": timer['sum_seconds'] * 1000,
+                "Rata-rata (ms)": timer['sum_seconds'] / timer['count'] * 1000 if timer['count'] else None,
+                "Maks (ms)": timer['max_seconds'] * 1000,
+                "Per Detik": timer['count'] / timer['sum_seconds'] if timer['sum_seconds'] else None,
+            }
+            for name, timer in sorted(data['timers'].items())
+        ])
+        st.dataframe(df_timers, use_container_width=True, hide_index=True)
+    else:
+        st.write("Belum ada pengukuran.")
+
+    col_counters, col_gauges = st.columns(2)
+    with col_counters:
+        st.markdown("#### 🔢 Counter")
+        df_counters = pd.DataFrame(sorted(data['counters'].items()), columns=["Nama", "Nilai"])
+        st.dataframe(df_counters, use_container_width=True, hide_index=True)
+    with col_gauges:
+        st.markdown("#### 📏 Gauge")
+        df_gauges = pd.DataFrame(sorted(data['gauges'].items()), columns=["Nama", "Nilai"])
+        st.dataframe(df_gauges, use_container_width=True, hide_index=True)
+
+    prometheus_text = metrics.render_prometheus()
+    col_reset, col_dump, col_download = st.columns(3)
+    with col_reset:
+        if st.button("Reset Metrik", use_container_width=True):
+            metrics.reset()
+            st.rerun()
+    with col_dump:
+        if st.button(f"Simpan ke {METRICS_FILE}", use_container_width=True):
+            st.success(f"Metrik ditulis ke {metrics.dump()}", icon="💾")
+    with col_download:
+        st.download_button("Unduh Format Prometheus", prometheus_text, file_name=METRICS_FILE,
+                           mime="text/plain", use_container_width=True)
+
+    with st.expander("Format teks Prometheus"):
+        st.code(prometheus_text, language="text")
+
+    with st.expander("Metrik daemon ledger"):
+        try:
+            st.code(request_metrics(), language="text")
+        except (LedgerUnavailable, LedgerRequestFailed) as e:
+            st.caption(f"Daemon ledger tidak tersedia: {e}")
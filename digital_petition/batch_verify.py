@@ -0,0 +1,136 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def default_workers():
+    """Jumlah worker bawaan: satu per core CPU"""
+    return os.cpu_count() or 1
+
+
+def _verify_chunk(chunk):
+    """Memverifikasi satu potongan tugas (dijalankan di proses worker)"""
+    from crypto_utils import verify_signature
+
+    return [verify_signature(message, signature, public_key_str, scheme)
+            for message, signature, public_key_str, scheme in chunk]
+
+
+def _chunked(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _merge_chunk(chunk, verdicts):
+    verdicts = iter(verdicts)
+    for context, task in chunk:
+        yield context, (next(verdicts) if task is not None else None)
+
+
+def verify_stream(items, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Memverifikasi tanda tangan dari iterator secara paralel dengan memori terbatas.
+
+    items adalah iterable (context, task) dengan task berupa tuple
+    (message, signature, public_key_str, scheme), atau None jika item tidak perlu
+    diverifikasi. Menghasilkan (context, verdict) dengan urutan yang sama seperti
+    input; verdict bernilai None untuk task None. Hanya beberapa chunk yang
+    diproses bersamaan, sehingga input boleh lebih besar dari RAM. Dengan
+    workers=1 semua verifikasi dijalankan di proses ini tanpa membuat pool.
+    """
+    workers = workers or default_workers()
+    chunks = _chunked(items, max(1, chunk_size))
+
+    if workers == 1:
+        for chunk in chunks:
+            tasks = [task for _, task in chunk if task is not None]
+            yield from _merge_chunk(chunk, _verify_chunk(tasks))
+        return
+
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            tasks = [task for _, task in chunk if task is not None]
+            in_flight.append((chunk, executor.submit(_verify_chunk, tasks)))
+            if len(in_flight) >= max_in_flight:
+                done_chunk, future = in_flight.popleft()
+                yield from _merge_chunk(done_chunk, future.result())
+        while in_flight:
+            done_chunk, future = in_flight.popleft()
+            yield from _merge_chunk(done_chunk, future.result())
+
+
+def verify_batch(tasks, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Memverifikasi list tuple (message, signature, public_key_str, scheme) secara paralel.
+
+    Mengembalikan list boolean dengan urutan yang sama seperti tasks.
+    """
+    return [verdict for _, verdict in verify_stream(((None, task) for task in tasks),
+                                                    workers, chunk_size)]
+
+
+def new_summary(workers, chunk_size):
+    """Membuat ringkasan audit kosong"""
+    return {
+        "total": 0,
+        "valid": 0,
+        "invalid": 0,
+        "missing_petition": 0,
+        "missing_public_key": 0,
+        "memo_hits": 0,
+        "workers": workers,
+        "chunk_size": chunk_size,
+    }
+
+
+def finish_summary(summary, elapsed):
+    """Melengkapi ringkasan audit dengan waktu dan throughput"""
+    summary["elapsed_seconds"] = round(elapsed, 4)
+    summary["signatures_per_second"] = (
+        round(summary["total"] / elapsed, 1) if elapsed > 0 else None
+    )
+    return summary
+
+
+def main():
+    import argparse
+    import json
+
+    from blockchain_utils import audit_signatures
+
+    parser = argparse.ArgumentParser(description="Verifikasi seluruh tanda tangan di blockchain secara paralel")
+    parser.add_argument('--workers', type=int, default=default_workers())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--no-memo', action='store_true', help="Abaikan hasil verifikasi tersimpan")
+    parser.add_argument('--json', action='store_true', help="Cetak hasil per blok dan ringkasan dalam format JSON")
+    args = parser.parse_args()
+
+    try:
+        results, summary = audit_signatures(workers=args.workers, chunk_size=args.chunk_size,
+                                            use_memo=not args.no_memo)
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+
+    if args.json:
+        print(json.dumps({"summary": summary, "results": results}, indent=2))
+    else:
+        print(f"{summary['valid']}/{summary['total']} tanda tangan valid "
+              f"({summary['elapsed_seconds']:.2f} detik, {summary['workers']} worker)")
+        for result in results:
+            if result['status'] != 'valid':
+                print(f"  blok {result['index']}: {result['signer_username']} -> "
+                      f"{result['petition_id']} [{result['status']}]")
+    return 0 if summary['valid'] == summary['total'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""Benchmark hash_block: JSON lama (versi 1) vs encoding biner kanonik (versi 2).
+
+Jalankan dari folder digital_petition:
+
+    python benchmarks/bench_hash.py [--blocks 50000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block_encoding import CANONICAL_HASH_VERSION  # noqa: E402
+from blockchain_utils import hash_block, hash_block_legacy  # noqa: E402
+
+
+def make_blocks(count, version=None):
+    blocks = []
+    for i in range(count):
+        if i % 10 == 0:
+            tx_type = "CREATE_PETITION"
+            tx_data = {"petition_id": f"petisi-{i}", "petition_text": "Teks petisi " * 20, "creator": f"user{i}"}
+        else:
+            tx_type = "SIGN_PETITION"
+            tx_data = {"signer_username": f"user{i}", "petition_id": f"petisi-{i - i % 10}", "signature": "A" * 344}
+        block = {
+            "index": i,
+            "timestamp": 1750000000.0 + i * 0.123,
+            "transaction_type": tx_type,
+            "transaction_data": tx_data,
+            "previous_hash": "f" * 64,
+            "hash": "",
+        }
+        if version is not None:
+            block["version"] = version
+        blocks.append(block)
+    return blocks
+
+
+def measure(hash_function, blocks, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            hash_function(block)
+        best = min(best, time.perf_counter() - start)
+    return len(blocks) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blocks', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_blocks = make_blocks(args.blocks)
+    canonical_blocks = make_blocks(args.blocks, CANONICAL_HASH_VERSION)
+
+    legacy_rate = measure(hash_block_legacy, legacy_blocks, args.repeat)
+    canonical_rate = measure(hash_block, canonical_blocks, args.repeat)
+
+    print(f"{args.blocks} blok, terbaik dari {args.repeat} percobaan")
+    print(f"  JSON (versi 1)    : {legacy_rate:12,.0f} blok/detik")
+    print(f"  kanonik (versi 2) : {canonical_rate:12,.0f} blok/detik ({canonical_rate / legacy_rate:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Stress test penulisan konkuren: banyak proses x banyak thread memanggil add_block.
+
+Dijalankan di folder sementara (chain asli tidak disentuh). Setelah selesai,
+skrip memeriksa bahwa tidak ada tanda tangan yang hilang atau ganda, index
+blok berurutan, dan seluruh rantai hash valid.
+
+    python benchmarks/stress_append.py [--processes 4] [--threads 8] [--per-thread 64]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def _worker(args):
+    work_dir, process_no, threads, per_thread = args
+    os.chdir(work_dir)
+    from blockchain_utils import add_block
+
+    def sign_many(thread_no):
+        failures = 0
+        for i in range(per_thread):
+            ok = add_block("SIGN_PETITION", {
+                "signer_username": f"p{process_no}-t{thread_no}-{i}",
+                "petition_id": "stress-test",
+                "signature": "c3RyZXNz",
+            })
+            failures += not ok
+        return failures
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return sum(executor.map(sign_many, range(threads)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--per-thread', type=int, default=64)
+    args = parser.parse_args()
+
+    expected = args.processes * args.threads * args.per_thread
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        import chain_store
+        from blockchain_utils import add_block, validate_chain
+
+        add_block("CREATE_PETITION", {"petition_id": "stress-test", "petition_text": "stress", "creator": "stress"})
+
+        start = time.perf_counter()
+        jobs = [(work_dir, p, args.threads, args.per_thread) for p in range(args.processes)]
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            failures = sum(executor.map(_worker, jobs))
+        elapsed = time.perf_counter() - start
+
+        blocks = list(chain_store.iter_blocks())
+        signers = [b['transaction_data']['signer_username'] for b in blocks
+                   if b['transaction_type'] == 'SIGN_PETITION']
+        indexes_ok = all(block['index'] == i for i, block in enumerate(blocks))
+        chain_ok, chain_message = validate_chain(full=True)
+
+        print(f"{expected} tanda tangan dari {args.processes} proses x {args.threads} thread "
+              f"dalam {elapsed:.2f} detik ({expected / elapsed:,.0f}/detik)")
+        print(f"  gagal add_block   : {failures}")
+        print(f"  tersimpan         : {len(signers)} (unik: {len(set(signers))})")
+        print(f"  index berurutan   : {indexes_ok}")
+        print(f"  validasi chain    : {chain_message}")
+
+        ok = (failures == 0 and len(signers) == expected and len(set(signers)) == expected
+              and indexes_ok and chain_ok)
+        print("LULUS" if ok else "GAGAL")
+        os.chdir(APP_DIR)
+        return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
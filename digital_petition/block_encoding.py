@@ -0,0 +1,117 @@
+import struct
+
+# Versi format hash blok. Blok tanpa field "version" memakai hash JSON lama (versi 1).
+LEGACY_HASH_VERSION = 1
+CANONICAL_HASH_VERSION = 2
+
+_MAGIC = b'PBLK'
+_U32 = struct.Struct('>I')
+_F64 = struct.Struct('>d')
+_HEADER = struct.Struct('>4sBqd')
+_HEADER_FIELDS = frozenset(('version', 'index', 'timestamp', 'transaction_type',
+                            'transaction_data', 'previous_hash', 'hash'))
+
+
+def _encode_str(value, out):
+    data = value.encode('utf-8')
+    out.append(b'S' + _U32.pack(len(data)))
+    out.append(data)
+
+
+def _encode_int(value, out):
+    data = value.to_bytes((value.bit_length() + 8) // 8 or 1, 'big', signed=True)
+    out.append(b'I' + _U32.pack(len(data)))
+    out.append(data)
+
+
+def _encode_float(value, out):
+    out.append(b'D' + _F64.pack(value))
+
+
+def _encode_bool(value, out):
+    out.append(b'T' if value else b'F')
+
+
+def _encode_none(value, out):
+    out.append(b'N')
+
+
+def _encode_list(value, out):
+    out.append(b'L' + _U32.pack(len(value)))
+    for item in value:
+        _ENCODERS[type(item)](item, out)
+
+
+# Prefix key (panjang + byte UTF-8) di-cache karena nama field blok selalu sama
+_key_prefixes = {}
+
+
+def _key_prefix(key):
+    prefix = _key_prefixes.get(key)
+    if prefix is None:
+        data = key.encode('utf-8')
+        prefix = _U32.pack(len(data)) + data
+        if len(_key_prefixes) < 1024:
+            _key_prefixes[key] = prefix
+    return prefix
+
+
+def _encode_dict(value, out):
+    out.append(b'M' + _U32.pack(len(value)))
+    for key in sorted(value):
+        out.append(_key_prefix(key))
+        item = value[key]
+        _ENCODERS[type(item)](item, out)
+
+
+_ENCODERS = {
+    str: _encode_str,
+    int: _encode_int,
+    float: _encode_float,
+    bool: _encode_bool,
+    type(None): _encode_none,
+    list: _encode_list,
+    tuple: _encode_list,
+    dict: _encode_dict,
+}
+
+_EMPTY_MAP = b'M' + _U32.pack(0)
+
+
+def encode_value(value):
+    """Encoding kanonik (bertipe dan berawalan panjang) untuk nilai JSON apa pun"""
+    out = []
+    try:
+        _ENCODERS[type(value)](value, out)
+    except KeyError as e:
+        raise TypeError(f"Tipe tidak didukung dalam encoding blok: {e}") from None
+    return b''.join(out)
+
+
+def encode_block(block):
+    """Encoding kanonik sebuah blok (tanpa field "hash") untuk dihitung hash-nya.
+
+    Layout: header tetap (b'PBLK', versi, index int64, timestamp float64),
+    lalu transaction_type dan previous_hash berawalan panjang, map
+    transaction_data, dan map field tambahan lain (kosong untuk blok biasa).
+    Semua string dan container diawali panjangnya dan key map diurutkan,
+    sehingga encoding tidak ambigu dan tidak bergantung pada format JSON Python.
+    """
+    tx_type = block['transaction_type'].encode('utf-8')
+    previous_hash = block['previous_hash'].encode('utf-8')
+    out = [
+        _HEADER.pack(_MAGIC, block.get('version', CANONICAL_HASH_VERSION),
+                     block['index'], block['timestamp']),
+        _U32.pack(len(tx_type)), tx_type,
+        _U32.pack(len(previous_hash)), previous_hash,
+    ]
+    try:
+        _encode_dict(block['transaction_data'], out)
+        if _HEADER_FIELDS.issuperset(block):
+            out.append(_EMPTY_MAP)
+        else:
+            _encode_dict({key: value for key, value in block.items()
+                          if key not in _HEADER_FIELDS}, out)
+    except KeyError as e:
+        raise TypeError(f"Tipe tidak didukung dalam encoding blok: {e}") from None
+    return b''.join(out)
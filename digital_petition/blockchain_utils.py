@@ -3,51 +3,93 @@ import hashlib
 import time
 import os
 
-BLOCKCHAIN_FILE = 'blockchain.json'
+import chain_store
+from block_encoding import CANONICAL_HASH_VERSION, LEGACY_HASH_VERSION, encode_block
+from chain_cache import get_chain_cache
+from chain_writer import GroupCommitWriter
+from metrics import get_metrics
+from merkle import (BATCH_TRANSACTION_TYPE, batch_header, batch_leaf_hashes, merkle_proof,
+                    merkle_root, root_from_proof, transaction_at, transaction_leaf_hash)
 
-def load_blockchain():
-    """Memuat blockchain dari file atau membuat genesis block"""
-    if not os.path.exists(BLOCKCHAIN_FILE):
-        # Buat genesis block
-        genesis_block = {
-            "index": 0,
-            "timestamp": time.time(),
-            "transaction_type": "GENESIS",
-            "transaction_data": {"message": "Genesis Block"},
-            "previous_hash": "0",
-            "hash": ""
-        }
-        genesis_block['hash'] = hash_block(genesis_block)
-        
-        # Simpan ke file
-        with open(BLOCKCHAIN_FILE, 'w') as f:
-            json.dump([genesis_block], f, indent=2)
-        
-        return [genesis_block]
+VALIDATION_CHECKPOINT_FILE = 'validation_checkpoint.json'
+
+_metrics = get_metrics()
+_metrics.describe('add_block', "Latensi add_block: antre, tulis, dan refresh cache")
+_metrics.describe('add_block_errors', "add_block yang gagal (blok tidak tertulis); dihitung oleh timer add_block")
+_metrics.describe('add_batch', "Latensi add_batch: tulis blok BATCH dan refresh cache")
+_metrics.describe('add_batch_errors', "add_batch yang gagal (blok BATCH tidak tertulis); dihitung oleh timer add_batch")
+_metrics.describe('chain_validate', "Durasi validasi hash chain (inkremental atau penuh)")
+_metrics.describe('block_hash', "Waktu hash ulang blok saat validasi chain (count = jumlah blok)")
+_metrics.describe('signature_audit', "Waktu audit tanda tangan (count = tanda tangan yang diverifikasi)")
+
+def create_genesis_block():
+    """Membuat genesis block"""
+    genesis_block = {
+        "version": CANONICAL_HASH_VERSION,
+        "index": 0,
+        "timestamp": time.time(),
+        "transaction_type": "GENESIS",
+        "transaction_data": {"message": "Genesis Block"},
+        "previous_hash": "0",
+        "hash": ""
+    }
+    genesis_block['hash'] = hash_block(genesis_block)
+    return genesis_block
+
+def build_block(transaction_type, transaction_data, last_block):
+    """Membuat blok baru yang tertaut ke last_block"""
+    new_block = {
+        "version": CANONICAL_HASH_VERSION,
+        "index": last_block['index'] + 1 if last_block else 0,
+        "timestamp": time.time(),
+        "transaction_type": transaction_type,
+        "transaction_data": transaction_data,
+        "previous_hash": last_block['hash'] if last_block else "0",
+        "hash": ""
+    }
     
-    try:
-        with open(BLOCKCHAIN_FILE, 'r') as f:
-            chain = json.load(f)
-            return chain if chain else []
-    except (json.JSONDecodeError, FileNotFoundError):
-        # Jika file corrupt, buat ulang genesis block
-        genesis_block = {
-            "index": 0,
-            "timestamp": time.time(),
-            "transaction_type": "GENESIS",
-            "transaction_data": {"message": "Genesis Block"},
-            "previous_hash": "0",
-            "hash": ""
-        }
-        genesis_block['hash'] = hash_block(genesis_block)
-        
-        with open(BLOCKCHAIN_FILE, 'w') as f:
-            json.dump([genesis_block], f, indent=2)
-        
-        return [genesis_block]
+    # Membuat hash untuk blok baru
+    new_block['hash'] = hash_block(new_block)
+    return new_block
 
-def hash_block(block):
-    """Membuat hash untuk sebuah blok"""
+def build_batch_block(transactions, last_block):
+    """Membuat satu blok BATCH berisi banyak transaksi di bawah satu Merkle root
+
+    transactions adalah list (transaction_type, transaction_data). Hash blok
+    dihitung dari header (termasuk Merkle root), bukan dari seluruh transaksi.
+    """
+    batch = [{"transaction_type": tx_type, "transaction_data": tx_data}
+             for tx_type, tx_data in transactions]
+    leaf_hashes = [transaction_leaf_hash(tx_type, tx_data) for tx_type, tx_data in transactions]
+    return build_block(BATCH_TRANSACTION_TYPE, {
+        "merkle_root": merkle_root(leaf_hashes),
+        "transaction_count": len(batch),
+        "transactions": batch,
+    }, last_block)
+
+_chain_writer = GroupCommitWriter(build_block, create_genesis_block, build_batch_block)
+
+def get_chain_writer():
+    """Mengembalikan penulis log blok (group commit) untuk proses ini"""
+    return _chain_writer
+
+def ensure_chain_store():
+    """Menyiapkan log blok: migrasi dari blockchain.json atau membuat genesis block"""
+    if chain_store.store_exists():
+        return
+    # Dijalankan di bawah lock agar hanya satu proses yang membuat genesis block
+    _chain_writer.write_batch([])
+
+def load_blockchain():
+    """Memuat blockchain dari cache (hanya blok baru yang dibaca dari log)
+
+    List yang dikembalikan dipakai bersama oleh semua sesi, jangan diubah.
+    """
+    ensure_chain_store()
+    return get_chain_cache().get_blocks()
+
+def hash_block_legacy(block):
+    """Hash versi 1: SHA-256 dari JSON blok (sort_keys) tanpa field hash"""
     # Membuat copy block tanpa hash untuk di-hash
     block_copy = block.copy()
     if 'hash' in block_copy:
@@ -56,126 +98,339 @@ def hash_block(block):
     block_string = json.dumps(block_copy, sort_keys=True)
     return hashlib.sha256(block_string.encode()).hexdigest()
 
+def hash_block(block):
+    """Membuat hash untuk sebuah blok
+
+    Blok baru (field "version" >= 2) di-hash dari encoding biner kanonik di
+    block_encoding; blok lama tanpa field "version" tetap memakai hash JSON.
+    """
+    if block.get('version', LEGACY_HASH_VERSION) >= CANONICAL_HASH_VERSION:
+        if block['transaction_type'] == BATCH_TRANSACTION_TYPE:
+            block = batch_header(block)
+        return hashlib.sha256(encode_block(block)).hexdigest()
+    return hash_block_legacy(block)
+
 def add_block(transaction_type, transaction_data):
-    """Menambahkan blok baru ke blockchain"""
+    """Menambahkan blok baru ke blockchain
+
+    Blok diantrekan ke penulis group commit, yang menautkan dan menulisnya di
+    bawah lock antarproses bersama blok lain yang datang bersamaan.
+    """
     try:
-        # Load blockchain current
-        chain = load_blockchain()
-        
-        # Membuat blok baru
-        new_block = {
-            "index": len(chain),
-            "timestamp": time.time(),
-            "transaction_type": transaction_type,
-            "transaction_data": transaction_data,
-            "previous_hash": chain[-1]['hash'] if chain else "0",
-            "hash": ""
-        }
-        
-        # Membuat hash untuk blok baru
-        new_block['hash'] = hash_block(new_block)
-        
-        # Menambahkan ke chain
-        chain.append(new_block)
-        
-        # Menyimpan ke file dengan backup
-        try:
-            # Backup file lama jika ada
-            if os.path.exists(BLOCKCHAIN_FILE):
-                backup_file = f"{BLOCKCHAIN_FILE}.backup"
-                with open(BLOCKCHAIN_FILE, 'r') as f_old:
-                    old_data = f_old.read()
-                with open(backup_file, 'w') as f_backup:
-                    f_backup.write(old_data)
+        with _metrics.timer('add_block'):
+            _chain_writer.submit(transaction_type, transaction_data).result()
             
-            # Simpan data baru
-            with open(BLOCKCHAIN_FILE, 'w') as f:
-                json.dump(chain, f, indent=2)
-            
-            # Verifikasi data tersimpan
-            with open(BLOCKCHAIN_FILE, 'r') as f:
-                saved_chain = json.load(f)
-                
-            return True
-            
-        except Exception as save_error:
-            return False
+            # Memperbarui cache dan indeks turunan dengan blok baru saja
+            get_chain_cache().refresh()
+            from user_index import get_user_index
+            get_user_index()
+        return True
         
-    except Exception as e:
+    except Exception:
         import traceback
         traceback.print_exc()
         return False
 
-def validate_chain():
-    """Memvalidasi integritas hash blockchain"""
+def add_batch(transactions):
+    """Menambahkan banyak transaksi sebagai satu blok BATCH; mengembalikan blok atau None"""
     try:
-        chain = load_blockchain()
-        
-        for i in range(1, len(chain)):
-            current_block = chain[i]
-            previous_block = chain[i-1]
-            
-            # Cek hash block sebelumnya
-            if current_block['previous_hash'] != previous_block['hash']:
-                return False, f"Hash tidak valid pada blok {i}"
-            
-            # Cek hash block saat ini
-            expected_hash = hash_block(current_block)
-            if current_block['hash'] != expected_hash:
-                return False, f"Hash blok {i} tidak sesuai"
-        
-        return True, f"Blockchain valid dengan {len(chain)} blok"
+        with _metrics.timer('add_batch'):
+            block = _chain_writer.write_batch(list(transactions), as_merkle_batch=True)[0][0]
+            get_chain_cache().refresh()
+            from user_index import get_user_index
+            get_user_index()
+        return block
     
-    except Exception as e:
-        return False, f"Error validasi: {str(e)}"
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        return None
+
+def check_batch_block(block):
+    """Mengecek bahwa daftar transaksi blok BATCH cocok dengan Merkle root di header"""
+    tx_data = block['transaction_data']
+    transactions = tx_data.get('transactions')
+    if not transactions or len(transactions) != tx_data.get('transaction_count'):
+        return False
+    return merkle_root(batch_leaf_hashes(block)) == tx_data.get('merkle_root')
+
+def get_inclusion_proof(block_index, position):
+    """Membuat bukti inklusi Merkle untuk transaksi ke-position di blok BATCH block_index
 
-def validate_signatures():
-    """Memvalidasi semua tanda tangan digital dalam blockchain"""
+    Bukti berisi header blok (tanpa daftar transaksi), transaksinya, dan hash
+    saudara dari daun ke root. Ukurannya O(log n) terhadap isi batch.
+    """
+    ensure_chain_store()
+    block = chain_store.read_block(block_index)
+    if block is None:
+        raise IndexError(f"Blok {block_index} tidak ada")
+    if block['transaction_type'] != BATCH_TRANSACTION_TYPE:
+        raise ValueError(f"Blok {block_index} bukan blok BATCH")
+    
+    transaction = transaction_at(block, position)
+    return {
+        "block_header": batch_header(block),
+        "batch_position": position,
+        "transaction": {"transaction_type": transaction['transaction_type'],
+                        "transaction_data": transaction['transaction_data']},
+        "proof": merkle_proof(batch_leaf_hashes(block), position),
+    }
+
+def verify_inclusion_proof(proof, trusted_block_hash):
+    """Memverifikasi bukti inklusi tanpa membaca ledger
+
+    Transaksi di-hash menjadi daun, dinaikkan ke root dengan hash saudara, lalu
+    dicocokkan dengan Merkle root di header; header di-hash ulang dan dicocokkan
+    dengan hash blok yang dipercaya. trusted_block_hash wajib dan harus berasal
+    dari sumber yang dipercaya pemeriksa (misalnya salinan chain sendiri),
+    karena header di dalam bukti bisa saja dibuat-buat.
+    """
     try:
-        from crypto_utils import verify_signature
-        
-        chain = load_blockchain()
-        
-        # Load users database
-        users_file = 'users.json'
-        if os.path.exists(users_file):
-            with open(users_file, 'r') as f:
-                users_db = json.load(f)
-        else:
-            return False, "Database pengguna tidak ditemukan"
+        header = proof['block_header']
+        transaction = proof['transaction']
+        leaf_hash = transaction_leaf_hash(transaction['transaction_type'], transaction['transaction_data'])
+        if root_from_proof(leaf_hash, proof['proof']) != header['transaction_data']['merkle_root']:
+            return False, "Merkle root tidak cocok dengan transaksi"
+        if hash_block(header) != header['hash']:
+            return False, "Hash header blok tidak sesuai"
+        if header['hash'] != trusted_block_hash:
+            return False, "Hash blok berbeda dengan hash yang dipercaya"
+        return True, f"Transaksi tercatat di blok {header['index']}"
+    except (KeyError, TypeError, ValueError) as e:
+        return False, f"Bukti inklusi tidak valid: {str(e)}"
+
+def load_validation_checkpoint():
+    """Memuat checkpoint validasi terakhir ({"index", "hash", "offset"}) atau None"""
+    if not os.path.exists(VALIDATION_CHECKPOINT_FILE):
+        return None
+    try:
+        with open(VALIDATION_CHECKPOINT_FILE, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+def save_validation_checkpoint(block, offset):
+    """Menyimpan blok terakhir yang sudah tervalidasi (dan offset-nya di log) sebagai checkpoint"""
+    tmp_file = f"{VALIDATION_CHECKPOINT_FILE}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({"index": block['index'], "hash": block['hash'], "offset": offset}, f)
+    os.replace(tmp_file, VALIDATION_CHECKPOINT_FILE)
+
+def _read_checkpoint_block():
+    """Membaca blok checkpoint langsung dari offset-nya jika masih cocok dengan chain
+
+    Mengembalikan (blok, offset_awal, offset_akhir) atau None.
+    """
+    checkpoint = load_validation_checkpoint()
+    if not checkpoint or 'offset' not in checkpoint:
+        return None
+    try:
+        found = chain_store.read_block_at(checkpoint['offset'])
+    except (OSError, ValueError):
+        return None
+    if found is None:
+        return None
+    block, end = found
+    # Checkpoint hanya dipakai jika blok tersebut masih sama persis
+    if (block.get('index') != checkpoint['index'] or block.get('hash') != checkpoint['hash']
+            or hash_block(block) != block['hash']):
+        return None
+    return block, checkpoint['offset'], end
+
+def validate_chain(full=False):
+    """Memvalidasi integritas hash blockchain
+
+    Blok dibaca secara streaming dari log (memori konstan). Secara default hanya
+    blok setelah checkpoint terakhir yang di-hash ulang; gunakan full=True untuk
+    audit penuh dari blok pertama.
+    """
+    # Waktu hash diukur per blok hanya jika metrik aktif
+    timed = _metrics.enabled
+    validate_start, hash_seconds, checked = time.perf_counter(), 0.0, 0
+    try:
+        ensure_chain_store()
+        previous_block, last_offset, read_from = None, 0, 0
         
-        valid_signatures = 0
-        total_signatures = 0
+        checkpoint = None if full else _read_checkpoint_block()
+        if checkpoint:
+            previous_block, last_offset, read_from = checkpoint
         
-        for block in chain:
-            if block['transaction_type'] == 'SIGN_PETITION':
-                total_signatures += 1
-                tx_data = block['transaction_data']
+        checked = 0
+        for offset, _, current_block in chain_store.iter_blocks_from(read_from):
+            if previous_block is not None:
+                i = current_block['index']
                 
-                signer_username = tx_data['signer_username']
-                signature = tx_data['signature']
-                petition_id = tx_data['petition_id']
+                # Cek hash block sebelumnya
+                if current_block['previous_hash'] != previous_block['hash']:
+                    return False, f"Hash tidak valid pada blok {i}"
                 
-                # Cari teks petisi
-                petition_text = None
-                for b in chain:
-                    if (b['transaction_type'] == 'CREATE_PETITION' and 
-                        b['transaction_data']['petition_id'] == petition_id):
-                        petition_text = b['transaction_data']['petition_text']
-                        break
+                # Cek hash block saat ini
+                if timed:
+                    hash_start = time.perf_counter()
+                    expected_hash = hash_block(current_block)
+                    hash_seconds += time.perf_counter() - hash_start
+                else:
+                    expected_hash = hash_block(current_block)
+                if current_block['hash'] != expected_hash:
+                    return False, f"Hash blok {i} tidak sesuai"
                 
-                if petition_text and signer_username in users_db:
-                    message_to_verify = petition_text + signer_username
-                    public_key_str = users_db[signer_username]
-                    
-                    if verify_signature(message_to_verify, signature, public_key_str):
-                        valid_signatures += 1
+                # Cek isi blok BATCH terhadap Merkle root yang ikut di-hash
+                if (current_block['transaction_type'] == BATCH_TRANSACTION_TYPE
+                        and not check_batch_block(current_block)):
+                    return False, f"Merkle root blok {i} tidak sesuai dengan transaksinya"
+                checked += 1
+            
+            previous_block, last_offset = current_block, offset
+        
+        if previous_block is None:
+            return True, "Blockchain valid dengan 0 blok"
         
-        if total_signatures == 0:
-            return True, "Tidak ada tanda tangan untuk divalidasi"
+        save_validation_checkpoint(previous_block, last_offset)
+        total_blocks = previous_block['index'] + 1
         
-        return (valid_signatures == total_signatures, 
-                f"{valid_signatures}/{total_signatures} tanda tangan valid")
+        if checkpoint:
+            return True, (f"Blockchain valid dengan {total_blocks} blok "
+                          f"({checked} blok baru diperiksa sejak checkpoint)")
+        return True, f"Blockchain valid dengan {total_blocks} blok"
+    
+    except Exception as e:
+        return False, f"Error validasi: {str(e)}"
+    
+    finally:
+        if timed:
+            _metrics.observe('chain_validate', time.perf_counter() - validate_start)
+            _metrics.observe('block_hash', hash_seconds, checked)
+
+def iter_signature_audit(summary, workers=None, chunk_size=None, use_memo=True):
+    """Memverifikasi semua tanda tangan secara streaming, menghasilkan hasil per blok
+
+    Chain dibaca satu kali dari log; yang disimpan di memori hanya teks dan
+    digest petisi serta beberapa chunk yang sedang diverifikasi, jadi audit
+    tetap berjalan untuk chain yang lebih besar dari RAM. Verifikasi (sesuai
+    signature_scheme dan message_version setiap blok) dibagi ke beberapa
+    proses worker (lihat batch_verify). Dengan use_memo, blok yang sudah pernah
+    diverifikasi dengan kunci yang sama memakai hasil tersimpan. summary (dari
+    batch_verify.new_summary) diperbarui selama iterasi.
+    """
+    from batch_verify import verify_stream
+    from crypto_utils import block_signing_message, petition_digest, signature_scheme_of
+    from verification_memo import get_verification_memo, memo_key, record_hash
+    
+    from user_store import get_user_store
+    
+    ensure_chain_store()
+    user_store = get_user_store()
+    memo = get_verification_memo()
+    # petition_id -> (teks, digest); digest dihitung sekali per petisi, bukan per tanda tangan
+    petitions = {}
+    
+    def audit_items():
+        for block in chain_store.stream_transactions():
+            tx_type = block['transaction_type']
+            tx_data = block['transaction_data']
+            
+            if tx_type == 'CREATE_PETITION':
+                # Blok pembuatan pertama yang berlaku, sama seperti indeks petisi
+                if tx_data['petition_id'] not in petitions:
+                    petition_text = tx_data['petition_text']
+                    petitions[tx_data['petition_id']] = (
+                        petition_text, tx_data.get('petition_digest') or petition_digest(petition_text))
+                continue
+            if tx_type != 'SIGN_PETITION':
+                continue
+            
+            signer_username = tx_data['signer_username']
+            petition_id = tx_data['petition_id']
+            result = {
+                "index": block['index'],
+                "batch_position": block.get('batch_position'),
+                "signer_username": signer_username,
+                "petition_id": petition_id,
+                "status": "invalid"
+            }
+            
+            # Petisi selalu dibuat sebelum ditandatangani, jadi teksnya sudah terbaca
+            petition = petitions.get(petition_id)
+            
+            if not petition or not petition[0]:
+                result['status'] = "missing_petition"
+                yield (result, None), None
+                continue
+            
+            public_key_str = user_store.get(signer_username)
+            if public_key_str is None:
+                result['status'] = "missing_public_key"
+                yield (result, None), None
+            else:
+                key = memo_key(record_hash(block), public_key_str)
+                verdict = memo.get(key) if use_memo else None
+                if verdict is not None:
+                    summary['memo_hits'] += 1
+                    result['status'] = "valid" if verdict else "invalid"
+                    yield (result, None), None
+                else:
+                    message_to_verify = block_signing_message(tx_data, *petition)
+                    if message_to_verify is None:
+                        # Versi pesan tidak dikenal: tidak bisa diverifikasi, dicatat tidak valid
+                        yield (result, None), None
+                    else:
+                        yield (result, key), (message_to_verify, tx_data['signature'], public_key_str,
+                                              signature_scheme_of(tx_data))
+    
+    pending_memo = []
+    audit_start, verified = time.perf_counter(), 0
+    for (result, key), verdict in verify_stream(audit_items(), workers, chunk_size):
+        if key is not None:
+            verified += 1
+            if verdict:
+                result['status'] = "valid"
+            pending_memo.append((key, verdict))
+            if len(pending_memo) >= 1000:
+                memo.put_many(pending_memo)
+                pending_memo = []
+        
+        summary['total'] += 1
+        summary[result['status']] += 1
+        yield result
+    
+    memo.put_many(pending_memo)
+    _metrics.observe('signature_audit', time.perf_counter() - audit_start, verified)
+    _metrics.inc('verification_memo_hits', summary['memo_hits'])
+    _metrics.inc('verification_memo_misses', verified)
+
+def audit_signatures(workers=None, chunk_size=None, use_memo=True):
+    """Memverifikasi semua tanda tangan dan mengembalikan hasil per blok beserta ringkasan"""
+    from batch_verify import DEFAULT_CHUNK_SIZE, default_workers, finish_summary, new_summary
+    
+    workers = workers or default_workers()
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    start = time.perf_counter()
+    
+    summary = new_summary(workers, chunk_size)
+    results = list(iter_signature_audit(summary, workers, chunk_size, use_memo))
+    return results, finish_summary(summary, time.perf_counter() - start)
+
+def describe_signature_summary(summary):
+    """Mengubah ringkasan audit tanda tangan menjadi (status, pesan)"""
+    if summary['total'] == 0:
+        return True, "Tidak ada tanda tangan untuk divalidasi"
+    
+    return (summary['valid'] == summary['total'], 
+            f"{summary['valid']}/{summary['total']} tanda tangan valid")
+
+def validate_signatures(workers=None, chunk_size=None, use_memo=True):
+    """Memvalidasi semua tanda tangan digital dalam blockchain (memori konstan)"""
+    from batch_verify import DEFAULT_CHUNK_SIZE, default_workers, new_summary
+    
+    workers = workers or default_workers()
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    try:
+        summary = new_summary(workers, chunk_size)
+        for _ in iter_signature_audit(summary, workers, chunk_size, use_memo):
+            pass
+        return describe_signature_summary(summary)
     
+    except FileNotFoundError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Error validasi tanda tangan: {str(e)}"
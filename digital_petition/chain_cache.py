@@ -0,0 +1,244 @@
+import hashlib
+import threading
+import time
+
+import chain_store
+from metrics import get_metrics
+
+# Jumlah byte di akhir bagian yang sudah dibaca untuk mendeteksi file yang diganti
+TAIL_HASH_BYTES = 4096
+
+_metrics = get_metrics()
+_metrics.describe('chain_refresh', "Durasi refresh cache yang membaca dan mem-parse blok baru dari log")
+_metrics.describe('chain_cache_hits', "Refresh cache tanpa perubahan log (cukup os.stat)")
+_metrics.describe('chain_cache_misses', "Refresh cache yang harus membaca blok baru")
+_metrics.describe('chain_load', "Waktu membaca list blok lengkap dari log (load_blockchain)")
+_metrics.describe('snapshot_load', "Waktu memulihkan state view dari snapshot saat start")
+
+
+def _cache_hit_ratio():
+    hits = _metrics.counter('chain_cache_hits')
+    total = hits + _metrics.counter('chain_cache_misses')
+    return hits / total if total else None
+
+
+_metrics.register_gauge('chain_cache_hit_ratio', _cache_hit_ratio)
+
+
+class ChainCache:
+    """Cache blockchain di memori yang hanya membaca blok baru dari log.
+
+    Cache ini hidup di level modul sehingga dipakai bersama oleh semua rerun dan
+    sesi Streamlit dalam satu proses. Setiap refresh hanya melakukan os.stat;
+    jika file bertambah, hanya baris baru yang di-parse. Jika file diganti
+    (inode berubah, ukuran mengecil, atau hash ekor berbeda) cache dibangun ulang.
+
+    View turunan (indeks petisi, indeks pencarian) bisa dipulihkan dari
+    snapshot state (lihat snapshot.py) sehingga saat start hanya ekor log setelah
+    snapshot yang diputar ulang. List blok lengkap baru dibaca jika diminta
+    lewat get_blocks().
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._views = []
+        self._snapshot_store = None
+        # Bertambah setiap cache dibangun ulang; penyimpan snapshot memakainya
+        # untuk tahu apakah kolom view masih lanjutan dari yang sudah ditulis
+        self.generation = 0
+        self._reset()
+
+    def _reset(self):
+        self.generation += 1
+        # Dibaca dari disk hanya saat dibutuhkan (get_blocks); akses per index
+        # blok memakai indeks offset di chain_store
+        self.blocks = None
+        self.offset = 0
+        self.last_block = None
+        self.last_block_offset = None
+        # Snapshot yang dipakai saat start: (offset, {nama_view: state}) atau None
+        self._snapshot = None
+        self.blocks_since_snapshot = 0
+        self._inode = None
+        self._mtime_ns = None
+        self._size = None
+        self._tail_hash = None
+
+    def _compute_tail_hash(self, offset):
+        start = max(0, offset - TAIL_HASH_BYTES)
+        return hashlib.sha256(chain_store.read_range(start, offset)).hexdigest()
+
+    def _is_replaced(self, stat):
+        if self._inode is None:
+            return False
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            return True
+        return self._compute_tail_hash(self.offset) != self._tail_hash
+
+    def _replay_view(self, view):
+        """Membangun ulang view dari snapshot (jika ada) lalu blok sampai self.offset"""
+        view.reset()
+        start = 0
+        if self._snapshot is not None:
+            snapshot_offset, states = self._snapshot
+            state = states.get(getattr(view, 'snapshot_name', None))
+            if state is not None:
+                view.restore_state(state)
+                start = snapshot_offset
+        if start >= self.offset:
+            return
+        for block_start, _, block in chain_store.iter_blocks_from(start):
+            if block_start >= self.offset:
+                break
+            view.apply_block(block, block_start)
+
+    def _load_snapshot(self):
+        loaded = self._snapshot_store.load(self) if self._snapshot_store else None
+        if loaded is None:
+            return
+        self._snapshot = (loaded['offset'], loaded['states'])
+        self.offset = loaded['offset']
+        self.last_block = loaded['last_block']
+        self.last_block_offset = loaded['last_block_offset']
+        try:
+            for view in self._views:
+                self._replay_view(view)
+        except (KeyError, TypeError, ValueError):
+            # State di snapshot tidak cocok dengan bentuk state view saat ini:
+            # snapshot diabaikan dan seluruh log diputar ulang
+            self._reset()
+            self._reset_views()
+            return
+        # State snapshot tidak disimpan lagi di memori; view yang didaftarkan
+        # belakangan diputar ulang dari awal log
+        self._snapshot = (loaded['offset'], {})
+
+    def refresh(self):
+        """Menyinkronkan cache dengan log blok di disk"""
+        with self._lock:
+            stat = chain_store.store_stat()
+            if stat is None:
+                if self._inode is not None:
+                    self._reset()
+                    self._reset_views()
+                return
+
+            if (stat.st_ino == self._inode and stat.st_size == self._size
+                    and stat.st_mtime_ns == self._mtime_ns):
+                _metrics.inc('chain_cache_hits')
+                return
+
+            _metrics.inc('chain_cache_misses')
+            refresh_start = time.perf_counter()
+            if self._is_replaced(stat):
+                self._reset()
+                self._reset_views()
+
+            if self._inode is None and self.offset == 0:
+                with _metrics.timer('snapshot_load'):
+                    self._load_snapshot()
+
+            # Hanya baris setelah offset terakhir yang dibaca dan di-parse
+            loaded = 0
+            for start, end, block in chain_store.iter_blocks_from(self.offset):
+                if self.blocks is not None:
+                    self.blocks.append(block)
+                self.offset = end
+                self.last_block, self.last_block_offset = block, start
+                self.blocks_since_snapshot += 1
+                loaded += 1
+                for view in self._views:
+                    view.apply_block(block, start)
+
+            self._inode = stat.st_ino
+            self._size = stat.st_size
+            self._mtime_ns = stat.st_mtime_ns
+            self._tail_hash = self._compute_tail_hash(self.offset)
+            if _metrics.enabled:
+                _metrics.observe('chain_refresh', time.perf_counter() - refresh_start, loaded)
+
+            if self._snapshot_store is not None:
+                self._snapshot_store.maybe_save(self)
+
+    def _reset_views(self):
+        for view in self._views:
+            view.reset()
+
+    def register_view(self, view):
+        """Mendaftarkan view turunan yang diperbarui setiap ada blok baru.
+
+        View harus memiliki method reset() dan apply_block(block, offset). View
+        yang juga punya snapshot_name, snapshot_state() dan restore_state(state)
+        ikut disimpan dalam snapshot. Blok yang sudah diproses cache langsung
+        diputar ulang ke view baru.
+        """
+        with self._lock:
+            self._replay_view(view)
+            self._views.append(view)
+
+    def set_snapshot_store(self, store):
+        """Memasang penyimpan snapshot: objek dengan load(cache) dan maybe_save(cache)"""
+        with self._lock:
+            self._snapshot_store = store
+
+    def snapshot_views(self):
+        """View yang state-nya disimpan dalam snapshot"""
+        return [view for view in self._views if hasattr(view, 'snapshot_state')]
+
+    def capture_snapshot(self, capture_view):
+        """Mengambil state semua view snapshot secara konsisten di bawah lock cache
+
+        capture_view(view) dipanggil untuk setiap view dan harus cepat, karena
+        refresh menunggu selama lock dipegang. Mengembalikan dict berisi posisi
+        blok terakhir, generation, dan {snapshot_name: hasil capture_view}, atau
+        None jika cache masih kosong. Hitungan blok sejak snapshot direset.
+        """
+        with self._lock:
+            if self.last_block is None:
+                return None
+            captured = {
+                "block_index": self.last_block['index'],
+                "block_hash": self.last_block['hash'],
+                "block_offset": self.last_block_offset,
+                "offset": self.offset,
+                "generation": self.generation,
+                "states": {view.snapshot_name: capture_view(view) for view in self.snapshot_views()},
+            }
+            self.blocks_since_snapshot = 0
+            return captured
+
+    def _materialize(self):
+        """Membaca list blok dari awal log sampai posisi cache saat ini"""
+        blocks = []
+        if self.offset > 0:
+            for start, _, block in chain_store.iter_blocks_from(0):
+                if start >= self.offset:
+                    break
+                blocks.append(block)
+        self.blocks = blocks
+
+    def get_blocks(self):
+        """Mengembalikan list blok terbaru (dipakai bersama, jangan diubah)"""
+        with self._lock:
+            self.refresh()
+            if self.blocks is None:
+                with _metrics.timer('chain_load'):
+                    self._materialize()
+            return self.blocks
+
+    def invalidate(self):
+        """Mengosongkan cache sehingga refresh berikutnya membaca ulang seluruh log"""
+        with self._lock:
+            self._reset()
+            self._reset_views()
+
+
+_chain_cache = ChainCache()
+_metrics.register_gauge('chain_blocks',
+                        lambda: _chain_cache.last_block['index'] + 1 if _chain_cache.last_block else 0,
+                        "Jumlah blok yang sudah dimuat cache")
+
+
+def get_chain_cache():
+    """Mengembalikan instance cache blockchain bersama"""
+    return _chain_cache
@@ -0,0 +1,545 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+from collections import namedtuple
+
+from merkle import BATCH_TRANSACTION_TYPE, transaction_at
+
+# Chain disimpan sebagai file segmen JSON Lines berukuran tetap di folder ini,
+# ditambah indeks offset (uint64 per blok) untuk akses acak berdasarkan index blok
+CHAIN_DIR = 'chain_segments'
+OFFSET_INDEX_FILE = os.path.join(CHAIN_DIR, 'offsets.idx')
+# Segmen baru dimulai setelah segmen aktif mencapai ukuran ini (blok tidak pernah terbelah)
+SEGMENT_SIZE = 64 * 1024 * 1024
+# Offset global = (nomor segmen << SEGMENT_OFFSET_BITS) | posisi di dalam segmen
+SEGMENT_OFFSET_BITS = 32
+_POSITION_MASK = (1 << SEGMENT_OFFSET_BITS) - 1
+# Penanda format offset, disimpan oleh indeks turunan yang menyimpan offset
+STORE_LAYOUT = 'segments-v1'
+
+# Format lama yang dimigrasikan otomatis (dibiarkan apa adanya sebagai arsip)
+LEGACY_LOG_FILE = 'blockchain.jsonl'
+LEGACY_BLOCKCHAIN_FILE = 'blockchain.json'
+
+_INDEX_ENTRY = struct.Struct('<Q')
+
+# Identitas dan ukuran store, pengganti os.stat untuk satu file log
+StoreStat = namedtuple('StoreStat', 'st_ino st_size st_mtime_ns')
+
+
+def encode_block(block):
+    """Mengubah blok menjadi satu baris JSON (tanpa newline di dalamnya)"""
+    return json.dumps(block, separators=(',', ':'), ensure_ascii=False) + '\n'
+
+
+def make_offset(segment, position):
+    """Offset global dari nomor segmen dan posisi byte di dalamnya"""
+    return (segment << SEGMENT_OFFSET_BITS) | position
+
+
+def split_offset(offset):
+    """Memecah offset global menjadi (nomor segmen, posisi byte)"""
+    return offset >> SEGMENT_OFFSET_BITS, offset & _POSITION_MASK
+
+
+def segment_path(segment, directory=CHAIN_DIR):
+    return os.path.join(directory, f"segment-{segment:08d}.jsonl")
+
+
+def list_segments(directory=CHAIN_DIR):
+    """Nomor semua file segmen, terurut"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[8:-6]) for name in names
+                  if name.startswith('segment-') and name.endswith('.jsonl'))
+
+
+def store_exists():
+    """Mengecek apakah store segmen sudah berisi blok"""
+    try:
+        return os.path.getsize(segment_path(0)) > 0
+    except OSError:
+        return False
+
+
+# ---------- Penulisan ----------
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # Windows tidak mendukung fsync folder
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_lines(directory, lines):
+    """Menulis baris blok ke segmen di directory dan menambah indeks offset-nya
+
+    Baris ditambahkan ke segmen terakhir sampai ukurannya mencapai SEGMENT_SIZE,
+    lalu segmen baru dibuat. Data segmen di-fsync sebelum indeks, sehingga
+    indeks tidak pernah menunjuk ke data yang belum tersimpan.
+    """
+    segments = list_segments(directory)
+    segment = segments[-1] if segments else 0
+    path = segment_path(segment, directory)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+
+    index_entries = []
+    pending = []
+    pending_size = 0
+    created_segment = not segments
+
+    def flush():
+        if not pending:
+            return
+        with open(segment_path(segment, directory), 'ab') as f:
+            f.write(b''.join(pending))
+            f.flush()
+            os.fsync(f.fileno())
+
+    for line in lines:
+        if size + pending_size > 0 and size + pending_size + len(line) > SEGMENT_SIZE:
+            flush()
+            segment += 1
+            size, pending, pending_size = 0, [], 0
+            created_segment = True
+        index_entries.append(make_offset(segment, size + pending_size))
+        pending.append(line)
+        pending_size += len(line)
+    flush()
+    if created_segment:
+        _fsync_directory(directory)
+
+    if index_entries:
+        with open(os.path.join(directory, os.path.basename(OFFSET_INDEX_FILE)), 'ab') as f:
+            f.write(b''.join(_INDEX_ENTRY.pack(offset) for offset in index_entries))
+            f.flush()
+            os.fsync(f.fileno())
+    return len(index_entries)
+
+
+def _iter_legacy_blocks():
+    """Blok dari format lama: blockchain.jsonl jika ada, kalau tidak blockchain.json"""
+    if os.path.exists(LEGACY_LOG_FILE):
+        with open(LEGACY_LOG_FILE, 'rb') as f:
+            for line in f:
+                # Baris terakhir yang terpotong tidak ikut dimigrasikan
+                if not line.endswith(b'\n'):
+                    break
+                yield json.loads(line)
+    elif os.path.exists(LEGACY_BLOCKCHAIN_FILE):
+        try:
+            with open(LEGACY_BLOCKCHAIN_FILE, 'r') as f:
+                chain = json.load(f)
+        except json.JSONDecodeError:
+            return
+        yield from chain
+
+
+def migrate_legacy_chain():
+    """Migrasi satu kali dari blockchain.jsonl atau blockchain.json ke store segmen.
+
+    Mengembalikan jumlah blok yang dimigrasikan, atau 0 jika tidak ada yang perlu
+    dimigrasikan. File lama dibiarkan apa adanya sebagai arsip.
+    """
+    if store_exists():
+        return 0
+
+    # Segmen ditulis di folder sementara lalu di-rename agar migrasi bersifat atomik
+    tmp_dir = f"{CHAIN_DIR}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    migrated = 0
+    batch = []
+    for block in _iter_legacy_blocks():
+        batch.append(encode_block(block).encode('utf-8'))
+        if len(batch) >= 10000:
+            migrated += _write_lines(tmp_dir, batch)
+            batch = []
+    migrated += _write_lines(tmp_dir, batch)
+
+    if not migrated:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return 0
+    shutil.rmtree(CHAIN_DIR, ignore_errors=True)
+    os.replace(tmp_dir, CHAIN_DIR)
+    return migrated
+
+
+def truncate_partial_tail(f):
+    """Membuang sisa baris yang terpotong di akhir file log sebelum menambah baris baru"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b'\n':
+        return
+
+    pos = end
+    while pos > 0:
+        read_size = min(4096, pos)
+        pos -= read_size
+        f.seek(pos)
+        newline = f.read(read_size).rfind(b'\n')
+        if newline != -1:
+            f.truncate(pos + newline + 1)
+            return
+    f.truncate(0)
+
+
+def _repair_store():
+    """Memperbaiki ekor store setelah crash: baris terpotong dan indeks yang tertinggal"""
+    segments = list_segments()
+    if segments:
+        with open(segment_path(segments[-1]), 'r+b') as f:
+            truncate_partial_tail(f)
+
+    if os.path.exists(OFFSET_INDEX_FILE):
+        with open(OFFSET_INDEX_FILE, 'r+b') as f:
+            size = os.fstat(f.fileno()).st_size
+            # Entri indeks yang tidak utuh, tidak naik, atau menunjuk ke luar data dibuang
+            valid = size - size % _INDEX_ENTRY.size
+            while valid > 0:
+                f.seek(max(valid - 2 * _INDEX_ENTRY.size, 0))
+                entries = f.read(min(valid, 2 * _INDEX_ENTRY.size))
+                offset = _INDEX_ENTRY.unpack_from(entries, len(entries) - _INDEX_ENTRY.size)[0]
+                previous = _INDEX_ENTRY.unpack_from(entries)[0] if len(entries) > _INDEX_ENTRY.size else -1
+                if offset > previous and read_line_at(offset) is not None:
+                    break
+                valid -= _INDEX_ENTRY.size
+            if valid != size:
+                f.truncate(valid)
+
+    missing = _unindexed_offsets()
+    if missing:
+        with open(OFFSET_INDEX_FILE, 'ab') as f:
+            f.write(b''.join(_INDEX_ENTRY.pack(offset) for offset in missing))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def append_blocks(blocks):
+    """Menambahkan blok ke segmen terakhir dengan satu kali write dan fsync per segmen
+
+    Harus dipanggil di bawah lock penulis (chain_writer.chain_file_lock).
+    """
+    os.makedirs(CHAIN_DIR, exist_ok=True)
+    _repair_store()
+    _write_lines(CHAIN_DIR, [encode_block(block).encode('utf-8') for block in blocks])
+
+
+# ---------- Pembacaan berurutan ----------
+
+def _iter_lines(offset=0):
+    """Menghasilkan (offset_awal, offset_akhir, baris) untuk setiap baris lengkap mulai dari offset"""
+    start_segment, position = split_offset(offset)
+    for segment in list_segments():
+        if segment < start_segment:
+            continue
+        with open(segment_path(segment), 'rb') as f:
+            if segment == start_segment:
+                f.seek(position)
+            else:
+                position = 0
+            for line in f:
+                # Baris terakhir yang terpotong (misal karena crash saat menulis) diabaikan
+                if not line.endswith(b'\n'):
+                    return
+                end = position + len(line)
+                yield make_offset(segment, position), make_offset(segment, end), line
+                position = end
+
+
+def iter_blocks_from(offset=0):
+    """Membaca blok mulai dari offset global tertentu.
+
+    Menghasilkan tuple (offset_awal, offset_akhir, blok). Offset akhir blok
+    terakhir sebuah segmen bisa langsung dipakai lagi sebagai offset awal;
+    pembacaan otomatis berlanjut ke segmen berikutnya.
+    """
+    for start, end, line in _iter_lines(offset):
+        yield start, end, json.loads(line)
+
+
+def iter_blocks():
+    """Membaca blok satu per satu dari store"""
+    for _, _, block in iter_blocks_from(0):
+        yield block
+
+
+def iter_line_offsets(start=0, stop=None):
+    """Menghasilkan offset awal setiap baris lengkap di [start, stop) tanpa mem-parse JSON"""
+    for offset, _, _ in _iter_lines(start):
+        if stop is not None and offset >= stop:
+            return
+        yield offset
+
+
+# ---------- Akses acak lewat mmap ----------
+
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def _map_file(path):
+    """mmap read-only sebuah file; dipetakan ulang jika file berganti atau bertambah"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_size)
+    with _maps_lock:
+        cached = _maps.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if stat.st_size == 0:
+            _maps.pop(path, None)
+            return None
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _maps[path] = (key, mapped)
+        return mapped
+
+
+def read_line_at(offset):
+    """Mengembalikan baris lengkap (dengan newline) yang dimulai di offset, atau None"""
+    segment, position = split_offset(offset)
+    mapped = _map_file(segment_path(segment))
+    if mapped is None or position >= len(mapped):
+        return None
+    end = mapped.find(b'\n', position)
+    if end == -1:
+        return None
+    return mapped[position:end + 1]
+
+
+def read_block_at(offset):
+    """Membaca satu blok pada offset global; mengembalikan (blok, offset_akhir) atau None"""
+    line = read_line_at(offset)
+    if line is None:
+        return None
+    return json.loads(line), offset + len(line)
+
+
+def read_blocks_at(offsets):
+    """Membaca beberapa blok berdasarkan offset global"""
+    return [json.loads(read_line_at(offset)) for offset in offsets]
+
+
+def _indexed_count():
+    mapped = _map_file(OFFSET_INDEX_FILE)
+    return len(mapped) // _INDEX_ENTRY.size if mapped is not None else 0
+
+
+def _index_entry(position):
+    return _INDEX_ENTRY.unpack_from(_map_file(OFFSET_INDEX_FILE), position * _INDEX_ENTRY.size)[0]
+
+
+def _unindexed_offsets():
+    """Offset blok di ujung store yang belum tercatat di indeks (setelah crash atau saat ditulis)"""
+    count = _indexed_count()
+    if count == 0:
+        return list(iter_line_offsets(0))
+    last_line = read_line_at(_index_entry(count - 1))
+    if last_line is None:
+        return []
+    return list(iter_line_offsets(_index_entry(count - 1) + len(last_line)))
+
+
+def block_count():
+    """Jumlah blok lengkap di store"""
+    return _indexed_count() + len(_unindexed_offsets())
+
+
+def get_block_offset(index):
+    """Offset global blok ke-index, atau None jika blok tidak ada (O(1) lewat indeks)"""
+    if index < 0:
+        return None
+    count = _indexed_count()
+    if index < count:
+        return _index_entry(index)
+    tail = _unindexed_offsets()
+    return tail[index - count] if index - count < len(tail) else None
+
+
+def read_block(index):
+    """Membaca blok ke-index tanpa memindai chain, atau None jika tidak ada"""
+    offset = get_block_offset(index)
+    if offset is None:
+        return None
+    found = read_block_at(offset)
+    return found[0] if found else None
+
+
+def read_block_range(start, stop):
+    """Membaca blok dengan index di [start, stop); hanya blok yang diminta yang di-parse"""
+    start = max(start, 0)
+    count = _indexed_count()
+    offsets = [_index_entry(i) for i in range(start, min(stop, count))]
+    if stop > count:
+        tail = _unindexed_offsets()
+        offsets.extend(tail[max(start - count, 0):stop - count])
+    return read_blocks_at(offsets)
+
+
+def read_last_blocks(count):
+    """Membaca count blok terakhir (urut dari index kecil ke besar)"""
+    total = block_count()
+    return read_block_range(total - count, total)
+
+
+def _json_marker(key, value):
+    return f'"{key}":{json.dumps(value, ensure_ascii=False)}'.encode('utf-8')
+
+
+def _stream_candidates(transaction_type, petition_id, signer,
+                       start_index, end_index, start_time, end_time):
+    """Blok yang lolos filter header dan prefilter byte (isi transaksi belum dicek)"""
+    if not store_exists():
+        return
+
+    markers = []
+    if transaction_type is not None:
+        markers.append(_json_marker('transaction_type', transaction_type))
+    if petition_id is not None:
+        markers.append(_json_marker('petition_id', petition_id))
+    if signer is not None:
+        markers.append(_json_marker('signer_username', signer))
+
+    # Dengan indeks offset, pembacaan langsung dimulai dari blok start_index
+    start_offset = 0
+    if start_index is not None and start_index > 0:
+        start_offset = get_block_offset(start_index)
+        if start_offset is None:
+            return
+
+    for _, _, line in _iter_lines(start_offset):
+        if markers and not all(marker in line for marker in markers):
+            continue
+
+        block = json.loads(line)
+        index = block['index']
+        if end_index is not None and index > end_index:
+            break
+        if start_index is not None and index < start_index:
+            continue
+        if start_time is not None and block['timestamp'] < start_time:
+            continue
+        if end_time is not None and block['timestamp'] > end_time:
+            continue
+        yield block
+
+
+def _transaction_matches(transaction, transaction_type, petition_id, signer):
+    tx_data = transaction['transaction_data']
+    if transaction_type is not None and transaction['transaction_type'] != transaction_type:
+        return False
+    if petition_id is not None and tx_data.get('petition_id') != petition_id:
+        return False
+    if signer is not None and tx_data.get('signer_username') != signer:
+        return False
+    return True
+
+
+def stream_transactions(transaction_type=None, petition_id=None, signer=None,
+                        start_index=None, end_index=None, start_time=None, end_time=None):
+    """Iterator transaksi dengan filter tanpa memuat seluruh chain ke memori.
+
+    Baris yang pasti tidak cocok dibuang dengan pencarian byte sebelum di-parse,
+    sehingga hanya blok kandidat yang diubah menjadi dict. Transaksi di dalam
+    blok BATCH dihasilkan satu per satu (lihat merkle.iter_transactions).
+    """
+    for block in _stream_candidates(transaction_type, petition_id, signer,
+                                    start_index, end_index, start_time, end_time):
+        if block['transaction_type'] != BATCH_TRANSACTION_TYPE:
+            if _transaction_matches(block, transaction_type, petition_id, signer):
+                yield block
+            continue
+        # Filter dicek pada transaksi mentah; record (dengan hash daun) hanya dibuat untuk yang cocok
+        for position, transaction in enumerate(block['transaction_data']['transactions']):
+            if _transaction_matches(transaction, transaction_type, petition_id, signer):
+                yield transaction_at(block, position)
+
+
+def stream_blocks(transaction_type=None, petition_id=None, signer=None,
+                  start_index=None, end_index=None, start_time=None, end_time=None):
+    """Iterator blok utuh yang memuat minimal satu transaksi yang cocok dengan filter"""
+    for block in _stream_candidates(transaction_type, petition_id, signer,
+                                    start_index, end_index, start_time, end_time):
+        if block['transaction_type'] == BATCH_TRANSACTION_TYPE:
+            transactions = block['transaction_data']['transactions']
+        else:
+            transactions = (block,)
+        if any(_transaction_matches(transaction, transaction_type, petition_id, signer)
+               for transaction in transactions):
+            yield block
+
+
+def store_stat():
+    """Mengembalikan StoreStat (identitas, offset akhir, waktu ubah) store, atau None jika belum ada
+
+    st_ino adalah inode segmen pertama (berubah jika store diganti) dan
+    st_size adalah offset global akhir segmen terakhir.
+    """
+    segments = list_segments()
+    if not segments:
+        return None
+    try:
+        first = os.stat(segment_path(segments[0]))
+        last = os.stat(segment_path(segments[-1])) if len(segments) > 1 else first
+    except FileNotFoundError:
+        return None
+    return StoreStat(first.st_ino, make_offset(segments[-1], last.st_size), last.st_mtime_ns)
+
+
+def read_range(start, end):
+    """Membaca byte mentah store pada rentang offset global [start, end)"""
+    start_segment, start_position = split_offset(start)
+    end_segment, end_position = split_offset(end)
+    chunks = []
+    for segment in list_segments():
+        if segment < start_segment or segment > end_segment:
+            continue
+        with open(segment_path(segment), 'rb') as f:
+            position = start_position if segment == start_segment else 0
+            f.seek(position)
+            if segment == end_segment:
+                chunks.append(f.read(max(end_position - position, 0)))
+            else:
+                chunks.append(f.read())
+    return b''.join(chunks)
+
+
+def read_last_block():
+    """Membaca blok terakhir tanpa membaca seluruh store"""
+    for segment in reversed(list_segments()):
+        with open(segment_path(segment), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            buffer = b''
+            while pos > 0:
+                read_size = min(4096, pos)
+                pos -= read_size
+                f.seek(pos)
+                buffer = f.read(read_size) + buffer
+
+                # Newline terakhir menandai akhir baris lengkap terakhir;
+                # byte setelahnya (jika ada) adalah tulisan yang terpotong
+                line_end = buffer.rfind(b'\n')
+                if line_end == -1:
+                    continue
+                line_start = buffer.rfind(b'\n', 0, line_end)
+                if line_start != -1 or pos == 0:
+                    return json.loads(buffer[line_start + 1:line_end])
+    return None
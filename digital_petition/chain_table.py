@@ -0,0 +1,162 @@
+import threading
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from blockchain_utils import ensure_chain_store
+from chain_cache import get_chain_cache
+from merkle import iter_raw_transactions
+
+# Kolom numerik: nama -> (typecode array, dtype NumPy)
+_NUMERIC_COLUMNS = {
+    'index': ('q', np.int64),
+    'offset': ('Q', np.uint64),
+    'batch_position': ('i', np.int32),
+    'timestamp': ('d', np.float64),
+}
+# Kolom kategorikal disimpan sebagai kode int32 (-1 = kosong): nama -> nama kosakata
+_CATEGORICAL_COLUMNS = {
+    'transaction_type': 'types',
+    'petition_id': 'petitions',
+    'signer': 'users',
+    'creator': 'users',
+}
+# batch_position untuk transaksi yang bukan bagian dari blok BATCH
+NO_BATCH_POSITION = -1
+# Kapasitas awal buffer DataFrame (baris); digandakan saat penuh
+_MIN_FRAME_CAPACITY = 1024
+
+
+def _codes_dtype(category_count):
+    """dtype kode kategori yang dipakai pandas untuk category_count kategori"""
+    if category_count < np.iinfo(np.int8).max:
+        return np.int8
+    if category_count < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+class ChainTable:
+    """Tabel kolomnar chain: satu baris per transaksi (transaksi BATCH dipecah).
+
+    Kolom: index, offset, batch_position (-1 jika bukan BATCH), timestamp
+    (float64), transaction_type, petition_id, signer, dan creator (kategorikal).
+    Diperbarui secara inkremental oleh ChainCache: setiap transaksi hanya
+    menambah satu angka per kolom. DataFrame dibangun dari buffer NumPy per
+    kolom yang ikut bertambah: setiap build hanya menyalin baris baru sejak build
+    sebelumnya, lalu DataFrame dibuat sebagai view buffer tanpa salinan, sehingga
+    analitik cukup berupa filter dan group-by pandas. Di snapshot, kolom ditulis
+    ke file biner yang hanya bertambah (lihat snapshot.py); JSON hanya memuat
+    kosakata kategori.
+    """
+
+    snapshot_name = 'table'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._columns = {name: array(typecode) for name, (typecode, _) in _NUMERIC_COLUMNS.items()}
+        self._columns.update({name: array('i') for name in _CATEGORICAL_COLUMNS})
+        # Kosakata kategori: nama -> (list nilai, dict nilai -> kode)
+        self._vocabularies = {name: ([], {}) for name in set(_CATEGORICAL_COLUMNS.values())}
+        self._frame = None
+        # Buffer DataFrame per kolom; baris [0, _frame_rows) sudah disalin dari kolom array
+        self._buffers = {}
+        self._frame_rows = 0
+        # nama kosakata -> CategoricalDtype, dibuat ulang hanya jika kosakata bertambah
+        self._dtypes = {}
+
+    def _code(self, column, value):
+        if value is None:
+            return -1
+        values, codes = self._vocabularies[_CATEGORICAL_COLUMNS[column]]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def apply_block(self, block, offset):
+        columns = self._columns
+        with self._lock:
+            for position, tx_type, tx_data in iter_raw_transactions(block):
+                if not isinstance(tx_data, dict):
+                    tx_data = {}
+                columns['index'].append(block['index'])
+                columns['offset'].append(offset)
+                columns['batch_position'].append(NO_BATCH_POSITION if position is None else position)
+                columns['timestamp'].append(block['timestamp'])
+                columns['transaction_type'].append(self._code('transaction_type', tx_type))
+                columns['petition_id'].append(self._code('petition_id', tx_data.get('petition_id')))
+                columns['signer'].append(self._code('signer', tx_data.get('signer_username')))
+                columns['creator'].append(self._code('creator', tx_data.get('creator')))
+
+    def snapshot_state(self):
+        """State tabel untuk snapshot: kolom array dan kosakata kategori"""
+        with self._lock:
+            return {
+                "columns": dict(self._columns),
+                "vocabularies": {name: list(values) for name, (values, _) in self._vocabularies.items()},
+            }
+
+    def restore_state(self, state):
+        """Memulihkan tabel dari state snapshot"""
+        with self._lock:
+            self.reset()
+            self._columns.update(state['columns'])
+            for name, values in state['vocabularies'].items():
+                self._vocabularies[name] = (list(values), {value: code for code, value in enumerate(values)})
+
+    def __len__(self):
+        return len(self._columns['index'])
+
+    def _extend_buffer(self, name, dtype, rows):
+        """Menyalin baris [_frame_rows, rows) kolom name ke buffernya; mengembalikan view [0, rows)"""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or len(buffer) < rows:
+            # Buffer baru (lebih besar atau dtype kode berubah); frame lama tetap memakai buffer lama
+            grown = np.empty(max(rows * 2, _MIN_FRAME_CAPACITY), dtype=dtype)
+            if buffer is not None:
+                grown[:self._frame_rows] = buffer[:self._frame_rows]
+            buffer = self._buffers[name] = grown
+        source = np.frombuffer(self._columns[name], dtype=self._columns[name].typecode, count=rows)
+        buffer[self._frame_rows:rows] = source[self._frame_rows:rows]
+        # Ekspor buffer array harus dilepas sebelum apply_block menambah elemen
+        del source
+        return buffer[:rows]
+
+    def _categorical_dtype(self, vocabulary):
+        values = self._vocabularies[vocabulary][0]
+        dtype = self._dtypes.get(vocabulary)
+        if dtype is None or len(dtype.categories) != len(values):
+            dtype = self._dtypes[vocabulary] = pd.CategoricalDtype(values)
+        return dtype
+
+    def frame(self):
+        """DataFrame kolom bertipe dari seluruh transaksi (dipakai bersama, jangan diubah)"""
+        with self._lock:
+            rows = len(self._columns['index'])
+            if self._frame is not None and self._frame_rows == rows:
+                return self._frame
+            data = {name: self._extend_buffer(name, dtype, rows) for name, (_, dtype) in _NUMERIC_COLUMNS.items()}
+            for name, vocabulary in _CATEGORICAL_COLUMNS.items():
+                dtype = self._categorical_dtype(vocabulary)
+                codes = self._extend_buffer(name, _codes_dtype(len(dtype.categories)), rows)
+                data[name] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+            self._frame = pd.DataFrame(data, copy=False)
+            self._frame_rows = rows
+            return self._frame
+
+
+_chain_table = ChainTable()
+get_chain_cache().register_view(_chain_table)
+
+
+def get_chain_table():
+    """Mengembalikan DataFrame kolomnar chain yang sudah disinkronkan dengan log"""
+    ensure_chain_store()
+    get_chain_cache().refresh()
+    return _chain_table.frame()
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import chain_store
+from metrics import get_metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHAIN_LOCK_FILE = f"{chain_store.CHAIN_DIR}.lock"
+
+# Lama menunggu permintaan lain sebelum satu batch ditulis (detik)
+GROUP_COMMIT_WINDOW = 0.005
+# Batas jumlah blok dalam satu batch
+GROUP_COMMIT_MAX_BATCH = 512
+
+_metrics = get_metrics()
+_metrics.describe('chain_append', "Durasi satu penulisan batch ke log (lock, tautkan, fsync)")
+_metrics.describe('chain_lock_wait', "Waktu menunggu lock antarproses log blok")
+_metrics.describe('chain_blocks_appended', "Blok yang ditulis ke log oleh proses ini")
+
+
+@contextmanager
+def file_lock(path):
+    """Lock eksklusif antarproses berbasis file lock di path"""
+    with open(path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def chain_file_lock():
+    """Lock eksklusif antarproses untuk semua penulisan log blok"""
+    return file_lock(CHAIN_LOCK_FILE)
+
+
+class GroupCommitWriter:
+    """Penulis tunggal per proses yang menggabungkan blok ke dalam satu write dan satu fsync.
+
+    Permintaan dari banyak thread/sesi masuk ke antrean. Thread penulis mengambil
+    semua permintaan yang datang dalam GROUP_COMMIT_WINDOW, mengambil lock file
+    antarproses, membaca blok terakhir di bawah lock, lalu menautkan dan menulis
+    seluruh batch sekaligus. Karena index dan previous_hash selalu dihitung di
+    bawah lock, dua proses tidak akan pernah menghasilkan blok dengan index sama.
+
+    Jika merkle_batch_min diisi, batch yang berisi minimal sebanyak itu
+    transaksi ditulis sebagai satu blok BATCH (Merkle root) alih-alih satu blok
+    per transaksi.
+    """
+
+    def __init__(self, build_block, create_genesis_block, build_batch_block=None,
+                 window=GROUP_COMMIT_WINDOW, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 merkle_batch_min=None):
+        self._build_block = build_block
+        self._create_genesis_block = create_genesis_block
+        self._build_batch_block = build_batch_block
+        self.window = window
+        self.max_batch = max_batch
+        self.merkle_batch_min = merkle_batch_min
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches_written = 0
+        self.blocks_written = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chain-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, transaction_type, transaction_data):
+        """Mengantrekan transaksi; Future berisi (blok, posisi dalam batch atau None)"""
+        future = Future()
+        self._queue.put((transaction_type, transaction_data, future))
+        self._ensure_started()
+        return future
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            as_merkle_batch = (self.merkle_batch_min is not None
+                               and len(batch) >= self.merkle_batch_min)
+            try:
+                results = self.write_batch([(tx_type, tx_data) for tx_type, tx_data, _ in batch],
+                                           as_merkle_batch=as_merkle_batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def write_batch(self, transactions, as_merkle_batch=False):
+        """Menautkan dan menulis transaksi di bawah lock antarproses (satu fsync)
+
+        Mengembalikan (blok, posisi) untuk setiap transaksi; posisi None untuk
+        blok biasa, atau urutan transaksi di dalam blok BATCH.
+        """
+        if as_merkle_batch and self._build_batch_block is None:
+            raise ValueError("Penulis ini tidak mendukung blok BATCH")
+
+        start = time.perf_counter()
+        with chain_file_lock():
+            locked = time.perf_counter()
+            blocks = []
+            if not chain_store.store_exists() and not chain_store.migrate_legacy_chain():
+                blocks.append(self._create_genesis_block())
+            last_block = blocks[-1] if blocks else chain_store.read_last_block()
+
+            results = []
+            if as_merkle_batch and transactions:
+                last_block = self._build_batch_block(transactions, last_block)
+                blocks.append(last_block)
+                results = [(last_block, position) for position in range(len(transactions))]
+            else:
+                for transaction_type, transaction_data in transactions:
+                    last_block = self._build_block(transaction_type, transaction_data, last_block)
+                    blocks.append(last_block)
+                    results.append((last_block, None))
+
+            if blocks:
+                chain_store.append_blocks(blocks)
+
+        self.batches_written += 1
+        self.blocks_written += len(blocks)
+        if _metrics.enabled:
+            _metrics.observe('chain_lock_wait', locked - start)
+            _metrics.observe('chain_append', time.perf_counter() - start)
+            _metrics.inc('chain_blocks_appended', len(blocks))
+        return results
@@ -1,14 +1,220 @@
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import eddsa, pkcs1_15
 from Crypto.Hash import SHA256
+from collections import OrderedDict
+import hashlib
+import json
 import os
 import base64
+import threading
 
-def generate_keys_in_memory():
-    key = RSA.generate(2048)
-    private_key = key
-    public_key = key.publickey()
-    return private_key, public_key
+from metrics import get_metrics
+
+# Jumlah maksimum kunci publik yang sudah di-parse dan disimpan di cache
+PUBLIC_KEY_CACHE_SIZE = 1024
+
+SIGNATURE_SCHEME_RSA = "rsa-pkcs1v15-sha256"
+SIGNATURE_SCHEME_ED25519 = "ed25519"
+# Skema untuk blok SIGN_PETITION lama yang belum mencatat signature_scheme
+LEGACY_SIGNATURE_SCHEME = SIGNATURE_SCHEME_RSA
+# Skema untuk akun baru
+DEFAULT_SIGNATURE_SCHEME = SIGNATURE_SCHEME_ED25519
+
+# Versi pesan yang ditandatangani blok SIGN_PETITION (field message_version)
+# 1: teks petisi + username (blok lama tanpa field); 2: digest petisi + petition_id + username
+LEGACY_MESSAGE_VERSION = 1
+SIGNING_MESSAGE_VERSION = 2
+SIGNING_MESSAGE_VERSIONS = (LEGACY_MESSAGE_VERSION, SIGNING_MESSAGE_VERSION)
+
+class RsaPkcs1Scheme:
+    """RSA-2048 dengan PKCS#1 v1.5 atas hash SHA-256 (skema awal aplikasi)"""
+
+    name = SIGNATURE_SCHEME_RSA
+
+    def generate_keys(self):
+        key = RSA.generate(2048)
+        return key, key.publickey()
+
+    def owns_key(self, key):
+        return isinstance(key, RSA.RsaKey)
+
+    def import_public_key(self, public_key_str):
+        return RSA.import_key(public_key_str)
+
+    def export_public_key(self, public_key):
+        return public_key.export_key(format='PEM').decode()
+
+    def sign(self, data: bytes, private_key):
+        return pkcs1_15.new(private_key).sign(SHA256.new(data))
+
+    def new_verifier(self, public_key_str):
+        """Fungsi verify(data, signature_bytes) yang melempar ValueError jika tidak valid"""
+        verifier = pkcs1_15.new(RSA.import_key(public_key_str))
+        return lambda data, signature: verifier.verify(SHA256.new(data), signature)
+
+    def dump_private_key(self, private_key):
+        """Bentuk private key yang bisa di-pickle (RsaKey sendiri tidak bisa)"""
+        return private_key.n, private_key.e, private_key.d, private_key.p, private_key.q
+
+    def load_private_key(self, data):
+        # Key dibuat oleh generator tepercaya, jadi cek konsistensi yang mahal dilewati
+        key = RSA.construct(data, consistency_check=False)
+        return key, key.publickey()
+
+class Ed25519Scheme:
+    """Ed25519 (RFC 8032): pesan ditandatangani langsung tanpa hash terpisah"""
+
+    name = SIGNATURE_SCHEME_ED25519
+
+    def generate_keys(self):
+        key = ECC.generate(curve='Ed25519')
+        return key, key.public_key()
+
+    def owns_key(self, key):
+        return isinstance(key, ECC.EccKey) and key.curve == 'Ed25519'
+
+    def import_public_key(self, public_key_str):
+        key = ECC.import_key(public_key_str)
+        if not self.owns_key(key):
+            raise ValueError("Bukan kunci Ed25519")
+        return key
+
+    def export_public_key(self, public_key):
+        return public_key.export_key(format='PEM')
+
+    def sign(self, data: bytes, private_key):
+        return eddsa.new(private_key, 'rfc8032').sign(data)
+
+    def new_verifier(self, public_key_str):
+        """Fungsi verify(data, signature_bytes) yang melempar ValueError jika tidak valid"""
+        return eddsa.new(self.import_public_key(public_key_str), 'rfc8032').verify
+
+    def dump_private_key(self, private_key):
+        return private_key.seed
+
+    def load_private_key(self, data):
+        key = ECC.construct(curve='Ed25519', seed=data)
+        return key, key.public_key()
+
+SIGNATURE_SCHEMES = {scheme.name: scheme for scheme in (RsaPkcs1Scheme(), Ed25519Scheme())}
+
+def get_signature_scheme(name=None):
+    """Mengembalikan skema tanda tangan berdasarkan nama (None = skema blok lama)"""
+    scheme = SIGNATURE_SCHEMES.get(name or LEGACY_SIGNATURE_SCHEME)
+    if scheme is None:
+        raise ValueError(f"Skema tanda tangan tidak dikenal: {name}")
+    return scheme
+
+def signature_scheme_of(transaction_data):
+    """Nama skema yang dicatat blok SIGN_PETITION; blok lama selalu RSA"""
+    return transaction_data.get('signature_scheme') or LEGACY_SIGNATURE_SCHEME
+
+def petition_digest(petition_text):
+    """Digest SHA-256 (hex) teks petisi, disimpan di blok CREATE_PETITION sebagai petition_digest"""
+    return hashlib.sha256(petition_text.encode('utf-8')).hexdigest()
+
+def signing_message(petition_id, signer_username, petition_digest):
+    """Pesan v2 yang ditandatangani: pendek dan tidak bergantung panjang teks petisi"""
+    # Array JSON agar batas antar field tidak ambigu (ID dan username bebas berisi karakter apa pun)
+    return json.dumps(["petisi-v2", petition_id, signer_username, petition_digest],
+                      ensure_ascii=False, separators=(',', ':'))
+
+def message_version_of(transaction_data):
+    """Versi pesan yang dicatat blok SIGN_PETITION; blok lama selalu versi 1"""
+    return transaction_data.get('message_version') or LEGACY_MESSAGE_VERSION
+
+def block_signing_message(transaction_data, petition_text, petition_digest):
+    """Pesan yang ditandatangani blok SIGN_PETITION sesuai versinya, atau None jika versi tidak dikenal"""
+    version = message_version_of(transaction_data)
+    signer_username = transaction_data['signer_username']
+    if version == SIGNING_MESSAGE_VERSION:
+        return signing_message(transaction_data['petition_id'], signer_username, petition_digest)
+    if version == LEGACY_MESSAGE_VERSION:
+        return petition_text + signer_username
+    return None
+
+def scheme_for_private_key(private_key):
+    """Mengembalikan skema yang sesuai dengan object private key"""
+    for scheme in SIGNATURE_SCHEMES.values():
+        if scheme.owns_key(private_key):
+            return scheme
+    raise ValueError("Tipe kunci tidak didukung")
+
+def scheme_for_public_key(public_key_str):
+    """Mengembalikan skema yang bisa mem-parse PEM kunci publik"""
+    for scheme in SIGNATURE_SCHEMES.values():
+        try:
+            scheme.import_public_key(public_key_str)
+        except (ValueError, TypeError, IndexError):
+            continue
+        return scheme
+    raise ValueError("Format kunci publik tidak didukung")
+
+def public_key_fingerprint(public_key_str):
+    """Menghasilkan fingerprint SHA-256 dari PEM kunci publik"""
+    if isinstance(public_key_str, str):
+        public_key_str = public_key_str.encode()
+    return hashlib.sha256(public_key_str).hexdigest()
+
+class PublicKeyCache:
+    """LRU berisi verifier siap pakai, dengan key skema dan fingerprint PEM kunci publik"""
+
+    def __init__(self, maxsize=PUBLIC_KEY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._verifiers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_verifier(self, public_key_str, scheme=LEGACY_SIGNATURE_SCHEME):
+        """Mengembalikan fungsi verify(data, signature) untuk PEM; kunci hanya di-parse saat miss"""
+        fingerprint = f"{scheme}:{public_key_fingerprint(public_key_str)}"
+        with self._lock:
+            verifier = self._verifiers.get(fingerprint)
+            if verifier is not None:
+                self._verifiers.move_to_end(fingerprint)
+                self.hits += 1
+                return verifier
+            self.misses += 1
+
+        # Parsing dilakukan di luar lock; PEM yang tidak valid tidak disimpan
+        verifier = get_signature_scheme(scheme).new_verifier(public_key_str)
+        with self._lock:
+            self._verifiers[fingerprint] = verifier
+            self._verifiers.move_to_end(fingerprint)
+            while len(self._verifiers) > self.maxsize:
+                self._verifiers.popitem(last=False)
+        return verifier
+
+    def stats(self):
+        """Mengembalikan statistik cache (hit, miss, ukuran)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self._verifiers),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._verifiers.clear()
+            self.hits = 0
+            self.misses = 0
+
+_public_key_cache = PublicKeyCache()
+get_metrics().register_gauge('public_key_cache_hit_ratio', lambda: _public_key_cache.stats()['hit_ratio'],
+                             "Rasio verifier kunci publik yang diambil dari cache")
+get_metrics().register_gauge('public_key_cache_size', lambda: _public_key_cache.stats()['size'])
+
+def get_public_key_cache():
+    """Mengembalikan cache kunci publik yang dipakai bersama dalam proses ini"""
+    return _public_key_cache
+
+def generate_keys_in_memory(scheme=SIGNATURE_SCHEME_RSA):
+    return get_signature_scheme(scheme).generate_keys()
 
 def load_keys(username):
     with open(f'keys/{username}_private.pem', 'rb') as f:
@@ -18,16 +224,15 @@ def load_keys(username):
     return private_key, public_key
 
 def sign_data(data: str, private_key):
-    hash_obj = SHA256.new(data.encode('utf-8'))
-    signature = pkcs1_15.new(private_key).sign(hash_obj)
+    """Tanda tangan base64 dengan skema yang sesuai tipe private key"""
+    signature = scheme_for_private_key(private_key).sign(data.encode('utf-8'), private_key)
     return base64.b64encode(signature).decode()
 
-def verify_signature(message, signature, public_key_str):
+def verify_signature(message, signature, public_key_str, scheme=LEGACY_SIGNATURE_SCHEME):
     try:
-        public_key = RSA.import_key(public_key_str)
-        hash_obj = SHA256.new(message.encode())
+        verifier = _public_key_cache.get_verifier(public_key_str, scheme)
         signature_bytes = base64.b64decode(signature)
-        pkcs1_15.new(public_key).verify(hash_obj, signature_bytes)
+        verifier(message.encode(), signature_bytes)
         return True
     except (ValueError, TypeError):
         return False
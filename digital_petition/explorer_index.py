@@ -0,0 +1,176 @@
+import re
+import threading
+from array import array
+
+import numpy as np
+
+import chain_store
+from blockchain_utils import ensure_chain_store
+from chain_cache import get_chain_cache
+from merkle import BATCH_TRANSACTION_TYPE
+from user_index import get_user_index
+
+# Panjang minimal awalan hash untuk pencarian blok berdasarkan hash
+MIN_HASH_PREFIX = 6
+# Jumlah digit hex awal hash yang disimpan per blok (muat di satu uint64)
+_HASH_KEY_DIGITS = 16
+
+_HEX_PATTERN = re.compile(r"[0-9a-fA-F]+")
+
+
+class BlockTypeIndex:
+    """Indeks tipe transaksi blok -> index blok berurutan, untuk filter explorer.
+
+    Dengan indeks ini satu halaman hasil filter cukup membaca blok di halaman
+    itu saja lewat indeks offset chain_store. Indeks juga menyimpan 16 digit hex
+    awal hash setiap blok (urut index blok), sehingga pencarian awalan hash
+    tidak perlu memindai segmen. Di snapshot, daftar index per tipe dan awalan
+    hash disimpan sebagai kolom biner (lihat snapshot.py).
+    """
+
+    snapshot_name = 'block_types'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._indexes = {}
+        # Elemen ke-i = 16 digit hex awal hash blok ke-i sebagai bilangan
+        self._hash_keys = array('Q')
+
+    def apply_block(self, block, offset):
+        with self._lock:
+            indexes = self._indexes.get(block['transaction_type'])
+            if indexes is None:
+                indexes = self._indexes[block['transaction_type']] = array('Q')
+            indexes.append(block['index'])
+            self._hash_keys.append(int(block['hash'][:_HASH_KEY_DIGITS], 16))
+
+    def snapshot_state(self):
+        with self._lock:
+            # Nama tipe bisa berisi karakter apa saja, jadi nama kolom memakai urutan tipe
+            columns = {str(number): indexes for number, indexes in enumerate(self._indexes.values())}
+            columns['hash_keys'] = self._hash_keys
+            return {"types": list(self._indexes), "columns": columns}
+
+    def restore_state(self, state):
+        with self._lock:
+            self._indexes = {tx_type: state['columns'][str(number)]
+                             for number, tx_type in enumerate(state['types'])}
+            self._hash_keys = state['columns']['hash_keys']
+
+    def types(self):
+        """Semua tipe transaksi yang ada di chain, terurut"""
+        with self._lock:
+            return sorted(self._indexes)
+
+    def get(self, transaction_type):
+        """Index blok bertipe transaction_type, dari kecil ke besar"""
+        with self._lock:
+            return self._indexes.get(transaction_type, array('Q'))
+
+    def hash_candidates(self, hash_prefix):
+        """Index blok (terurut) yang 16 digit awal hash-nya cocok dengan hash_prefix (hex huruf kecil)
+
+        Awalan yang lebih panjang dari 16 digit hanya dicocokkan 16 digit
+        pertamanya; pemanggil tetap harus mencocokkan hash lengkap blok.
+        """
+        key = hash_prefix[:_HASH_KEY_DIGITS]
+        low = int(key.ljust(_HASH_KEY_DIGITS, '0'), 16)
+        high = int(key.ljust(_HASH_KEY_DIGITS, 'f'), 16)
+        with self._lock:
+            keys = np.frombuffer(self._hash_keys, dtype=np.uint64)
+            candidates = np.flatnonzero((keys >= low) & (keys <= high)).tolist()
+            # Buffer array tidak boleh masih diekspor saat apply_block menambah elemen
+            del keys
+        return candidates
+
+
+_block_type_index = BlockTypeIndex()
+get_chain_cache().register_view(_block_type_index)
+
+
+def get_block_type_index():
+    """Mengembalikan indeks tipe blok yang sudah disinkronkan dengan chain"""
+    ensure_chain_store()
+    get_chain_cache().refresh()
+    return _block_type_index
+
+
+def _page_slice(total, page, page_size):
+    """Rentang [start, stop) item ke-n dari yang terbaru untuk halaman page (mulai dari 1)"""
+    stop = max(total - (page - 1) * page_size, 0)
+    return max(stop - page_size, 0), stop
+
+
+def _user_block_offsets(username, transaction_type):
+    """Offset blok (unik, terurut) yang memuat transaksi user, opsional dengan filter tipe"""
+    created, signed = get_user_index().get_offsets(username)
+    locations = [(offset, position, 'CREATE_PETITION') for offset, position in created]
+    locations += [(offset, position, 'SIGN_PETITION') for offset, position in signed]
+
+    offsets = set()
+    for offset, position, tx_type in locations:
+        # Transaksi di dalam blok BATCH terlihat sebagai blok bertipe BATCH di explorer
+        block_type = BATCH_TRANSACTION_TYPE if position is not None else tx_type
+        if transaction_type is None or block_type == transaction_type:
+            offsets.add(offset)
+    return sorted(offsets)
+
+
+def _explorer_source(transaction_type, username):
+    """(jumlah blok yang cocok, fungsi pembaca blok ke-[start, stop) dari yang cocok)"""
+    if username:
+        offsets = _user_block_offsets(username, transaction_type)
+        return len(offsets), lambda start, stop: chain_store.read_blocks_at(offsets[start:stop])
+
+    if transaction_type:
+        indexes = get_block_type_index().get(transaction_type)
+        return len(indexes), lambda start, stop: [chain_store.read_block(index)
+                                                  for index in indexes[start:stop]]
+
+    return chain_store.block_count(), chain_store.read_block_range
+
+
+def count_explorer_blocks(transaction_type=None, username=None):
+    """Jumlah blok yang cocok dengan filter explorer"""
+    ensure_chain_store()
+    return _explorer_source(transaction_type, username)[0]
+
+
+def load_explorer_page(page, page_size, transaction_type=None, username=None):
+    """Membaca satu halaman blok untuk explorer, terbaru lebih dulu
+
+    Mengembalikan (blok, total_blok_yang_cocok). Tanpa filter, filter tipe, atau
+    filter user, yang dibaca dari disk hanya blok di halaman ini.
+    """
+    ensure_chain_store()
+    total, read_blocks = _explorer_source(transaction_type, username)
+    start, stop = _page_slice(total, page, page_size)
+    return list(reversed(read_blocks(start, stop))), total
+
+
+def find_block(query):
+    """Mencari blok berdasarkan index atau (awalan) hash; mengembalikan blok atau None
+
+    Pencarian index memakai indeks offset (O(1)); pencarian hash memakai
+    awalan hash di BlockTypeIndex dan hanya membaca blok kandidat dari disk.
+    """
+    ensure_chain_store()
+    query = query.strip()
+    if query.isdigit():
+        return chain_store.read_block(int(query))
+    if len(query) >= MIN_HASH_PREFIX and _HEX_PATTERN.fullmatch(query):
+        hash_prefix = query.lower()
+        for index in get_block_type_index().hash_candidates(hash_prefix):
+            block = chain_store.read_block(index)
+            if block is not None and block['hash'].startswith(hash_prefix):
+                return block
+    return None
+
+
+def page_of_block(block_index, page_size):
+    """Nomor halaman explorer tanpa filter yang memuat blok block_index"""
+    total = chain_store.block_count()
+    return (total - 1 - block_index) // page_size + 1
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto_utils import DEFAULT_SIGNATURE_SCHEME, get_signature_scheme
+from metrics import get_metrics
+
+# Jumlah pasangan key yang disiapkan di pool
+KEY_POOL_DEPTH = 8
+# Pengisian ulang dimulai saat isi pool turun sampai batas ini, lalu diisi sampai penuh
+KEY_POOL_LOW_WATER = 4
+# Jumlah thread (atau proses, jika use_processes) yang membuat key di background
+KEY_POOL_WORKERS = 1
+
+
+def _generate_private_key_data(scheme_name):
+    """Dijalankan di proses worker: private key baru dalam bentuk yang bisa di-pickle"""
+    scheme = get_signature_scheme(scheme_name)
+    return scheme.dump_private_key(scheme.generate_keys()[0])
+
+
+class KeyPairPool:
+    """Pool pasangan key satu skema tanda tangan yang dibuat lebih dulu di background.
+
+    take() mengambil key yang sudah siap tanpa menunggu pembuatan key; hanya
+    jika pool kosong key dibuat langsung di thread pemanggil. Pengisian ulang
+    berjalan saat isi pool turun sampai low_water dan berhenti saat pool
+    penuh (depth). Dengan use_processes, key dibuat di proses terpisah agar
+    tidak bersaing GIL dengan thread aplikasi.
+    """
+
+    def __init__(self, scheme=DEFAULT_SIGNATURE_SCHEME, depth=KEY_POOL_DEPTH, low_water=KEY_POOL_LOW_WATER,
+                 workers=KEY_POOL_WORKERS, use_processes=False):
+        self.scheme = get_signature_scheme(scheme)
+        self.depth = depth
+        self.low_water = min(low_water, depth)
+        self.workers = workers
+        self.use_processes = use_processes
+        self._keys = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        # Pool diisi penuh saat pertama kali dijalankan
+        self._refilling = True
+        self._started = False
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self._generate_seconds = 0.0
+
+    def start(self):
+        """Menjalankan worker pengisi pool (cukup sekali; pemanggilan berikutnya diabaikan)"""
+        with self._cond:
+            if self._started or self.depth <= 0:
+                return
+            self._started = True
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"key-pool-{self.scheme.name}-{i}", daemon=True).start()
+
+    def _generate(self):
+        if self._executor is not None:
+            data = self._executor.submit(_generate_private_key_data, self.scheme.name).result()
+            return self.scheme.load_private_key(data)
+        return self.scheme.generate_keys()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not (self._refilling and len(self._keys) + self._in_flight < self.depth):
+                    self._cond.wait()
+                self._in_flight += 1
+
+            start = time.perf_counter()
+            try:
+                key_pair = self._generate()
+            except Exception:
+                key_pair = None
+                # Jeda sebelum mencoba lagi agar worker yang gagal tidak berputar terus
+                time.sleep(1)
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                self._in_flight -= 1
+                if key_pair is not None:
+                    self._keys.append(key_pair)
+                    self.generated += 1
+                    self._generate_seconds += elapsed
+                if len(self._keys) >= self.depth:
+                    self._refilling = False
+                self._cond.notify_all()
+
+    def take(self):
+        """Mengambil (private_key, public_key) dari pool, atau membuatnya langsung jika kosong"""
+        with self._cond:
+            key_pair = self._keys.popleft() if self._keys else None
+            if key_pair is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if len(self._keys) <= self.low_water and not self._refilling:
+                self._refilling = True
+                self._cond.notify_all()
+        if key_pair is None:
+            key_pair = self.scheme.generate_keys()
+        return key_pair
+
+    def stats(self):
+        """Mengembalikan statistik pool (isi, hit/miss, waktu rata-rata pembuatan key)"""
+        with self._cond:
+            taken = self.hits + self.misses
+            return {
+                "scheme": self.scheme.name,
+                "size": len(self._keys),
+                "depth": self.depth,
+                "low_water": self.low_water,
+                "in_flight": self._in_flight,
+                "refilling": self._refilling,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / taken if taken else 0.0,
+                "generated": self.generated,
+                "avg_generate_ms": (self._generate_seconds / self.generated * 1000) if self.generated else None,
+                "workers": self.workers,
+                "use_processes": self.use_processes,
+            }
+
+
+_key_pools = {}
+_key_pools_lock = threading.Lock()
+
+
+def get_key_pool(scheme=DEFAULT_SIGNATURE_SCHEME):
+    """Mengembalikan pool key bersama per skema; worker dijalankan saat pertama dipanggil"""
+    with _key_pools_lock:
+        key_pool = _key_pools.get(scheme)
+        if key_pool is None:
+            key_pool = _key_pools[scheme] = KeyPairPool(scheme)
+            metric = f"key_pool_{scheme.replace('-', '_')}"
+            get_metrics().register_gauge(f"{metric}_hit_ratio", lambda: key_pool.stats()['hit_ratio'],
+                                         "Rasio login yang mendapat key siap pakai dari pool")
+            get_metrics().register_gauge(f"{metric}_size", lambda: key_pool.stats()['size'])
+    key_pool.start()
+    return key_pool
@@ -0,0 +1,398 @@
+"""CLI headless untuk audit, ekspor, dan impor ledger tanpa Streamlit.
+
+    python ledger_cli.py validate [--full] [--chain-only | --signatures-only]
+                                  [--workers 4] [--chunk-size 256] [--no-memo] [--json]
+    python ledger_cli.py export blocks [--format jsonl|csv] [--output blok.jsonl]
+                                       [--type SIGN_PETITION] [--from-index 0] [--to-index 100]
+    python ledger_cli.py export signers [--format csv|jsonl] [--output ttd.csv] [--petition-id ID]
+    python ledger_cli.py import transaksi.jsonl [--format jsonl|csv] [--batch-size 1000] [--merkle]
+    python ledger_cli.py snapshot verify|save [--json]
+    python ledger_cli.py proof bukti.json [--json]
+    python ledger_cli.py --metrics-file metrics.prom validate
+
+Validasi chain bersifat inkremental (mulai dari checkpoint) kecuali --full;
+validasi tanda tangan memakai hasil verifikasi tersimpan kecuali --no-memo.
+Ekspor dibaca secara streaming dari log blok. Impor menerima blok hasil
+ekspor (JSONL/CSV) atau baris {"transaction_type", "transaction_data"};
+transaksi ditautkan ulang ke chain ini, blok GENESIS dilewati dan isi blok
+BATCH diimpor per transaksi. "snapshot verify" membangun ulang state view dari
+log dan mencocokkannya dengan snapshot beserta file kolomnya; "snapshot save"
+langsung menulis snapshot dari state terbaru. "proof" memeriksa bukti inklusi
+Merkle (misalnya yang diunduh dari halaman Profil) terhadap hash blok di chain
+lokal. Dengan --metrics-file, timer dan counter (lihat
+metrics.py) dicatat selama perintah berjalan lalu ditulis ke file dalam format
+teks Prometheus. Exit code 0 jika semua valid/berhasil, 1 jika tidak.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import sys
+import time
+
+import chain_store
+from batch_verify import DEFAULT_CHUNK_SIZE, default_workers, finish_summary, new_summary
+from blockchain_utils import (
+    describe_signature_summary,
+    ensure_chain_store,
+    get_chain_writer,
+    iter_signature_audit,
+    validate_chain,
+    verify_inclusion_proof,
+)
+from chain_cache import get_chain_cache
+from crypto_utils import signature_scheme_of
+from ledger_daemon import pending_petition, validate_transaction
+from merkle import BATCH_TRANSACTION_TYPE
+from metrics import METRICS_FILE, get_metrics
+from snapshot import install_snapshot_store, verify_snapshot
+
+BLOCK_CSV_FIELDS = ['index', 'timestamp', 'transaction_type', 'transaction_data', 'previous_hash', 'hash',
+                    'version']
+SIGNER_CSV_FIELDS = ['index', 'batch_position', 'timestamp', 'petition_id', 'signer_username',
+                     'signature_scheme']
+DEFAULT_IMPORT_BATCH = 1000
+
+
+def _open_output(path):
+    if path in (None, '-'):
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _open_input(path):
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def _write_rows(rows, fields, fmt, output):
+    """Menulis dict baris sebagai JSONL atau CSV; mengembalikan jumlah baris"""
+    count = 0
+    with _open_output(output) as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+    return count
+
+
+def cmd_validate(args):
+    report = {}
+    ok = True
+
+    if not args.signatures_only:
+        start = time.perf_counter()
+        valid, message = validate_chain(full=args.full)
+        report['chain'] = {"valid": valid, "message": message,
+                           "elapsed_seconds": round(time.perf_counter() - start, 4)}
+        ok = ok and valid
+
+    if not args.chain_only:
+        workers = args.workers or default_workers()
+        chunk_size = args.chunk_size or DEFAULT_CHUNK_SIZE
+        summary = new_summary(workers, chunk_size)
+        failures = []
+        start = time.perf_counter()
+        try:
+            for result in iter_signature_audit(summary, workers, chunk_size, not args.no_memo):
+                if result['status'] != 'valid':
+                    failures.append(result)
+        except FileNotFoundError as e:
+            report['signatures'] = {"valid": False, "message": str(e)}
+            ok = False
+        else:
+            finish_summary(summary, time.perf_counter() - start)
+            valid, message = describe_signature_summary(summary)
+            report['signatures'] = {"valid": valid, "message": message,
+                                    "summary": summary, "failures": failures}
+            ok = ok and valid
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        if 'chain' in report:
+            chain = report['chain']
+            print(f"Chain      : {'VALID' if chain['valid'] else 'TIDAK VALID'} - {chain['message']} "
+                  f"({chain['elapsed_seconds']:.2f} detik)")
+        if 'signatures' in report:
+            signatures = report['signatures']
+            line = f"Tanda tgn  : {'VALID' if signatures['valid'] else 'TIDAK VALID'} - {signatures['message']}"
+            if 'summary' in signatures:
+                summary = signatures['summary']
+                line += (f" ({summary['elapsed_seconds']:.2f} detik, {summary['workers']} worker, "
+                         f"{summary['memo_hits']} dari memo)")
+            print(line)
+            for result in signatures.get('failures', []):
+                position = '' if result['batch_position'] is None else f"#{result['batch_position']}"
+                print(f"  blok {result['index']}{position}: {result['signer_username']} -> "
+                      f"{result['petition_id']} [{result['status']}]")
+    return 0 if ok else 1
+
+
+def _block_rows(blocks, fmt):
+    for block in blocks:
+        if fmt == 'csv':
+            # Isi transaksi tetap disimpan utuh sebagai JSON dalam satu kolom
+            block = dict(block, transaction_data=json.dumps(block['transaction_data'], ensure_ascii=False))
+        yield block
+
+
+def _signer_rows(transactions):
+    for transaction in transactions:
+        yield {
+            "index": transaction['index'],
+            "batch_position": transaction.get('batch_position'),
+            "timestamp": transaction['timestamp'],
+            "petition_id": transaction['transaction_data'].get('petition_id'),
+            "signer_username": transaction['transaction_data'].get('signer_username'),
+            "signature_scheme": signature_scheme_of(transaction['transaction_data']),
+        }
+
+
+def cmd_export(args):
+    ensure_chain_store()
+    if args.what == 'blocks':
+        fmt = args.format or 'jsonl'
+        if args.type == BATCH_TRANSACTION_TYPE:
+            # Tipe BATCH ada di header blok, bukan di transaksi di dalamnya
+            blocks = (block for block in chain_store.stream_blocks(start_index=args.from_index,
+                                                                   end_index=args.to_index)
+                      if block['transaction_type'] == BATCH_TRANSACTION_TYPE)
+        else:
+            blocks = chain_store.stream_blocks(transaction_type=args.type, start_index=args.from_index,
+                                               end_index=args.to_index)
+        count = _write_rows(_block_rows(blocks, fmt), BLOCK_CSV_FIELDS, fmt, args.output)
+    else:
+        fmt = args.format or 'csv'
+        transactions = chain_store.stream_transactions('SIGN_PETITION', petition_id=args.petition_id,
+                                                       start_index=args.from_index, end_index=args.to_index)
+        count = _write_rows(_signer_rows(transactions), SIGNER_CSV_FIELDS, fmt, args.output)
+    print(f"{count} baris diekspor", file=sys.stderr)
+    return 0
+
+
+def _read_records(path, fmt):
+    """Menghasilkan (nomor_baris, record, error) dari file JSONL atau CSV"""
+    with _open_input(path) as f:
+        if fmt == 'csv':
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    row['transaction_data'] = json.loads(row.get('transaction_data') or 'null')
+                except json.JSONDecodeError as e:
+                    yield line_number, None, f"transaction_data bukan JSON yang valid: {e}"
+                    continue
+                yield line_number, row, None
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, None, f"Baris bukan JSON yang valid: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, None, "Baris harus berupa JSON object"
+                    continue
+                yield line_number, record, None
+
+
+def iter_import_transactions(path, fmt):
+    """Menghasilkan (nomor_baris, transaction_type, transaction_data, error) dari file impor"""
+    for line_number, record, error in _read_records(path, fmt):
+        if error:
+            yield line_number, None, None, error
+            continue
+        tx_type = record.get('transaction_type')
+        tx_data = record.get('transaction_data')
+        if tx_type == 'GENESIS':
+            continue
+        if tx_type == BATCH_TRANSACTION_TYPE:
+            transactions = tx_data.get('transactions') if isinstance(tx_data, dict) else None
+            if not isinstance(transactions, list):
+                yield line_number, None, None, "Blok BATCH tanpa daftar transaksi"
+                continue
+            for transaction in transactions:
+                if not isinstance(transaction, dict):
+                    yield line_number, None, None, "Transaksi di dalam blok BATCH harus berupa JSON object"
+                    continue
+                yield line_number, transaction.get('transaction_type'), transaction.get('transaction_data'), None
+        else:
+            yield line_number, tx_type, tx_data, None
+
+
+def cmd_import(args):
+    ensure_chain_store()
+    fmt = args.format or ('csv' if args.file.endswith('.csv') else 'jsonl')
+    writer = get_chain_writer()
+    cache = get_chain_cache()
+    imported, rejected = 0, []
+    pending, pending_petitions, pending_signatures = [], {}, set()
+
+    def flush():
+        nonlocal imported
+        if pending:
+            writer.write_batch(pending, as_merkle_batch=args.merkle)
+            # Indeks petisi harus melihat transaksi yang baru ditulis sebelum validasi berikutnya
+            cache.refresh()
+            imported += len(pending)
+        pending.clear()
+        pending_petitions.clear()
+        pending_signatures.clear()
+
+    start = time.perf_counter()
+    try:
+        for line_number, tx_type, tx_data, error in iter_import_transactions(args.file, fmt):
+            error = error or validate_transaction(tx_type, tx_data, pending_petitions, pending_signatures)
+            if error:
+                rejected.append({"line": line_number, "error": error})
+                continue
+            if tx_type == 'CREATE_PETITION':
+                pending_petitions[tx_data['petition_id']] = pending_petition(tx_data)
+            else:
+                pending_signatures.add((tx_data['petition_id'], tx_data['signer_username']))
+            pending.append((tx_type, tx_data))
+            if len(pending) >= args.batch_size:
+                flush()
+    finally:
+        flush()
+
+    report = {"imported": imported, "rejected": len(rejected),
+              "elapsed_seconds": round(time.perf_counter() - start, 4), "errors": rejected}
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"{imported} transaksi diimpor, {len(rejected)} ditolak ({report['elapsed_seconds']:.2f} detik)")
+        for error in rejected:
+            print(f"  baris {error['line']}: {error['error']}")
+    return 0 if not rejected else 1
+
+
+def cmd_snapshot(args):
+    ensure_chain_store()
+    start = time.perf_counter()
+    if args.action == 'save':
+        cache = get_chain_cache()
+        cache.refresh()
+        store = install_snapshot_store()
+        store.save(cache, rewrite=True)
+        snapshot = store.read()
+        valid = snapshot is not None
+        message = (f"Snapshot ditulis sampai blok {snapshot['block_index']}" if valid
+                   else "Snapshot gagal ditulis")
+    else:
+        valid, message = verify_snapshot()
+    report = {"valid": valid, "message": message, "elapsed_seconds": round(time.perf_counter() - start, 4)}
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        status = ('OK' if valid else 'GAGAL') if args.action == 'save' else ('VALID' if valid else 'TIDAK VALID')
+        print(f"Snapshot   : {status} - {message} ({report['elapsed_seconds']:.2f} detik)")
+    return 0 if valid else 1
+
+
+def _check_proof_file(path):
+    """Memeriksa file bukti inklusi terhadap chain lokal; mengembalikan (valid, pesan, bukti)"""
+    try:
+        with _open_input(path) as f:
+            proof = json.load(f)
+    except json.JSONDecodeError as e:
+        return False, f"File bukti bukan JSON yang valid: {e}", None
+    if not isinstance(proof, dict) or not isinstance(proof.get('block_header'), dict):
+        return False, "File bukti tidak memuat header blok", None
+    block_index = proof['block_header'].get('index')
+    # Hash yang dipercaya diambil dari chain lokal, bukan dari header di dalam bukti
+    block = chain_store.read_block(block_index) if isinstance(block_index, int) and block_index >= 0 else None
+    if block is None:
+        return False, "Blok dalam bukti tidak ada di chain lokal", proof
+    valid, message = verify_inclusion_proof(proof, block['hash'])
+    return valid, message, proof
+
+
+def cmd_proof(args):
+    ensure_chain_store()
+    valid, message, proof = _check_proof_file(args.file)
+    report = {"valid": valid, "message": message}
+    if proof is not None:
+        report.update(block_index=proof['block_header'].get('index'), batch_position=proof.get('batch_position'))
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"Bukti      : {'VALID' if valid else 'TIDAK VALID'} - {message}")
+    return 0 if valid else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit, ekspor, dan impor ledger Petisi Digital")
+    parser.add_argument('--metrics-file', nargs='?', const=METRICS_FILE, default=None,
+                        help=f"Catat metrik lalu tulis ke file ini setelah perintah selesai (bawaan: {METRICS_FILE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    validate = commands.add_parser('validate', help="Validasi hash chain dan tanda tangan")
+    validate.add_argument('--full', action='store_true', help="Audit chain dari blok pertama, abaikan checkpoint")
+    scope = validate.add_mutually_exclusive_group()
+    scope.add_argument('--chain-only', action='store_true', help="Hanya validasi hash chain")
+    scope.add_argument('--signatures-only', action='store_true', help="Hanya validasi tanda tangan")
+    validate.add_argument('--workers', type=int, default=None, help="Jumlah proses verifikasi tanda tangan")
+    validate.add_argument('--chunk-size', type=int, default=None, help="Tanda tangan per chunk worker")
+    validate.add_argument('--no-memo', action='store_true', help="Abaikan hasil verifikasi tersimpan")
+    validate.add_argument('--json', action='store_true', help="Cetak laporan dalam format JSON")
+    validate.set_defaults(handler=cmd_validate)
+
+    export = commands.add_parser('export', help="Ekspor blok atau daftar penandatangan secara streaming")
+    export.add_argument('what', choices=['blocks', 'signers'])
+    export.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                        help="Bawaan: jsonl untuk blocks, csv untuk signers")
+    export.add_argument('--output', '-o', default=None, help="File tujuan (bawaan: stdout)")
+    export.add_argument('--type', default=None, help="Hanya blok yang memuat transaksi bertipe ini (khusus blocks)")
+    export.add_argument('--petition-id', default=None, help="Filter ID petisi (khusus signers)")
+    export.add_argument('--from-index', type=int, default=None)
+    export.add_argument('--to-index', type=int, default=None)
+    export.set_defaults(handler=cmd_export)
+
+    import_ = commands.add_parser('import', help="Impor transaksi dari file JSONL/CSV")
+    import_.add_argument('file', help="File impor ('-' untuk stdin)")
+    import_.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                         help="Bawaan: ditebak dari ekstensi file")
+    import_.add_argument('--batch-size', type=int, default=DEFAULT_IMPORT_BATCH,
+                         help="Transaksi per penulisan (satu lock dan satu fsync)")
+    import_.add_argument('--merkle', action='store_true', help="Tulis setiap batch sebagai satu blok BATCH")
+    import_.add_argument('--json', action='store_true', help="Cetak laporan dalam format JSON")
+    import_.set_defaults(handler=cmd_import)
+
+    snapshot = commands.add_parser('snapshot', help="Periksa atau tulis snapshot state view")
+    snapshot.add_argument('action', choices=['verify', 'save'],
+                          help="verify: cocokkan snapshot dengan replay chain; save: tulis snapshot sekarang")
+    snapshot.add_argument('--json', action='store_true', help="Cetak laporan dalam format JSON")
+    snapshot.set_defaults(handler=cmd_snapshot)
+
+    proof = commands.add_parser('proof', help="Periksa bukti inklusi Merkle terhadap chain lokal")
+    proof.add_argument('file', help="File bukti JSON ('-' untuk stdin)")
+    proof.add_argument('--json', action='store_true', help="Cetak laporan dalam format JSON")
+    proof.set_defaults(handler=cmd_proof)
+
+    args = parser.parse_args(argv)
+    snapshot_store = install_snapshot_store()
+    metrics = get_metrics()
+    if args.metrics_file:
+        metrics.enable()
+    try:
+        return args.handler(args)
+    finally:
+        # Snapshot yang sedang ditulis di background diselesaikan sebelum proses keluar
+        snapshot_store.wait()
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+import json
+import os
+import socket
+
+# Alamat daemon: "unix:/path/ledger.sock" atau "tcp:127.0.0.1:8765"
+LEDGER_DAEMON_ENV = 'LEDGER_DAEMON'
+DEFAULT_SOCKET = 'ledger.sock'
+REQUEST_TIMEOUT = 10.0
+
+
+class LedgerUnavailable(Exception):
+    """Daemon ledger tidak dikonfigurasi atau tidak bisa dihubungi (permintaan belum terkirim)"""
+
+
+class LedgerRequestFailed(Exception):
+    """Permintaan sudah terkirim tetapi balasan daemon tidak diterima; hasilnya tidak diketahui"""
+
+
+def daemon_address():
+    """Mengembalikan (family, alamat) daemon, atau None jika tidak ada daemon"""
+    address = os.environ.get(LEDGER_DAEMON_ENV)
+    if address:
+        scheme, _, rest = address.partition(':')
+        if scheme == 'tcp':
+            host, _, port = rest.rpartition(':')
+            return socket.AF_INET, (host or '127.0.0.1', int(port))
+        return socket.AF_UNIX, rest
+    if hasattr(socket, 'AF_UNIX') and os.path.exists(DEFAULT_SOCKET):
+        return socket.AF_UNIX, DEFAULT_SOCKET
+    return None
+
+
+def _request(payload, timeout=REQUEST_TIMEOUT):
+    address = daemon_address()
+    if address is None:
+        raise LedgerUnavailable("Daemon ledger tidak dikonfigurasi")
+    family, target = address
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(target)
+        except OSError as e:
+            raise LedgerUnavailable(f"Daemon ledger tidak bisa dihubungi: {e}") from e
+        # Setelah terhubung, daemon bisa saja sudah memproses permintaan meskipun
+        # balasannya gagal diterima, jadi kegagalan di sini tidak boleh dianggap
+        # "daemon tidak ada"
+        try:
+            sock.sendall(json.dumps(payload).encode() + b'\n')
+            with sock.makefile('rb') as response:
+                line = response.readline()
+        except OSError as e:
+            raise LedgerRequestFailed(f"Balasan daemon ledger tidak diterima: {e}") from e
+    if not line:
+        raise LedgerRequestFailed("Daemon ledger menutup koneksi sebelum membalas")
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise LedgerRequestFailed(f"Balasan daemon ledger tidak valid: {e}") from e
+
+
+def submit_block(transaction_type, transaction_data, timeout=REQUEST_TIMEOUT):
+    """Mengirim transaksi ke daemon; mengembalikan {"ok", "index", "hash"} atau {"ok": False, "error"}
+
+    Jika transaksi masuk ke blok BATCH, balasan juga memuat "batch_position".
+    """
+    return _request({"transaction_type": transaction_type,
+                     "transaction_data": transaction_data}, timeout)
+
+
+def request_metrics(timeout=REQUEST_TIMEOUT):
+    """Meminta metrik daemon dalam format teks Prometheus"""
+    response = _request({"op": "metrics"}, timeout)
+    if not response.get('ok'):
+        raise LedgerRequestFailed(response.get('error', "Daemon tidak mengirim metrik"))
+    return response['metrics']
+
+
+def submit_transaction(transaction_type, transaction_data):
+    """Menambahkan transaksi lewat daemon, atau langsung ke log jika daemon tidak ada
+
+    Penulisan lokal hanya dipakai jika daemon tidak bisa dihubungi sama sekali.
+    Jika permintaan sudah terkirim tetapi balasannya hilang, transaksi tidak
+    dikirim ulang karena daemon mungkin sudah menulisnya.
+    Mengembalikan (berhasil, pesan_error).
+    """
+    try:
+        response = submit_block(transaction_type, transaction_data)
+    except LedgerUnavailable:
+        # Validasi yang sama seperti di daemon, lalu penulisan lokal yang dilindungi lock antarproses
+        from blockchain_utils import add_block
+        from ledger_daemon import validate_transaction
+        error = validate_transaction(transaction_type, transaction_data)
+        if error:
+            return False, error
+        if add_block(transaction_type, transaction_data):
+            return True, None
+        return False, "Gagal menambahkan blok ke blockchain."
+    except LedgerRequestFailed as e:
+        return False, (f"Status transaksi tidak diketahui ({e}). "
+                       "Periksa blockchain sebelum mencoba lagi.")
+
+    if response.get('ok'):
+        return True, None
+    return False, response.get('error', "Daemon ledger menolak transaksi.")
@@ -0,0 +1,288 @@
+"""Daemon ingestion blok: satu proses yang memiliki log blok dan menerima transaksi.
+
+Protokol: JSON Lines lewat Unix socket (atau TCP localhost). Setiap baris
+permintaan berisi {"transaction_type": ..., "transaction_data": {...}} dan
+dibalas {"ok": true, "index": ..., "hash": ...} atau {"ok": false, "error": ...}.
+Permintaan {"op": "ping"} dibalas {"ok": true}.
+
+Transaksi yang datang bersamaan digabung menjadi satu blok BATCH (Merkle
+root) jika jumlahnya minimal --merkle-batch; balasannya lalu memuat
+"batch_position". Bukti inklusi diminta dengan
+{"op": "proof", "index": ..., "position": ...}.
+
+Dengan --metrics-port, metrik (lihat metrics.py) disajikan dalam format teks
+Prometheus di http://127.0.0.1:PORT/metrics; dengan --metrics-file, metrik
+ditulis ke file secara berkala. Permintaan {"op": "metrics"} membalas
+{"ok": true, "metrics": "<teks Prometheus>"}.
+
+    python ledger_daemon.py [--socket ledger.sock | --host 127.0.0.1 --port 8765] [--merkle-batch 2]
+                            [--metrics-port 9464] [--metrics-file metrics.prom]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+
+from blockchain_utils import ensure_chain_store, get_chain_writer, get_inclusion_proof
+from chain_cache import get_chain_cache
+from crypto_utils import (SIGNATURE_SCHEMES, SIGNING_MESSAGE_VERSIONS, block_signing_message, petition_digest,
+                          signature_scheme_of, verify_signature)
+from metrics import METRICS_FILE, get_metrics
+from petition_index import get_petition_index
+from snapshot import install_snapshot_store
+from user_store import get_user_store
+
+DEFAULT_SOCKET = 'ledger.sock'
+# Jumlah minimal transaksi dalam satu group commit agar ditulis sebagai blok BATCH
+DEFAULT_MERKLE_BATCH_MIN = 2
+# Batas panjang satu baris permintaan (teks petisi bisa panjang)
+MAX_REQUEST_BYTES = 1024 * 1024
+# Jarak antar penulisan file metrik (detik)
+METRICS_DUMP_INTERVAL = 10
+
+_metrics = get_metrics()
+_metrics.describe('daemon_submit', "Latensi satu transaksi di daemon: validasi, group commit, dan refresh")
+_metrics.describe('transactions_rejected', "Transaksi yang ditolak validasi daemon")
+
+_REQUIRED_FIELDS = {
+    "CREATE_PETITION": ("petition_id", "petition_text", "creator"),
+    "SIGN_PETITION": ("signer_username", "petition_id", "signature"),
+}
+
+
+def validate_transaction(transaction_type, transaction_data, pending_petitions=None, pending_signatures=()):
+    """Memeriksa transaksi terhadap indeks petisi; mengembalikan pesan error atau None
+
+    pending_petitions (petition_id -> (teks, digest)) dan pending_signatures
+    berisi transaksi yang sudah diterima tetapi belum tertulis, agar duplikat
+    di antaranya ikut ditolak dan tanda tangan untuk petisi yang belum tertulis
+    tetap bisa diverifikasi. Tanda tangan SIGN_PETITION diverifikasi dengan
+    public key penandatangan di penyimpan user sebelum ditautkan.
+    """
+    pending_petitions = pending_petitions or {}
+    fields = _REQUIRED_FIELDS.get(transaction_type)
+    if fields is None:
+        return f"Tipe transaksi tidak dikenal: {transaction_type}"
+    if not isinstance(transaction_data, dict):
+        return "transaction_data harus berupa object"
+    for field in fields:
+        value = transaction_data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f"Field '{field}' wajib diisi"
+    if transaction_type == "CREATE_PETITION":
+        digest = transaction_data.get('petition_digest')
+        if digest is not None and digest != petition_digest(transaction_data['petition_text']):
+            return "petition_digest tidak sesuai dengan teks petisi"
+    else:
+        scheme = transaction_data.get('signature_scheme')
+        if scheme is not None and scheme not in SIGNATURE_SCHEMES:
+            return f"Skema tanda tangan tidak dikenal: {scheme}"
+        version = transaction_data.get('message_version')
+        if version is not None and version not in SIGNING_MESSAGE_VERSIONS:
+            return f"Versi pesan tanda tangan tidak dikenal: {version}"
+
+    petition_index = get_petition_index()
+    petition_id = transaction_data['petition_id']
+    if transaction_type == "CREATE_PETITION":
+        if petition_index.get(petition_id) or petition_id in pending_petitions:
+            return f"Petisi '{petition_id}' sudah ada"
+    else:
+        signer = transaction_data['signer_username']
+        if not petition_index.get(petition_id) and petition_id not in pending_petitions:
+            return f"Petisi '{petition_id}' tidak ditemukan"
+        if (petition_index.has_signed(petition_id, signer)
+                or (petition_id, signer) in pending_signatures):
+            return f"'{signer}' sudah menandatangani petisi '{petition_id}'"
+        public_key_str = get_user_store().get(signer)
+        if public_key_str is None:
+            return f"Public key '{signer}' tidak ditemukan"
+        petition = petition_index.get(petition_id)
+        petition_text, digest = (petition.text, petition.digest) if petition else pending_petitions[petition_id]
+        message = block_signing_message(transaction_data, petition_text, digest)
+        if message is None or not verify_signature(message, transaction_data['signature'], public_key_str,
+                                                   signature_scheme_of(transaction_data)):
+            return f"Tanda tangan '{signer}' untuk petisi '{petition_id}' tidak valid"
+    return None
+
+
+def pending_petition(transaction_data):
+    """Entri pending_petitions untuk transaksi CREATE_PETITION: (teks, digest)"""
+    petition_text = transaction_data['petition_text']
+    return petition_text, transaction_data.get('petition_digest') or petition_digest(petition_text)
+
+
+class LedgerService:
+    """Memvalidasi transaksi lalu menautkannya ke chain lewat penulis group commit"""
+
+    def __init__(self, merkle_batch_min=DEFAULT_MERKLE_BATCH_MIN):
+        ensure_chain_store()
+        self._writer = get_chain_writer()
+        self._writer.merkle_batch_min = merkle_batch_min
+        # Transaksi yang sudah diterima tetapi belum tertulis, untuk cek duplikat
+        self._pending_petitions = {}
+        self._pending_signatures = set()
+        # Task penulis file metrik berkala (lihat serve); dibatalkan saat daemon berhenti
+        self.metrics_dump_task = None
+
+    def _validate(self, transaction_type, transaction_data):
+        return validate_transaction(transaction_type, transaction_data,
+                                    self._pending_petitions, self._pending_signatures)
+
+    async def submit(self, transaction_type, transaction_data):
+        start = time.perf_counter()
+        error = self._validate(transaction_type, transaction_data)
+        if error:
+            _metrics.inc('transactions_rejected')
+            return {"ok": False, "error": error}
+
+        if transaction_type == "CREATE_PETITION":
+            pending_key = transaction_data['petition_id']
+            self._pending_petitions[pending_key] = pending_petition(transaction_data)
+        else:
+            pending_key = (transaction_data['petition_id'], transaction_data['signer_username'])
+            self._pending_signatures.add(pending_key)
+        try:
+            future = self._writer.submit(transaction_type, transaction_data)
+            block, position = await asyncio.wrap_future(future)
+            get_chain_cache().refresh()
+        finally:
+            if transaction_type == "CREATE_PETITION":
+                self._pending_petitions.pop(pending_key, None)
+            else:
+                self._pending_signatures.discard(pending_key)
+        _metrics.observe('daemon_submit', time.perf_counter() - start)
+        response = {"ok": True, "index": block['index'], "hash": block['hash']}
+        if position is not None:
+            response["batch_position"] = position
+        return response
+
+    async def handle_request(self, request):
+        if request.get("op") == "ping":
+            return {"ok": True}
+        if request.get("op") == "proof":
+            try:
+                proof = get_inclusion_proof(int(request["index"]), int(request["position"]))
+            except (KeyError, IndexError, ValueError, TypeError) as e:
+                return {"ok": False, "error": f"Bukti inklusi tidak bisa dibuat: {e}"}
+            return {"ok": True, "proof": proof}
+        if request.get("op") == "metrics":
+            return {"ok": True, "metrics": _metrics.render_prometheus()}
+        return await self.submit(request.get("transaction_type"), request.get("transaction_data"))
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    response = {"ok": False, "error": "Permintaan bukan JSON object yang valid"}
+                except Exception as e:
+                    response = {"ok": False, "error": f"Gagal menambahkan blok: {e}"}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def handle_metrics_http(reader, writer):
+    """Endpoint HTTP minimal: GET /metrics membalas teks Prometheus"""
+    try:
+        request_line = await reader.readline()
+        # Header permintaan dibaca sampai baris kosong lalu diabaikan
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = "200 OK", _metrics.render_prometheus().encode('utf-8')
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+        writer.write((f"HTTP/1.1 {status}\r\n"
+                      "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      "Connection: close\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def dump_metrics_periodically(path, interval=METRICS_DUMP_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            _metrics.dump(path)
+        except OSError as e:
+            print(f"Gagal menulis metrik ke {path}: {e}")
+
+
+async def serve(socket_path=None, host=None, port=None, merkle_batch_min=DEFAULT_MERKLE_BATCH_MIN,
+                metrics_port=None, metrics_file=None):
+    service = LedgerService(merkle_batch_min)
+    if metrics_port:
+        await asyncio.start_server(handle_metrics_http, host='127.0.0.1', port=metrics_port)
+        print(f"Metrik tersedia di http://127.0.0.1:{metrics_port}/metrics")
+    if metrics_file:
+        service.metrics_dump_task = asyncio.create_task(dump_metrics_periodically(metrics_file))
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(service.handle_connection, path=socket_path,
+                                                 limit=MAX_REQUEST_BYTES)
+        print(f"Ledger daemon mendengarkan di unix:{socket_path}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host=host, port=port,
+                                            limit=MAX_REQUEST_BYTES)
+        print(f"Ledger daemon mendengarkan di tcp:{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if service.metrics_dump_task is not None:
+            service.metrics_dump_task.cancel()
+            try:
+                await service.metrics_dump_task
+            except asyncio.CancelledError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon ingestion blok untuk Petisi Digital")
+    parser.add_argument('--socket', default=None, help=f"Path Unix socket (bawaan: {DEFAULT_SOCKET})")
+    parser.add_argument('--host', default=None, help="Gunakan TCP di host ini alih-alih Unix socket")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--merkle-batch', type=int, default=DEFAULT_MERKLE_BATCH_MIN,
+                        help="Minimal transaksi per group commit untuk ditulis sebagai blok BATCH (0 = nonaktif)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Sajikan metrik Prometheus di http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--metrics-file', nargs='?', const=METRICS_FILE, default=None,
+                        help=f"Tulis metrik ke file setiap {METRICS_DUMP_INTERVAL} detik (bawaan: {METRICS_FILE})")
+    args = parser.parse_args()
+    if args.metrics_port or args.metrics_file:
+        _metrics.enable()
+
+    install_snapshot_store()
+    merkle_batch_min = args.merkle_batch or None
+    use_tcp = args.host is not None or not hasattr(socket, 'AF_UNIX')
+    try:
+        if use_tcp:
+            asyncio.run(serve(host=args.host or '127.0.0.1', port=args.port,
+                              merkle_batch_min=merkle_batch_min, metrics_port=args.metrics_port,
+                              metrics_file=args.metrics_file))
+        else:
+            asyncio.run(serve(socket_path=args.socket or DEFAULT_SOCKET,
+                              merkle_batch_min=merkle_batch_min, metrics_port=args.metrics_port,
+                              metrics_file=args.metrics_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+
+from block_encoding import encode_value
+
+# Tipe blok yang membawa banyak transaksi di bawah satu Merkle root
+BATCH_TRANSACTION_TYPE = "BATCH"
+
+# Prefix domain agar hash daun tidak bisa disamarkan sebagai hash node internal
+_LEAF_PREFIX = b'\x00'
+_NODE_PREFIX = b'\x01'
+
+# Sisi saudara dalam bukti inklusi
+LEFT = "L"
+RIGHT = "R"
+
+
+def transaction_leaf_hash(transaction_type, transaction_data):
+    """Hash daun satu transaksi: SHA-256 dari encoding kanonik {type, data}"""
+    encoded = encode_value({"transaction_type": transaction_type,
+                            "transaction_data": transaction_data})
+    return hashlib.sha256(_LEAF_PREFIX + encoded).hexdigest()
+
+
+def _hash_node(left, right):
+    return hashlib.sha256(_NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level):
+    # Node terakhir yang tidak berpasangan naik ke level berikutnya tanpa diduplikasi
+    parents = [_hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaf_hashes):
+    """Menghitung Merkle root dari daftar hash daun (minimal satu daun)"""
+    if not leaf_hashes:
+        raise ValueError("Merkle tree membutuhkan minimal satu transaksi")
+    level = list(leaf_hashes)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaf_hashes, position):
+    """Bukti inklusi daun ke-position: list [sisi, hash saudara] dari daun ke root"""
+    if not 0 <= position < len(leaf_hashes):
+        raise IndexError(f"Posisi transaksi {position} di luar batch")
+    proof = []
+    level = list(leaf_hashes)
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append([LEFT if sibling < position else RIGHT, level[sibling]])
+        level = _next_level(level)
+        position //= 2
+    return proof
+
+
+def root_from_proof(leaf_hash, proof):
+    """Menghitung ulang Merkle root dari hash daun dan bukti inklusinya"""
+    current = leaf_hash
+    for side, sibling in proof:
+        if side == LEFT:
+            current = _hash_node(sibling, current)
+        elif side == RIGHT:
+            current = _hash_node(current, sibling)
+        else:
+            raise ValueError(f"Sisi bukti tidak dikenal: {side}")
+    return current
+
+
+def batch_leaf_hashes(block):
+    """Hash daun semua transaksi dalam blok BATCH, sesuai urutannya"""
+    return [transaction_leaf_hash(tx['transaction_type'], tx['transaction_data'])
+            for tx in block['transaction_data']['transactions']]
+
+
+def batch_header(block):
+    """Header blok BATCH: blok tanpa daftar transaksi, hanya Merkle root dan jumlahnya.
+
+    Hash blok BATCH dihitung dari header ini, sehingga bukti inklusi cukup
+    membawa header (bukan seluruh batch) untuk dicocokkan dengan hash blok.
+    """
+    tx_data = block['transaction_data']
+    if 'transactions' not in tx_data:
+        return block
+    header = dict(block)
+    header['transaction_data'] = {"merkle_root": tx_data['merkle_root'],
+                                  "transaction_count": tx_data['transaction_count']}
+    return header
+
+
+def iter_raw_transactions(block):
+    """Menghasilkan (posisi, transaction_type, transaction_data) tanpa menghitung hash daun
+
+    Posisi bernilai None untuk blok biasa. Dipakai view yang hanya membaca isi
+    transaksi, agar blok BATCH besar tidak di-hash ulang.
+    """
+    if block['transaction_type'] != BATCH_TRANSACTION_TYPE:
+        yield None, block['transaction_type'], block['transaction_data']
+        return
+    for position, tx in enumerate(block['transaction_data']['transactions']):
+        yield position, tx['transaction_type'], tx['transaction_data']
+
+
+def iter_transactions(block):
+    """Menghasilkan setiap transaksi dalam blok sebagai record berbentuk blok.
+
+    Blok biasa dihasilkan apa adanya. Transaksi di dalam blok BATCH dihasilkan
+    sebagai dict dengan index, timestamp, transaction_type, transaction_data,
+    "hash" (hash daun transaksi, unik per transaksi), "block_hash", dan
+    "batch_position", sehingga konsumen bisa memperlakukannya seperti blok biasa.
+    """
+    if block['transaction_type'] != BATCH_TRANSACTION_TYPE:
+        yield block
+        return
+    for position in range(len(block['transaction_data']['transactions'])):
+        yield transaction_at(block, position)
+
+
+def transaction_at(block, position=None):
+    """Mengambil satu record transaksi dari blok (position wajib untuk blok BATCH)"""
+    if block['transaction_type'] != BATCH_TRANSACTION_TYPE:
+        return block
+    tx = block['transaction_data']['transactions'][position]
+    return {
+        "index": block['index'],
+        "timestamp": block['timestamp'],
+        "transaction_type": tx['transaction_type'],
+        "transaction_data": tx['transaction_data'],
+        "hash": transaction_leaf_hash(tx['transaction_type'], tx['transaction_data']),
+        "block_hash": block['hash'],
+        "batch_position": position,
+    }
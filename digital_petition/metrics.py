@@ -0,0 +1,186 @@
+import math
+import os
+import threading
+import time
+
+# Metrik aktif jika variabel lingkungan ini bernilai selain "" atau "0"
+METRICS_ENV = 'PETITION_METRICS'
+METRICS_FILE = 'metrics.prom'
+# Awalan nama metrik di output Prometheus
+METRICS_PREFIX = 'petition'
+
+
+class _NullTimer:
+    """Timer kosong yang dipakai saat metrik tidak aktif"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_name', '_count', '_start')
+
+    def __init__(self, metrics, name, count):
+        self._metrics = metrics
+        self._name = name
+        self._count = count
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._metrics.observe(self._name, time.perf_counter() - self._start, self._count)
+        if exc_type is not None:
+            self._metrics.inc(f"{self._name}_errors")
+        return False
+
+
+class Metrics:
+    """Registry counter, timer, dan gauge ringan untuk jalur panas ledger.
+
+    Counter hanya bertambah; timer mencatat jumlah item, total detik, dan
+    durasi terlama per pengukuran (throughput = count / sum). Gauge dibaca
+    dari callback saat metrik ditampilkan, sehingga statistik cache yang sudah
+    ada tidak perlu diperbarui dua kali. Saat tidak aktif, timer() memberi
+    context manager kosong dan inc()/observe() langsung kembali, jadi biaya
+    di jalur panas hanya satu cek atribut.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        # nama -> [count, total detik, durasi terlama]
+        self._timers = {}
+        self._gauges = {}
+        self._help = {}
+        self.started_at = time.time()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def describe(self, name, help_text):
+        """Menyimpan teks bantuan untuk metrik (baris # HELP di output Prometheus)"""
+        self._help[name] = help_text
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counter(self, name):
+        """Nilai counter saat ini (0 jika belum pernah bertambah)"""
+        return self._counters.get(name, 0)
+
+    def observe(self, name, seconds, count=1):
+        """Mencatat satu pengukuran: count item selesai dalam seconds detik"""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = [0, 0.0, 0.0]
+            timer[0] += count
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+    def timer(self, name, count=1):
+        """Context manager yang mengukur durasi blok kode sebagai timer name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, count)
+
+    def register_gauge(self, name, function, help_text=None):
+        """Mendaftarkan callback tanpa argumen yang mengembalikan nilai gauge"""
+        self._gauges[name] = function
+        if help_text:
+            self._help[name] = help_text
+
+    def _read_gauges(self):
+        gauges = {}
+        for name, function in list(self._gauges.items()):
+            try:
+                value = function()
+            except Exception:
+                continue
+            if value is not None:
+                gauges[name] = float(value)
+        return gauges
+
+    def snapshot(self):
+        """Salinan semua metrik: {"counters", "timers", "gauges"}"""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {name: {"count": count, "sum_seconds": total, "max_seconds": longest}
+                      for name, (count, total, longest) in self._timers.items()}
+        return {"enabled": self.enabled, "uptime_seconds": time.time() - self.started_at,
+                "counters": counters, "timers": timers, "gauges": self._read_gauges()}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self.started_at = time.time()
+
+    def render_prometheus(self):
+        """Output format teks Prometheus (exposition format 0.0.4)"""
+        data = self.snapshot()
+        lines = []
+
+        def add(name, kind, samples, base=None):
+            metric = f"{METRICS_PREFIX}_{name}"
+            help_text = self._help.get(base or name)
+            if help_text:
+                lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for suffix, value in samples:
+                lines.append(f"{metric}{suffix} {_format_value(value)}")
+
+        add("metrics_enabled", "gauge", [("", 1 if data['enabled'] else 0)])
+        add("uptime_seconds", "gauge", [("", data['uptime_seconds'])])
+        for name, value in sorted(data['counters'].items()):
+            add(f"{name}_total", "counter", [("", value)], name)
+        for name, timer in sorted(data['timers'].items()):
+            add(f"{name}_seconds", "summary", [("_count", timer['count']), ("_sum", timer['sum_seconds'])], name)
+            add(f"{name}_seconds_max", "gauge", [("", timer['max_seconds'])])
+        for name, value in sorted(data['gauges'].items()):
+            add(name, "gauge", [("", value)])
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path=METRICS_FILE):
+        """Menulis output Prometheus ke file (atomik lewat file sementara)"""
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_file, path)
+        return path
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+_metrics = Metrics(enabled=os.environ.get(METRICS_ENV, '') not in ('', '0'))
+
+
+def get_metrics():
+    """Mengembalikan registry metrik bersama untuk proses ini"""
+    return _metrics
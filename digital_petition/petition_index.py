@@ -0,0 +1,239 @@
+import threading
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+import chain_store
+from blockchain_utils import ensure_chain_store
+from chain_cache import get_chain_cache
+from crypto_utils import petition_digest
+from merkle import iter_raw_transactions, transaction_at
+
+# Referensi ringkas satu tanda tangan; blok lengkapnya dibaca dari log saat dibutuhkan
+SignatureRef = namedtuple('SignatureRef', 'signer_username timestamp index offset batch_position')
+
+# Kolom tanda tangan (satu baris per SIGN_PETITION, hanya bertambah): nama -> typecode array
+_SIGNATURE_COLUMNS = {
+    'petition': 'i',
+    'signer': 'i',
+    'timestamp': 'd',
+    'index': 'q',
+    'offset': 'Q',
+    'batch_position': 'i',
+}
+# batch_position untuk tanda tangan yang bukan bagian dari blok BATCH
+_NO_BATCH_POSITION = -1
+
+
+class PetitionEntry:
+    """Data turunan satu petisi: blok pembuatan dan daftar penandatangan
+
+    Untuk transaksi di dalam blok BATCH, "blok" di sini adalah record dari
+    merkle.iter_transactions. Tanda tangan hanya disimpan sebagai nomor baris
+    di kolom tanda tangan PetitionIndex.
+    """
+
+    __slots__ = ('petition_id', 'code', 'create_block', 'rows', '_index', '_signer_set', '_digest')
+
+    def __init__(self, petition_id, code, index):
+        self.petition_id = petition_id
+        self.code = code
+        self.create_block = None
+        self.rows = array('q')
+        self._index = index
+        # Set penandatangan dibangun saat pertama kali dicek
+        self._signer_set = None
+        self._digest = None
+
+    @property
+    def text(self):
+        return self.create_block['transaction_data']['petition_text']
+
+    @property
+    def digest(self):
+        """petition_digest dari blok pembuatan; untuk blok lama dihitung sekali lalu disimpan"""
+        if self._digest is None:
+            self._digest = self.create_block['transaction_data'].get('petition_digest') or petition_digest(self.text)
+        return self._digest
+
+    @property
+    def creator(self):
+        return self.create_block['transaction_data'].get('creator', 'N/A')
+
+    @property
+    def created_at(self):
+        return self.create_block['timestamp']
+
+    @property
+    def signatures(self):
+        """SignatureRef penandatangan petisi ini sesuai urutan di chain"""
+        return self._index.signature_refs(self)
+
+    @property
+    def signer_set(self):
+        return self._index.signer_set(self)
+
+    @property
+    def signer_count(self):
+        return len(self.rows)
+
+    def load_sign_blocks(self):
+        """Membaca blok (atau record BATCH) SIGN_PETITION petisi ini dari log"""
+        signatures = self.signatures
+        offsets = sorted({ref.offset for ref in signatures})
+        if not offsets:
+            return []
+        blocks = dict(zip(offsets, chain_store.read_blocks_at(offsets)))
+        return [transaction_at(blocks[ref.offset], ref.batch_position) for ref in signatures]
+
+
+class PetitionIndex:
+    """Indeks petition_id -> blok pembuatan, penandatangan berurutan, dan set penandatangan.
+
+    Diperbarui secara inkremental oleh ChainCache setiap ada blok baru, sehingga
+    pencarian petisi dan cek "sudah tanda tangan" bernilai O(1). Tanda tangan
+    disimpan sebagai kolom array yang hanya bertambah; di snapshot (lihat
+    snapshot.py) kolom ini ditulis ke file biner, sedangkan JSON hanya memuat
+    data per petisi dan daftar username.
+    """
+
+    snapshot_name = 'petitions'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._entries = {}
+        # Urutan petition_id sesuai urutan blok CREATE_PETITION di chain
+        self._petition_ids = []
+        self._signature_columns = {name: array(typecode) for name, typecode in _SIGNATURE_COLUMNS.items()}
+        # Kosakata username untuk kolom 'signer'
+        self._users = []
+        self._user_codes = {}
+
+    @property
+    def total_signatures(self):
+        return len(self._signature_columns['petition'])
+
+    def _entry(self, petition_id):
+        entry = self._entries.get(petition_id)
+        if entry is None:
+            entry = PetitionEntry(petition_id, len(self._entries), self)
+            self._entries[petition_id] = entry
+        return entry
+
+    def _user_code(self, username):
+        code = self._user_codes.get(username)
+        if code is None:
+            code = self._user_codes[username] = len(self._users)
+            self._users.append(username)
+        return code
+
+    def apply_block(self, block, offset):
+        for position, tx_type, tx_data in iter_raw_transactions(block):
+            if tx_type == 'CREATE_PETITION':
+                petition_id = tx_data['petition_id']
+                with self._lock:
+                    entry = self._entry(petition_id)
+                    # Jika ID petisi dipakai dua kali, blok pembuatan pertama yang berlaku
+                    if entry.create_block is None:
+                        entry.create_block = transaction_at(block, position)
+                        self._petition_ids.append(petition_id)
+
+            elif tx_type == 'SIGN_PETITION':
+                signer = tx_data['signer_username']
+                with self._lock:
+                    entry = self._entry(tx_data.get('petition_id'))
+                    columns = self._signature_columns
+                    entry.rows.append(len(columns['petition']))
+                    columns['petition'].append(entry.code)
+                    columns['signer'].append(self._user_code(signer))
+                    columns['timestamp'].append(block['timestamp'])
+                    columns['index'].append(block['index'])
+                    columns['offset'].append(offset)
+                    columns['batch_position'].append(_NO_BATCH_POSITION if position is None else position)
+                    if entry._signer_set is not None:
+                        entry._signer_set.add(signer)
+
+    def signature_refs(self, entry):
+        """SignatureRef untuk baris tanda tangan entry"""
+        columns = self._signature_columns
+        with self._lock:
+            return [SignatureRef(self._users[columns['signer'][row]], columns['timestamp'][row],
+                                 columns['index'][row], columns['offset'][row],
+                                 None if columns['batch_position'][row] == _NO_BATCH_POSITION
+                                 else columns['batch_position'][row])
+                    for row in entry.rows]
+
+    def signer_set(self, entry):
+        """Set username penandatangan entry (dibangun sekali, lalu diperbarui setiap blok)"""
+        with self._lock:
+            if entry._signer_set is None:
+                signers = self._signature_columns['signer']
+                entry._signer_set = {self._users[signers[row]] for row in entry.rows}
+            return entry._signer_set
+
+    def snapshot_state(self):
+        """State indeks untuk snapshot: data per petisi, username, dan kolom tanda tangan"""
+        with self._lock:
+            return {
+                "petition_ids": list(self._petition_ids),
+                "entries": [[entry.petition_id, entry.create_block] for entry in self._entries.values()],
+                "users": list(self._users),
+                "columns": dict(self._signature_columns),
+            }
+
+    def restore_state(self, state):
+        """Memulihkan indeks dari state snapshot"""
+        with self._lock:
+            self.reset()
+            for petition_id, create_block in state['entries']:
+                self._entry(petition_id).create_block = create_block
+            self._petition_ids = list(state['petition_ids'])
+            self._users = list(state['users'])
+            self._user_codes = {username: code for code, username in enumerate(self._users)}
+            self._signature_columns = dict(state['columns'])
+            # Baris tanda tangan dikelompokkan per petisi dengan NumPy, bukan satu per satu
+            codes = np.array(self._signature_columns['petition'], dtype=np.int32)
+            order = np.argsort(codes, kind='stable').astype(np.int64)
+            bounds = np.searchsorted(codes[order], np.arange(len(self._entries) + 1))
+            for entry in self._entries.values():
+                entry.rows.frombytes(order[bounds[entry.code]:bounds[entry.code + 1]].tobytes())
+
+    def get(self, petition_id):
+        """Mengembalikan PetitionEntry untuk petisi yang sudah dibuat, atau None"""
+        entry = self._entries.get(petition_id)
+        if entry is None or entry.create_block is None:
+            return None
+        return entry
+
+    def get_text(self, petition_id):
+        """Mengembalikan teks petisi, atau None jika petisi tidak ada"""
+        entry = self.get(petition_id)
+        return entry.text if entry else None
+
+    def has_signed(self, petition_id, username):
+        """Mengecek apakah user sudah menandatangani petisi"""
+        entry = self._entries.get(petition_id)
+        return entry is not None and username in entry.signer_set
+
+    def list_petitions(self):
+        """Mengembalikan semua petisi sesuai urutan pembuatan"""
+        with self._lock:
+            return [self._entries[pid] for pid in self._petition_ids]
+
+    def __len__(self):
+        return len(self._petition_ids)
+
+
+_petition_index = PetitionIndex()
+get_chain_cache().register_view(_petition_index)
+
+
+def get_petition_index():
+    """Mengembalikan indeks petisi yang sudah disinkronkan dengan chain"""
+    ensure_chain_store()
+    get_chain_cache().refresh()
+    return _petition_index
@@ -0,0 +1,190 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+from blockchain_utils import ensure_chain_store
+from chain_cache import get_chain_cache
+from merkle import iter_raw_transactions
+
+# Bobot field: kecocokan pada ID petisi lebih penting daripada pada teks
+ID_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+# Kecocokan awalan (misal "pendid" -> "pendidikan") bernilai setengah kecocokan penuh
+PREFIX_WEIGHT = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+ada adalah agar akan aku anda atau bagi bahwa bahkan belum bisa dalam dan dari dengan
+di dia hal harus hingga ia ini itu jadi jika juga kami kamu karena ke kita lagi
+lalu maka masih mereka namun oleh pada para saat saja sangat satu saya sebagai
+secara sedang sehingga seperti sudah supaya tak tanpa telah tentang tetapi tidak
+untuk yaitu yang
+""".split())
+
+_PARTICLES = ('lah', 'kah', 'tah', 'pun')
+_POSSESSIVES = ('nya', 'ku', 'mu')
+_PREFIXES = ('meng', 'meny', 'mem', 'men', 'me', 'peng', 'peny', 'pem', 'pen',
+             'per', 'pe', 'ber', 'be', 'ter', 'di', 'ke', 'se')
+_SUFFIXES = ('kan', 'an', 'i')
+_MIN_STEM = 4
+
+
+def stem(word):
+    """Stemmer ringan bahasa Indonesia: partikel, kata ganti, lalu imbuhan umum"""
+    for suffix in _PARTICLES + _POSSESSIVES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    for prefix in _PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= _MIN_STEM:
+            word = word[len(prefix):]
+            break
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    return word
+
+
+def tokenize(text):
+    """Memecah teks menjadi token huruf kecil tanpa aksen dan tanpa stopword"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return [token for token in _TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+def index_terms(text):
+    """Term yang diindeks dari teks: token asli dan bentuk dasarnya"""
+    terms = []
+    for token in tokenize(text):
+        terms.append(token)
+        root = stem(token)
+        if root != token:
+            terms.append(root)
+    return terms
+
+
+class SearchIndex:
+    """Inverted index atas ID dan teks petisi dengan pencocokan awalan dan ranking.
+
+    Diperbarui secara inkremental oleh ChainCache setiap ada blok
+    CREATE_PETITION baru. Saat aplikasi mulai, dipulihkan dari snapshot lalu
+    hanya blok setelah snapshot yang diindeks.
+    """
+
+    snapshot_name = 'search'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # term -> {petition_id: bobot}
+        self._postings = {}
+        # Semua term terurut untuk pencarian awalan dengan bisect
+        self._vocabulary = []
+        self._indexed = set()
+
+    def _add_term(self, term, petition_id, weight):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = {}
+            bisect.insort(self._vocabulary, term)
+        postings[petition_id] = postings.get(petition_id, 0.0) + weight
+
+    def apply_block(self, block, offset):
+        for _, tx_type, tx_data in iter_raw_transactions(block):
+            if tx_type == 'CREATE_PETITION':
+                self._index_petition(tx_data)
+
+    def _index_petition(self, tx_data):
+        petition_id = tx_data['petition_id']
+        with self._lock:
+            # Blok pembuatan pertama yang berlaku, sama seperti indeks petisi
+            if petition_id in self._indexed:
+                return
+            self._indexed.add(petition_id)
+            self._add_term(petition_id.lower(), petition_id, ID_WEIGHT)
+            for term in index_terms(petition_id):
+                self._add_term(term, petition_id, ID_WEIGHT)
+            for term in index_terms(tx_data['petition_text']):
+                self._add_term(term, petition_id, TEXT_WEIGHT)
+
+    def snapshot_state(self):
+        """State indeks dalam bentuk JSON untuk snapshot"""
+        with self._lock:
+            return {"postings": {term: dict(postings) for term, postings in self._postings.items()},
+                    "indexed": sorted(self._indexed)}
+
+    def restore_state(self, state):
+        """Memulihkan indeks dari state snapshot"""
+        with self._lock:
+            self._postings = state['postings']
+            self._vocabulary = sorted(self._postings)
+            self._indexed = set(state['indexed'])
+
+    def _idf(self, postings):
+        return math.log(1 + len(self._indexed) / len(postings))
+
+    def _term_scores(self, query_token, use_prefix):
+        """Skor per petisi untuk satu token query (kecocokan penuh, bentuk dasar, awalan)"""
+        scores = {}
+        exact_terms = {query_token, stem(query_token)}
+        for term in exact_terms:
+            postings = self._postings.get(term)
+            if postings:
+                idf = self._idf(postings)
+                for petition_id, weight in postings.items():
+                    scores[petition_id] = max(scores.get(petition_id, 0.0), weight * idf)
+
+        if use_prefix:
+            start = bisect.bisect_left(self._vocabulary, query_token)
+            for term in self._vocabulary[start:]:
+                if not term.startswith(query_token):
+                    break
+                if term in exact_terms:
+                    continue
+                postings = self._postings[term]
+                idf = self._idf(postings)
+                for petition_id, weight in postings.items():
+                    score = weight * idf * PREFIX_WEIGHT
+                    scores[petition_id] = max(scores.get(petition_id, 0.0), score)
+        return scores
+
+    def search(self, query, limit=None):
+        """Mencari petisi; semua token query harus cocok. Mengembalikan [(petition_id, skor)]
+
+        Token terakhir juga dicocokkan sebagai awalan agar hasil muncul saat
+        user masih mengetik.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            totals = None
+            for position, token in enumerate(tokens):
+                scores = self._term_scores(token, use_prefix=position == len(tokens) - 1)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {pid: totals[pid] + score for pid, score in scores.items() if pid in totals}
+                if not totals:
+                    return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+_search_index = SearchIndex()
+get_chain_cache().register_view(_search_index)
+
+
+def get_search_index():
+    """Mengembalikan indeks pencarian yang sudah disinkronkan dengan chain"""
+    ensure_chain_store()
+    get_chain_cache().refresh()
+    return _search_index
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+
+import chain_store
+from blockchain_utils import hash_block
+from chain_cache import get_chain_cache
+from chain_writer import file_lock
+from metrics import get_metrics
+
+SNAPSHOT_FILE = 'state_snapshot.json'
+SNAPSHOT_LOCK_FILE = 'state_snapshot.lock'
+# Folder file kolom biner view; satu file per kolom, hanya ditambah di akhir
+COLUMN_DIR = 'state_columns'
+SNAPSHOT_FORMAT = 2
+# Snapshot baru ditulis setelah sekian blok baru sejak snapshot terakhir
+SNAPSHOT_INTERVAL = 1000
+
+_metrics = get_metrics()
+_metrics.describe('snapshot_save', "Waktu menulis snapshot state view (di thread background)")
+
+
+def _canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _dump_states(value, depth=2):
+    """JSON kanonik, sama persis dengan _canonical_json(value), di-encode per bagian
+
+    Encoder C memegang GIL selama satu panggilan; dengan memecah dict sampai
+    depth tingkat (view, lalu field state), thread lain (refresh dan request)
+    sempat berjalan di antara bagian-bagiannya.
+    """
+    if not depth or not isinstance(value, dict):
+        return _canonical_json(value)
+    return '{' + ','.join(f"{_canonical_json(key)}:{_dump_states(value[key], depth - 1)}"
+                          for key in sorted(value)) + '}'
+
+
+def state_hash(states):
+    """SHA-256 dari JSON kanonik state view, untuk mendeteksi snapshot yang rusak"""
+    return hashlib.sha256(_canonical_json(states).encode('utf-8')).hexdigest()
+
+
+def describe_column(values):
+    """Metadata kolom seperti yang disimpan di snapshot: typecode, panjang, dan SHA-256 isinya"""
+    return {"typecode": values.typecode, "length": len(values),
+            "sha256": hashlib.sha256(values.tobytes()).hexdigest()}
+
+
+class SnapshotStore:
+    """Snapshot state turunan (indeks petisi, pencarian, dll.) yang terikat ke satu blok.
+
+    File JSON berisi index, hash dan offset blok terakhir yang tercakup, offset
+    akhir log yang sudah diputar, state kecil setiap view, dan hash state
+    tersebut. Data per tanda tangan atau per blok tidak masuk JSON: view
+    mengembalikannya sebagai kolom array di state['columns'], yang ditulis ke
+    file biner di COLUMN_DIR. Karena kolom hanya bertambah, setiap simpan
+    cukup menambahkan baris baru ke file; JSON hanya memuat panjang dan
+    checksum kolom. Snapshot ditulis oleh thread background, bukan di jalur
+    refresh.
+
+    Saat start, snapshot hanya dipakai jika blok pada offset tersebut masih
+    ada di chain dengan index dan hash yang sama dan checksum kolom cocok;
+    setelah itu hanya ekor log yang diputar ulang.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL, column_dir=COLUMN_DIR):
+        self.path = path
+        self.interval = interval
+        self.column_dir = column_dir
+        # (view, kolom) -> (generation cache, panjang yang sudah ditulis, hasher SHA-256 isi file)
+        self._written = {}
+        self._save_lock = threading.Lock()
+        self._worker = None
+        # (stat file snapshot, offset) setelah penulisan terakhir proses ini, agar
+        # file tidak perlu dibaca ulang jika tidak diganti proses lain
+        self._saved = None
+
+    def _column_path(self, view_name, column):
+        return os.path.join(self.column_dir, f"{view_name}.{column}.bin")
+
+    def read(self):
+        """Membaca isi file snapshot, atau None jika tidak ada/rusak"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            return None
+        return snapshot
+
+    def check(self, snapshot):
+        """Mencocokkan snapshot dengan chain di disk; mengembalikan (valid, pesan, blok)"""
+        if state_hash(snapshot['states']) != snapshot['state_hash']:
+            return False, "Hash state snapshot tidak sesuai", None
+        return self.check_block(snapshot)
+
+    def check_block(self, snapshot):
+        """Seperti check(), tetapi hanya mencocokkan blok terakhir snapshot dengan chain"""
+        try:
+            found = chain_store.read_block_at(snapshot['block_offset'])
+        except (OSError, ValueError):
+            found = None
+        if found is None:
+            return False, "Blok snapshot tidak ditemukan di chain", None
+        block, end = found
+        if (block.get('index') != snapshot['block_index'] or block.get('hash') != snapshot['block_hash']
+                or end != snapshot['offset']):
+            return False, "Blok snapshot tidak cocok dengan chain", None
+        if hash_block(block) != block['hash']:
+            return False, f"Hash blok {block['index']} tidak sesuai", None
+        return True, f"Snapshot cocok dengan blok {block['index']}", block
+
+    def read_columns(self, view_name, columns):
+        """Membaca kolom biner sesuai metadata snapshot; mengembalikan {kolom: (array, hasher)}
+
+        Melempar ValueError jika file lebih pendek dari panjang tercatat atau
+        checksum-nya tidak cocok.
+        """
+        loaded = {}
+        for column, meta in columns.items():
+            values = array(meta['typecode'])
+            size = meta['length'] * values.itemsize
+            with open(self._column_path(view_name, column), 'rb') as f:
+                data = f.read(size)
+            hasher = hashlib.sha256(data)
+            if len(data) != size or hasher.hexdigest() != meta['sha256']:
+                raise ValueError(f"Kolom '{view_name}.{column}' tidak cocok dengan snapshot")
+            values.frombytes(data)
+            loaded[column] = (values, hasher)
+        return loaded
+
+    def load(self, cache):
+        """Snapshot yang tervalidasi untuk ChainCache, atau None"""
+        snapshot = self.read()
+        if snapshot is None:
+            return None
+        valid, _, block = self.check(snapshot)
+        if not valid:
+            return None
+        same_byteorder = snapshot.get('byteorder') == sys.byteorder
+        states = {}
+        written = {}
+        try:
+            for name, state in snapshot['states'].items():
+                state = dict(state)
+                columns = {}
+                for column, (values, hasher) in self.read_columns(name, state.get('columns', {})).items():
+                    if same_byteorder:
+                        written[(name, column)] = (cache.generation, len(values), hasher)
+                    else:
+                        values.byteswap()
+                    columns[column] = values
+                state['columns'] = columns
+                states[name] = state
+        except (OSError, ValueError):
+            return None
+        self._written.update(written)
+        return {
+            "offset": snapshot['offset'],
+            "states": states,
+            "last_block": block,
+            "last_block_offset": snapshot['block_offset'],
+        }
+
+    def _capture_view(self, view, generation):
+        """Dipanggil di bawah lock cache: state JSON view dan byte kolom yang belum ditulis"""
+        state = view.snapshot_state()
+        columns = {}
+        for column, values in state.pop('columns', {}).items():
+            written = self._written.get((view.snapshot_name, column))
+            if written is None or written[0] != generation or written[1] > len(values):
+                # Kolom belum pernah ditulis untuk cache ini: tulis ulang dari awal
+                written = None
+            start = written[1] if written else 0
+            columns[column] = (values.typecode, values.itemsize, len(values), start, values[start:].tobytes())
+        return state, columns
+
+    def _write_column(self, view_name, column, generation, typecode, itemsize, length, start, data):
+        """Menambahkan byte kolom baru ke file (atau menulis ulang dari awal); mengembalikan metadata"""
+        key = (view_name, column)
+        path = self._column_path(view_name, column)
+        if start:
+            hasher = self._written[key][2].copy()
+            with open(path, 'r+b') as f:
+                if f.seek(0, os.SEEK_END) < start * itemsize:
+                    # File dipotong dari luar: tulis ulang penuh pada simpan berikutnya
+                    self._written.pop(key, None)
+                    raise OSError(f"File kolom {path} lebih pendek dari yang sudah ditulis")
+                f.seek(start * itemsize)
+                f.write(data)
+                # Sisa penulisan yang terputus (belum tercatat di JSON) dibuang
+                f.truncate()
+        else:
+            hasher = hashlib.sha256()
+            with open(path, 'wb') as f:
+                f.write(data)
+        hasher.update(data)
+        self._written[key] = (generation, length, hasher)
+        return {"typecode": typecode, "length": length, "sha256": hasher.hexdigest()}
+
+    def save(self, cache, rewrite=False):
+        """Menulis snapshot dari state view cache saat ini
+
+        Hanya pengambilan state (dan potongan kolom yang belum ditulis) yang
+        memegang lock cache; penulisan file dilakukan setelahnya di bawah lock
+        file antarproses. JSON diganti secara atomik setelah semua kolom tertulis.
+        Dengan rewrite=True semua file kolom ditulis ulang dari awal dan snapshot
+        selalu ditulis, meskipun sudah ada snapshot lain yang sama baru.
+        """
+        with self._save_lock:
+            if rewrite:
+                self._written.clear()
+            captured = cache.capture_snapshot(lambda view: self._capture_view(view, cache.generation))
+            if captured is None:
+                return
+            os.makedirs(self.column_dir, exist_ok=True)
+            with file_lock(SNAPSHOT_LOCK_FILE):
+                if not rewrite and not self._is_own_file():
+                    current = self.read()
+                    if (current is not None and current['offset'] >= captured['offset']
+                            and self.check_block(current)[0]):
+                        # Proses lain sudah menyimpan snapshot yang sama baru atau lebih baru
+                        self._saved = (self._file_stat(), current['offset'])
+                        return
+                states = {}
+                for name, (state, columns) in captured['states'].items():
+                    if columns:
+                        state['columns'] = {column: self._write_column(name, column, captured['generation'], *data)
+                                            for column, data in columns.items()}
+                    states[name] = state
+                states_json = _dump_states(states)
+                header = {
+                    "format": SNAPSHOT_FORMAT,
+                    "block_index": captured['block_index'],
+                    "block_hash": captured['block_hash'],
+                    "block_offset": captured['block_offset'],
+                    "offset": captured['offset'],
+                    "byteorder": sys.byteorder,
+                    "created_at": time.time(),
+                    "state_hash": hashlib.sha256(states_json.encode('utf-8')).hexdigest(),
+                }
+                # State yang sudah di-encode untuk hash dipakai ulang, tidak di-encode dua kali
+                data = _canonical_json(header)[:-1] + ',"states":' + states_json + '}'
+                # Nama file sementara per proses agar beberapa proses tidak saling menimpa
+                tmp_file = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_file, self.path)
+                self._saved = (self._file_stat(), captured['offset'])
+
+    def _file_stat(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _is_own_file(self):
+        """True jika file snapshot masih yang terakhir ditulis proses ini"""
+        try:
+            return self._saved is not None and self._saved[0] == self._file_stat()
+        except OSError:
+            return False
+
+    def _save_in_background(self, cache):
+        try:
+            with _metrics.timer('snapshot_save'):
+                self.save(cache)
+        except OSError:
+            # Snapshot hanya optimasi; kegagalan menulis tidak boleh mengganggu aplikasi
+            pass
+
+    def maybe_save(self, cache):
+        """Dipanggil ChainCache setelah refresh; menjadwalkan snapshot setiap interval blok
+
+        Snapshot ditulis oleh thread background agar refresh (dan penulisan
+        blok yang memanggilnya) tidak menunggu serialisasi state.
+        """
+        if cache.blocks_since_snapshot < self.interval:
+            return
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._save_in_background, args=(cache,),
+                                        name='snapshot-save', daemon=True)
+        self._worker.start()
+
+    def wait(self, timeout=None):
+        """Menunggu snapshot background yang sedang berjalan selesai"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+
+_snapshot_store = SnapshotStore()
+
+
+def install_snapshot_store():
+    """Memasang penyimpan snapshot ke cache bersama; mengembalikan penyimpan tersebut
+
+    Dipanggil sekali saat aplikasi, daemon, atau CLI mulai, sebelum refresh
+    pertama. Tanpa penyimpan, cache memutar ulang seluruh log saat start dan
+    tidak menulis snapshot.
+    """
+    # Semua view snapshot didaftarkan dulu agar snapshot yang ditulis proses
+    # mana pun (aplikasi, daemon, CLI) memuat state semua view
+    import chain_table  # noqa: F401
+    import explorer_index  # noqa: F401
+    import petition_index  # noqa: F401
+    import search_index  # noqa: F401
+    import stats_index  # noqa: F401
+    get_chain_cache().set_snapshot_store(_snapshot_store)
+    return _snapshot_store
+
+
+def get_snapshot_store():
+    """Mengembalikan penyimpan snapshot bersama"""
+    return _snapshot_store
+
+
+def verify_snapshot():
+    """Memeriksa snapshot terhadap chain dengan memutar ulang blok sampai blok snapshot
+
+    Setiap view dibangun ulang dari awal log sampai offset snapshot, lalu hash
+    state-nya (dengan kolom diringkas menjadi panjang dan checksum) dibandingkan
+    dengan state di snapshot. File kolom juga dicocokkan dengan checksum-nya.
+    Mengembalikan (valid, pesan).
+    """
+    snapshot = _snapshot_store.read()
+    if snapshot is None:
+        return False, "Snapshot tidak ditemukan"
+    valid, message, _ = _snapshot_store.check(snapshot)
+    if not valid:
+        return False, message
+
+    views = {view.snapshot_name: type(view)() for view in get_chain_cache().snapshot_views()}
+    for offset, _, block in chain_store.iter_blocks_from(0):
+        if offset >= snapshot['offset']:
+            break
+        for view in views.values():
+            view.apply_block(block, offset)
+
+    for name, view in views.items():
+        stored = snapshot['states'].get(name)
+        if stored is None:
+            return False, f"State '{name}' tidak ada di snapshot"
+        try:
+            _snapshot_store.read_columns(name, stored.get('columns', {}))
+        except (OSError, ValueError) as e:
+            return False, str(e)
+        state = view.snapshot_state()
+        columns = state.pop('columns', None)
+        if columns:
+            state['columns'] = {column: describe_column(values) for column, values in columns.items()}
+        if state_hash(state) != state_hash(stored):
+            return False, f"State '{name}' di snapshot berbeda dengan hasil replay chain"
+    return True, f"Snapshot valid sampai blok {snapshot['block_index']}"
@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from blockchain_utils import ensure_chain_store
+from chain_cache import get_chain_cache
+from merkle import iter_raw_transactions
+
+# Lebar bucket waktu dalam detik (UTC, sama dengan pd.to_datetime(unit='s'))
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+
+
+def _bucket_frame(counts, bucket_seconds):
+    """DataFrame [waktu, signatures, cumulative] terurut dari dict bucket -> jumlah"""
+    buckets = np.fromiter(sorted(counts), dtype=np.int64, count=len(counts))
+    signatures = np.fromiter((counts[bucket] for bucket in buckets.tolist()), dtype=np.int64,
+                             count=len(counts))
+    return pd.DataFrame({
+        'time': pd.to_datetime(buckets * bucket_seconds, unit='s'),
+        'signatures': signatures,
+        'cumulative': np.cumsum(signatures),
+    })
+
+
+class SignatureStats:
+    """Agregat tanda tangan per petisi, per petisi per hari, per hari, dan per jam.
+
+    Diperbarui secara inkremental oleh ChainCache setiap ada blok baru, sehingga
+    grafik statistik dibangun dari hitungan yang sudah diagregasi dan tidak
+    perlu membuat satu record per tanda tangan. DataFrame hasilnya di-cache
+    sampai ada tanda tangan baru; anggap hanya-baca. State-nya ikut disimpan
+    dalam snapshot (lihat snapshot.py).
+    """
+
+    snapshot_name = 'stats'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # petition_id -> jumlah tanda tangan, sesuai urutan pembuatan petisi
+        self._totals = {}
+        # petition_id -> {hari: jumlah}
+        self._daily_by_petition = {}
+        self._daily = {}
+        self._hourly = {}
+        self.total_signatures = 0
+        self._frames = {}
+
+    def apply_block(self, block, offset):
+        for _, tx_type, tx_data in iter_raw_transactions(block):
+            if tx_type == 'CREATE_PETITION':
+                with self._lock:
+                    # Jika ID petisi dipakai dua kali, pembuatan pertama yang berlaku
+                    self._totals.setdefault(tx_data['petition_id'], 0)
+                    self._frames = {}
+
+            elif tx_type == 'SIGN_PETITION':
+                petition_id = tx_data.get('petition_id')
+                # Sama seperti statistik sebelumnya: hanya tanda tangan untuk petisi yang ada
+                if petition_id not in self._totals:
+                    continue
+                day = int(block['timestamp'] // DAY_SECONDS)
+                hour = int(block['timestamp'] // HOUR_SECONDS)
+                with self._lock:
+                    self._totals[petition_id] += 1
+                    daily = self._daily_by_petition.setdefault(petition_id, {})
+                    daily[day] = daily.get(day, 0) + 1
+                    self._daily[day] = self._daily.get(day, 0) + 1
+                    self._hourly[hour] = self._hourly.get(hour, 0) + 1
+                    self.total_signatures += 1
+                    self._frames = {}
+
+    def snapshot_state(self):
+        """State agregat dalam bentuk JSON untuk snapshot"""
+        with self._lock:
+            return {
+                "totals": [[petition_id, count] for petition_id, count in self._totals.items()],
+                "daily_by_petition": [[petition_id, [[day, count] for day, count in daily.items()]]
+                                      for petition_id, daily in self._daily_by_petition.items()],
+                "hourly": [[hour, count] for hour, count in self._hourly.items()],
+            }
+
+    def restore_state(self, state):
+        """Memulihkan agregat dari state snapshot"""
+        with self._lock:
+            self.reset()
+            self._totals = {petition_id: count for petition_id, count in state['totals']}
+            for petition_id, daily in state['daily_by_petition']:
+                self._daily_by_petition[petition_id] = {day: count for day, count in daily}
+                for day, count in daily:
+                    self._daily[day] = self._daily.get(day, 0) + count
+            self._hourly = {hour: count for hour, count in state['hourly']}
+            self.total_signatures = sum(self._totals.values())
+
+    def _frame(self, key, build):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                frame = self._frames[key] = build()
+            return frame
+
+    def petition_totals(self):
+        """DataFrame [petition_id, signatures] sesuai urutan pembuatan petisi"""
+        return self._frame('totals', lambda: pd.DataFrame({
+            'petition_id': pd.Series(list(self._totals), dtype=object),
+            'signatures': np.fromiter(self._totals.values(), dtype=np.int64, count=len(self._totals)),
+        }))
+
+    def daily(self, petition_id=None):
+        """DataFrame [time, signatures, cumulative] per hari, semua petisi atau satu petisi"""
+        if petition_id is None:
+            return self._frame('daily', lambda: _bucket_frame(self._daily, DAY_SECONDS))
+        return self._frame(('daily', petition_id), lambda: _bucket_frame(
+            self._daily_by_petition.get(petition_id, {}), DAY_SECONDS))
+
+    def hourly(self):
+        """DataFrame [time, signatures, cumulative] per jam untuk semua petisi"""
+        return self._frame('hourly', lambda: _bucket_frame(self._hourly, HOUR_SECONDS))
+
+
+_signature_stats = SignatureStats()
+get_chain_cache().register_view(_signature_stats)
+
+
+def get_signature_stats():
+    """Mengembalikan agregat tanda tangan yang sudah disinkronkan dengan chain"""
+    ensure_chain_store()
+    get_chain_cache().refresh()
+    return _signature_stats
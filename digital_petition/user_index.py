@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+
+import chain_store
+from chain_writer import file_lock
+from merkle import iter_raw_transactions, transaction_at
+
+USER_INDEX_FILE = 'user_index.jsonl'
+USER_INDEX_LOCK_FILE = 'user_index.jsonl.lock'
+
+
+class UserIndex:
+    """Indeks sekunder persisten: username -> offset blok yang dibuat/ditandatangani.
+
+    Disimpan sebagai JSON Lines yang hanya ditambah di akhir:
+      {"genesis": hash, "layout": ...} identitas chain dan format offset yang diindeks
+      {"o": offset, "u": user, "k": "created"|"signed"}
+      {"o": offset, "p": posisi, ...}  transaksi ke-p di dalam blok BATCH
+      {"covered": offset}             log blok sudah diindeks sampai offset ini
+    Entri baru berlaku setelah baris "covered" yang menyusulnya tertulis.
+    Setiap proses hanya membaca baris baru sejak pembacaan terakhir, lalu
+    mengindeks ekor log blok setelah "covered". Penulisan dilindungi lock
+    antarproses, dan ekor file dibaca ulang di bawah lock sehingga blok yang
+    sudah diindeks proses lain tidak ditulis dua kali.
+    """
+
+    def __init__(self, path=USER_INDEX_FILE, lock_path=USER_INDEX_LOCK_FILE):
+        self.path = path
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.created = {}
+        self.signed = {}
+        self.covered = 0
+        self.genesis_hash = None
+        self.layout = None
+        self._seen_size = None
+        # Entri yang belum diikuti baris "covered"
+        self._pending = []
+        # Posisi file indeks: sudah dibaca, dan akhir baris "covered"/"genesis" terakhir
+        self._file_size = 0
+        self._committed_size = 0
+        self._file_inode = None
+
+    def _add(self, kind, username, offset, position=None):
+        target = self.created if kind == 'created' else self.signed
+        target.setdefault(username, []).append((offset, position))
+
+    def _read_tail(self):
+        """Membaca baris lengkap yang ditambahkan ke file indeks sejak pembacaan terakhir"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._file_inode is not None:
+                self._reset()
+            return
+        if stat.st_ino != self._file_inode or stat.st_size < self._file_size:
+            # File indeks diganti atau dipotong oleh proses lain: dibaca ulang dari awal
+            self._reset()
+            self._file_inode = stat.st_ino
+        if stat.st_size == self._file_size:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._file_size)
+            data = f.read(stat.st_size - self._file_size)
+        # Baris terakhir tanpa newline belum selesai ditulis; dibaca lagi nanti
+        end = data.rfind(b'\n') + 1
+        position = self._file_size
+        for line in data[:end].splitlines(keepends=True):
+            position += len(line)
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'genesis' in entry:
+                self.genesis_hash = entry['genesis']
+                self.layout = entry.get('layout')
+                self._committed_size = position
+            elif 'covered' in entry:
+                if entry['covered'] > self.covered:
+                    # Entri yang offset-nya sudah tercakup (duplikat dari proses lain) diabaikan
+                    for item in self._pending:
+                        if item['o'] >= self.covered:
+                            self._add(item['k'], item['u'], item['o'], item.get('p'))
+                    self.covered = entry['covered']
+                self._pending = []
+                self._committed_size = position
+            else:
+                self._pending.append(entry)
+        self._file_size += end
+
+    def _chain_genesis_hash(self):
+        found = chain_store.read_block_at(0)
+        return found[0]['hash'] if found else None
+
+    def _is_stale(self, stat):
+        if stat is None or self.covered > stat.st_size:
+            return True
+        # Offset dari format penyimpanan lama (satu file log) tidak berlaku lagi
+        if self.genesis_hash is not None and self.layout != chain_store.STORE_LAYOUT:
+            return True
+        return self.genesis_hash is not None and self.genesis_hash != self._chain_genesis_hash()
+
+    def catch_up(self):
+        """Mengindeks blok baru di akhir log blok dan menyimpannya ke file indeks"""
+        with self._lock:
+            stat = chain_store.store_stat()
+            if stat is None or stat.st_size == self._seen_size:
+                return
+            with file_lock(self.lock_path):
+                self._read_tail()
+                if self._is_stale(stat):
+                    # Log blok diganti: indeks lama tidak berlaku lagi
+                    self._reset()
+                    if os.path.exists(self.path):
+                        os.remove(self.path)
+                self._seen_size = stat.st_size
+                if self.covered >= stat.st_size:
+                    return
+                self._append_tail()
+
+    def _append_tail(self):
+        """Mengindeks log blok setelah "covered" lalu menambahkannya ke file (lock sudah dipegang)"""
+        lines = []
+        if self.genesis_hash is None:
+            self.genesis_hash = self._chain_genesis_hash()
+            self.layout = chain_store.STORE_LAYOUT
+            lines.append({"genesis": self.genesis_hash, "layout": self.layout})
+
+        end = self.covered
+        for offset, end, block in chain_store.iter_blocks_from(self.covered):
+            for position, tx_type, tx_data in iter_raw_transactions(block):
+                if tx_type == 'CREATE_PETITION' and tx_data.get('creator'):
+                    entry = {"o": offset, "u": tx_data['creator'], "k": "created"}
+                elif tx_type == 'SIGN_PETITION':
+                    entry = {"o": offset, "u": tx_data['signer_username'], "k": "signed"}
+                else:
+                    continue
+                if position is not None:
+                    entry['p'] = position
+                self._add(entry['k'], entry['u'], offset, position)
+                lines.append(entry)
+
+        if end > self.covered:
+            self.covered = end
+            lines.append({"covered": end})
+        if not lines:
+            return
+        with open(self.path, 'a+b') as f:
+            # Entri tanpa "covered" dari penulisan yang terputus dibuang sebelum menambah baris baru
+            f.truncate(self._committed_size)
+            f.write(''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8'))
+            self._file_size = self._committed_size = f.tell()
+            self._file_inode = os.fstat(f.fileno()).st_ino
+        self._pending = []
+
+    def get_offsets(self, username):
+        """Mengembalikan lokasi (offset, posisi batch) transaksi yang dibuat dan ditandatangani"""
+        with self._lock:
+            return list(self.created.get(username, [])), list(self.signed.get(username, []))
+
+
+_user_index = UserIndex()
+
+
+def get_user_index():
+    """Mengembalikan indeks user yang sudah disinkronkan dengan log blok"""
+    _user_index.catch_up()
+    return _user_index
+
+
+def get_user_blocks(username):
+    """Mengembalikan (transaksi CREATE_PETITION, transaksi SIGN_PETITION) milik user
+
+    Hanya blok milik user yang dibaca dari disk, jadi biayanya sebanding dengan
+    aktivitas user, bukan panjang chain.
+    """
+    created_locations, signed_locations = get_user_index().get_offsets(username)
+    if not created_locations and not signed_locations:
+        return [], []
+
+    # Blok BATCH yang memuat beberapa transaksi user cukup dibaca sekali
+    offsets = sorted({offset for offset, _ in created_locations + signed_locations})
+    blocks = dict(zip(offsets, chain_store.read_blocks_at(offsets)))
+    return ([transaction_at(blocks[offset], position) for offset, position in created_locations],
+            [transaction_at(blocks[offset], position) for offset, position in signed_locations])
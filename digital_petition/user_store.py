@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from json.decoder import scanstring
+
+from chain_store import truncate_partial_tail
+from chain_writer import file_lock
+
+USERS_STORE_FILE = 'users.jsonl'
+USERS_LOCK_FILE = f"{USERS_STORE_FILE}.lock"
+# Database lama: satu object JSON {username: public_key_pem}
+LEGACY_USERS_FILE = 'users.json'
+# Jumlah public key yang disimpan di memori; sisanya dibaca dari file lewat offset
+KEY_CACHE_SIZE = 10000
+# Awal setiap baris yang ditulis store ini; username bisa dibaca tanpa mem-parse public key
+_LINE_PREFIX = '{"u": "'
+
+
+def _line_username(line):
+    """Username dari satu baris store, atau None jika baris rusak"""
+    try:
+        text = line.decode('utf-8')
+        if text.startswith(_LINE_PREFIX):
+            return scanstring(text, len(_LINE_PREFIX))[0]
+        return json.loads(text)['u']
+    except (UnicodeDecodeError, ValueError, KeyError, TypeError):
+        return None
+
+
+class UserStore:
+    """Penyimpan public key user: JSON Lines yang hanya ditambah di akhir.
+
+    Setiap baris berisi {"u": username, "k": public_key_pem}; pendaftaran
+    pertama untuk satu username yang berlaku. Di memori hanya disimpan
+    username -> offset baris (plus cache LRU public key), dan setiap akses
+    hanya membaca baris baru sejak akses sebelumnya, sehingga lookup bernilai
+    O(1) berapa pun jumlah user. Pendaftaran dilindungi lock antarproses.
+    """
+
+    def __init__(self, path=USERS_STORE_FILE, lock_path=USERS_LOCK_FILE, legacy_path=LEGACY_USERS_FILE):
+        self.path = path
+        self.lock_path = lock_path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._offsets = {}
+        self._keys = OrderedDict()
+        self._size = 0
+        self._inode = None
+
+    def _migrate_legacy(self):
+        """Migrasi satu kali dari users.json (ditulis ke file sementara lalu di-rename)"""
+        with file_lock(self.lock_path):
+            if os.path.exists(self.path):
+                return
+            users = {}
+            if os.path.exists(self.legacy_path):
+                try:
+                    with open(self.legacy_path, 'r') as f:
+                        users = json.load(f)
+                except json.JSONDecodeError:
+                    users = {}
+            tmp_file = f"{self.path}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for username, public_key_pem in users.items():
+                    f.write(json.dumps({"u": username, "k": public_key_pem}, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.path)
+
+    def _refresh(self):
+        """Membaca baris lengkap yang ditambahkan sejak refresh terakhir"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._migrate_legacy()
+            stat = os.stat(self.path)
+        if stat.st_ino != self._inode or stat.st_size < self._size:
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._size:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._size)
+            data = f.read(stat.st_size - self._size)
+        # Baris terakhir tanpa newline belum selesai ditulis; dibaca lagi nanti
+        end = data.rfind(b'\n') + 1
+        offset = self._size
+        for line in data[:end].splitlines(keepends=True):
+            username = _line_username(line)
+            if username is not None and username not in self._offsets:
+                self._offsets[username] = offset
+            offset += len(line)
+        self._size += end
+
+    def _read_key(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())['k']
+
+    def get(self, username):
+        """Public key PEM milik username, atau None jika belum terdaftar"""
+        with self._lock:
+            key = self._keys.get(username)
+            if key is not None:
+                self._keys.move_to_end(username)
+                return key
+            self._refresh()
+            offset = self._offsets.get(username)
+            if offset is None:
+                return None
+            key = self._keys[username] = self._read_key(offset)
+            if len(self._keys) > KEY_CACHE_SIZE:
+                self._keys.popitem(last=False)
+            return key
+
+    def __contains__(self, username):
+        with self._lock:
+            self._refresh()
+            return username in self._offsets
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._offsets)
+
+    def register(self, username, public_key_pem):
+        """Mendaftarkan user baru; mengembalikan False jika username sudah terdaftar"""
+        line = json.dumps({"u": username, "k": public_key_pem}, ensure_ascii=False) + '\n'
+        with self._lock:
+            # Migrasi (yang mengambil lock sendiri) dijalankan sebelum lock pendaftaran
+            self._refresh()
+            with file_lock(self.lock_path):
+                self._refresh()
+                if username in self._offsets:
+                    return False
+                with open(self.path, 'r+b') as f:
+                    truncate_partial_tail(f)
+                    f.seek(0, os.SEEK_END)
+                    f.write(line.encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._refresh()
+                return True
+
+
+_user_store = UserStore()
+
+
+def get_user_store():
+    """Mengembalikan penyimpan public key user bersama untuk proses ini"""
+    return _user_store
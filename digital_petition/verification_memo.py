@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from blockchain_utils import hash_block
+from crypto_utils import block_signing_message, public_key_fingerprint, signature_scheme_of, verify_signature
+from merkle import transaction_leaf_hash
+from metrics import get_metrics
+
+VERIFICATION_MEMO_FILE = 'verification_memo.db'
+# Memo versi lama (JSON Lines), diimpor sekali ke VERIFICATION_MEMO_FILE
+LEGACY_MEMO_FILE = 'verification_memo.jsonl'
+# Jumlah hasil verifikasi yang disimpan di cache LRU memori
+MEMO_CACHE_SIZE = 10000
+
+_metrics = get_metrics()
+_metrics.describe('signature_verify', "Verifikasi satu tanda tangan di proses aplikasi (memo miss)")
+_metrics.describe('verification_memo_hits', "Tanda tangan yang hasil verifikasinya diambil dari memo")
+_metrics.describe('verification_memo_misses', "Tanda tangan yang harus diverifikasi ulang")
+
+
+def _memo_hit_ratio():
+    hits = _metrics.counter('verification_memo_hits')
+    total = hits + _metrics.counter('verification_memo_misses')
+    return hits / total if total else None
+
+
+_metrics.register_gauge('verification_memo_hit_ratio', _memo_hit_ratio,
+                        "Rasio hasil verifikasi yang diambil dari memo")
+
+
+def record_hash(record):
+    """Hash isi record SIGN_PETITION yang dihitung ulang, bukan field "hash" yang tersimpan
+
+    Record dari dalam blok BATCH memakai hash daun Merkle transaksinya; blok
+    biasa di-hash ulang dengan hash_block. Dengan begitu tanda tangan yang
+    diubah di disk tanpa memperbarui field "hash" menghasilkan key memo baru
+    dan diverifikasi ulang.
+    """
+    if record.get('batch_position') is not None:
+        return transaction_leaf_hash(record['transaction_type'], record['transaction_data'])
+    return hash_block(record)
+
+
+def memo_key(content_hash, public_key_str):
+    """Key memo: hash isi SIGN_PETITION (lihat record_hash) + fingerprint kunci publik penandatangan.
+
+    Jika kunci user di penyimpan user berganti, fingerprint ikut berubah sehingga
+    hasil lama otomatis tidak terpakai lagi.
+    """
+    return f"{content_hash}:{public_key_fingerprint(public_key_str)}"
+
+
+class VerificationMemo:
+    """Penyimpanan hasil verifikasi tanda tangan yang persisten (tabel SQLite berkunci).
+
+    Lookup dibaca langsung dari indeks tabel di disk, jadi memori tidak tumbuh
+    seiring jumlah tanda tangan; di depannya ada cache LRU untuk hasil yang
+    sering dibaca ulang (mis. blok yang sama di setiap rerun halaman). Memo
+    lama (verification_memo.jsonl) diimpor satu kali saat tabel dibuat.
+    """
+
+    def __init__(self, path=VERIFICATION_MEMO_FILE, legacy_path=LEGACY_MEMO_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._connection = None
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _import_legacy(self, connection):
+        if not os.path.exists(self.legacy_path):
+            return
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            rows = []
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rows.append((entry['key'], entry['valid']))
+                if len(rows) >= 10000:
+                    connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?)", rows)
+                    rows = []
+            connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?)", rows)
+
+    def _connect(self):
+        if self._connection is None:
+            # Dipakai dari beberapa thread Streamlit; akses diserialkan oleh self._lock
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Tabel dibuat (dan memo lama diimpor) di satu transaksi, jadi proses lain tidak mengimpor dua kali
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verdicts'").fetchone()
+                if not exists:
+                    connection.execute("CREATE TABLE verdicts (key TEXT PRIMARY KEY, valid INTEGER NOT NULL) "
+                                       "WITHOUT ROWID")
+                    self._import_legacy(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                connection.close()
+                raise
+            self._connection = connection
+        return self._connection
+
+    def _remember(self, key, valid):
+        self._verdicts[key] = valid
+        self._verdicts.move_to_end(key)
+        if len(self._verdicts) > MEMO_CACHE_SIZE:
+            self._verdicts.popitem(last=False)
+
+    def get(self, key):
+        """Mengembalikan hasil verifikasi tersimpan (True/False) atau None"""
+        with self._lock:
+            valid = self._verdicts.get(key)
+            if valid is not None:
+                self._verdicts.move_to_end(key)
+                return valid
+            row = self._connect().execute("SELECT valid FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            valid = bool(row[0])
+            self._remember(key, valid)
+            return valid
+
+    def put_many(self, items):
+        """Menyimpan banyak hasil verifikasi sekaligus: iterable (key, valid)"""
+        with self._lock:
+            rows = [(key, bool(valid)) for key, valid in items]
+            if not rows:
+                return
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?)", rows)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            for key, valid in rows:
+                self._remember(key, valid)
+
+    def put(self, key, valid):
+        self.put_many([(key, valid)])
+
+    def clear(self):
+        """Menghapus semua hasil verifikasi (memaksa verifikasi ulang)"""
+        with self._lock:
+            self._verdicts.clear()
+            self._connect().execute("DELETE FROM verdicts")
+
+
+_verification_memo = VerificationMemo()
+
+
+def get_verification_memo():
+    """Mengembalikan memo verifikasi yang dipakai bersama dalam proses ini"""
+    return _verification_memo
+
+
+def verify_block_signature(block, petition, public_key_str):
+    """Memverifikasi tanda tangan blok SIGN_PETITION, memakai hasil tersimpan bila ada
+
+    petition adalah PetitionEntry dari indeks petisi; digest-nya dipakai ulang
+    sehingga teks petisi tidak di-hash lagi untuk setiap tanda tangan.
+    """
+    key = memo_key(record_hash(block), public_key_str)
+    verdict = _verification_memo.get(key)
+    if verdict is not None:
+        _metrics.inc('verification_memo_hits')
+        return verdict
+
+    _metrics.inc('verification_memo_misses')
+    tx_data = block['transaction_data']
+    message = block_signing_message(tx_data, petition.text, petition.digest)
+    with _metrics.timer('signature_verify'):
+        verdict = message is not None and verify_signature(message, tx_data['signature'], public_key_str,
+                                                           signature_scheme_of(tx_data))
+    _verification_memo.put(key, verdict)
+    return verdict